@@ -0,0 +1,358 @@
+"""
+Anomaly Detection
+Streaming robust z-scores for every tracked metric series, raising alerts into ai_insights
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from config import Config
+from services.cluster import bus
+from storage.metric_store import AGGREGATIONS, get_metric_store
+from storage.rollups import HOURS_PER_WEEK, hour_of_week
+from storage.ttl_cache import TTLCache
+
+# Points a series needs before it is scored
+WARMUP_POINTS = 48
+
+# Weight of each new point in the baseline once warmed up (about a 40-point memory)
+BASELINE_ALPHA = 0.05
+
+# Points are winsorized to level +/- CLIP_SIGMAS before updating the baseline, so a spike
+# barely moves it while a lasting level shift is absorbed over a few dozen points
+CLIP_SIGMAS = 3.0
+
+# Mean absolute deviation to standard deviation for normally distributed residuals
+MAD_TO_SIGMA = 1.2533
+
+# Smallest deviation scale relative to the level, so flat series do not alert on rounding
+MIN_RELATIVE_SCALE = 0.01
+
+# Smallest deviation scale for counter changes, which move in whole units
+MIN_COUNTER_SCALE = 1.0
+
+# |z| at which an anomaly is reported high priority
+HIGH_PRIORITY_Z = 8.0
+
+# Samples every hour-of-week slot needs before a series is scored on seasonal residuals
+MIN_SEASONAL_SAMPLES = 4
+
+# History replayed into a new detector so it is warm and knows recent anomalies
+PRIME_SECONDS = 14 * 86400
+
+# Recent anomalies kept per account for counting
+HISTORY_SIZE = 10000
+
+# Ways a series is turned into the value that gets scored
+RAW, DELTA, SEASONAL = 0, 1, 2
+
+
+class AnomalyDetector:
+    """
+    Robust rolling baseline per series: a winsorized exponentially weighted level and mean
+    absolute deviation.
+
+    Each point costs O(1) and state is five numbers per series. Cumulative series
+    ('last'-aggregated gauges such as follower counts) are scored on their changes, and
+    series with a few weeks of hourly history on their residual from the hour-of-week
+    profile, so daily and weekly cycles do not read as anomalies. A batch is processed in
+    rounds where each round holds at most one point per series, so every round is a
+    handful of vectorized operations across all series at once.
+    """
+
+    def __init__(self, capacity=64):
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._names = []
+        self._level = np.zeros(capacity)
+        self._scale = np.zeros(capacity)
+        self._last = np.full(capacity, np.nan)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._mode = np.full(capacity, -1, dtype=np.int8)
+        self._last_alert = np.full(capacity, -np.inf)
+        self.history = deque(maxlen=HISTORY_SIZE)
+
+    def __len__(self):
+        return len(self._names)
+
+    def key_ids(self, keys):
+        """Integer ids for series names, registering new ones"""
+        ids = np.empty(len(keys), dtype=np.int64)
+        with self._lock:
+            for i, key in enumerate(keys):
+                kid = self._keys.get(key)
+                if kid is None:
+                    kid = self._keys[key] = len(self._names)
+                    self._names.append(key)
+                ids[i] = kid
+            self._ensure_capacity(len(self._names))
+        return ids
+
+    def _ensure_capacity(self, needed):
+        capacity = self._level.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grow = capacity - self._level.shape[0]
+        self._level = np.concatenate([self._level, np.zeros(grow)])
+        self._scale = np.concatenate([self._scale, np.zeros(grow)])
+        self._last = np.concatenate([self._last, np.full(grow, np.nan)])
+        self._count = np.concatenate([self._count, np.zeros(grow, dtype=np.int64)])
+        self._mode = np.concatenate([self._mode, np.full(grow, -1, dtype=np.int8)])
+        self._last_alert = np.concatenate([self._last_alert, np.full(grow, -np.inf)])
+
+    def score_ids(self, ids, values, modes):
+        """
+        Score points against their series baselines, then fold them in
+
+        Points must be in time order per series. A series whose mode changes starts a new
+        baseline.
+
+        Args:
+            ids: Series ids (from key_ids)
+            values: Values to score (seasonal residuals already applied)
+            modes: RAW, DELTA or SEASONAL per point
+
+        Returns:
+            Array of z-scores, NaN while a series is warming up
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        modes = np.asarray(modes, dtype=np.int8)
+        scores = np.full(ids.shape[0], np.nan)
+        if not ids.shape[0]:
+            return scores
+
+        # Occurrence rank of each point within its series; round r takes every rank-r point
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        rank = np.empty(ids.shape[0], dtype=np.int64)
+        rank[order] = np.arange(ids.shape[0]) - np.repeat(starts, np.diff(np.r_[starts, ids.shape[0]]))
+        rounds = np.argsort(rank, kind='stable')
+        bounds = np.searchsorted(rank[rounds], np.arange(int(rank.max()) + 2))
+
+        with self._lock:
+            self._ensure_capacity(int(ids.max()) + 1)
+            level, scale, last, count = self._level, self._scale, self._last, self._count
+            for r in range(bounds.shape[0] - 1):
+                sel = rounds[bounds[r]:bounds[r + 1]]
+                k = ids[sel]
+                x = values[sel]
+                mode = modes[sel]
+
+                switched = self._mode[k] != mode
+                if switched.any():
+                    reset = k[switched]
+                    count[reset] = 0
+                    last[reset] = np.nan
+                    self._mode[reset] = mode[switched]
+
+                delta = mode == DELTA
+                v = np.where(delta, x - last[k], x)
+                last[k[delta]] = x[delta]
+                ok = ~np.isnan(v)
+                k, v, delta = k[ok], v[ok], delta[ok]
+                if not k.shape[0]:
+                    continue
+
+                mu = level[k]
+                floor = np.where(delta, MIN_COUNTER_SCALE, MIN_RELATIVE_SCALE * np.abs(mu) + 1e-9)
+                sigma = np.maximum(MAD_TO_SIGMA * scale[k], floor)
+                n = count[k]
+                warm = n >= WARMUP_POINTS
+                scores[sel[ok]] = np.where(warm, (v - mu) / sigma, np.nan)
+
+                # Running mean during warm-up, then a fixed-weight, winsorized update
+                alpha = np.where(warm, BASELINE_ALPHA, 1.0 / (n + 1))
+                clipped = np.where(warm, np.clip(v, mu - CLIP_SIGMAS * sigma, mu + CLIP_SIGMAS * sigma), v)
+                error = clipped - mu
+                level[k] = mu + alpha * error
+                scale[k] = np.where(n > 0, scale[k] + alpha * (np.abs(error) - scale[k]), 0.0)
+                count[k] = n + 1
+        return scores
+
+    def claim_alerts(self, ids, timestamps, scores, threshold, cooldown):
+        """
+        Anomalous points that start a new episode for their series
+
+        A series flags at most one anomaly per cooldown window, so one incident spanning
+        several points is counted and alerted once.
+
+        Returns:
+            Indices into the batch of points that should be reported
+        """
+        flagged = np.flatnonzero(np.abs(np.nan_to_num(scores)) >= threshold)
+        claimed = []
+        with self._lock:
+            for i in flagged[np.argsort(np.asarray(timestamps)[flagged], kind='stable')]:
+                kid, ts = ids[i], float(timestamps[i])
+                if ts - self._last_alert[kid] >= cooldown:
+                    self._last_alert[kid] = ts
+                    claimed.append(int(i))
+                    self.history.append((ts, self._names[kid], float(scores[i])))
+        return claimed
+
+    def count_since(self, key, since):
+        """Number of anomalies recorded for a series at or after since"""
+        return sum(1 for ts, name, _ in list(self.history) if name == key and ts >= since)
+
+
+def _prepare(store, metrics, timestamps, values):
+    """Scoring mode per metric and the values to score, seasonal residuals applied"""
+    modes = np.full(len(metrics), RAW, dtype=np.int8)
+    present = [m for m in set(metrics) if m in store.metrics and AGGREGATIONS.get(m) != 'last']
+    if present:
+        means = store.weekly_profile(present).reshape(len(present), HOURS_PER_WEEK)
+        counts = store.weekly_profile(present, 'count').reshape(len(present), HOURS_PER_WEEK)
+        seasonal = {m: means[i] for i, m in enumerate(present)
+                    if counts[i].min() >= MIN_SEASONAL_SAMPLES}
+    else:
+        seasonal = {}
+
+    values = np.array(values, dtype=np.float64)
+    slots = hour_of_week(timestamps)
+    for i, metric in enumerate(metrics):
+        if AGGREGATIONS.get(metric) == 'last':
+            modes[i] = DELTA
+        elif metric in seasonal:
+            modes[i] = SEASONAL
+            values[i] -= seasonal[metric][slots[i]]
+    return values, modes
+
+
+_detectors = TTLCache(Config.ACCOUNT_STATE_SIZE, ttl=float('inf'))  # LRU over accounts
+_detectors_lock = threading.Lock()
+
+
+def get_anomaly_detector(account='default'):
+    """
+    Get the anomaly detector for an account, primed from recent metric store history
+
+    Anomalies found while priming are counted but not alerted.
+
+    Args:
+        account: Account identifier
+
+    Returns:
+        AnomalyDetector instance
+    """
+    detector = _detectors.get(account)
+    if detector is None:
+        with _detectors_lock:
+            detector = _detectors.get(account)
+            if detector is None:
+                detector = AnomalyDetector()
+                store = get_metric_store(account)
+                if store.metrics:
+                    timestamps, values = store.fetch(store.metrics, time.time() - PRIME_SECONDS)
+                    present = ~np.isnan(values)
+                    rows, columns = np.nonzero(present)
+                    order = np.argsort(columns, kind='stable')
+                    rows, columns = rows[order], columns[order]
+                    metrics = [store.metrics[r] for r in rows]
+                    points_ts = timestamps[columns]
+                    scored, modes = _prepare(store, metrics, points_ts, values[rows, columns])
+                    ids = detector.key_ids(metrics)
+                    scores = detector.score_ids(ids, scored, modes)
+                    detector.claim_alerts(ids, points_ts, scores, Config.ANOMALY_THRESHOLD,
+                                          Config.ANOMALY_ALERT_COOLDOWN)
+                _detectors.put(account, detector)
+    return detector
+
+
+def peek_anomaly_detector(account='default'):
+    """The account's detector if this process already has one (never primes a new one)"""
+    return _detectors.get(account)
+
+
+def _score_points(detector, account, points):
+    """Score points in time order and claim new anomalies; returns the arrays alerts need"""
+    points = sorted(points, key=lambda p: p[0])
+    metrics = [p[1] for p in points]
+    timestamps = np.array([p[0] for p in points], dtype=np.int64)
+    raw = np.array([p[2] for p in points], dtype=np.float64)
+    scored, modes = _prepare(get_metric_store(account), metrics, timestamps, raw)
+
+    ids = detector.key_ids(metrics)
+    scores = detector.score_ids(ids, scored, modes)
+    claimed = detector.claim_alerts(ids, timestamps, scores, Config.ANOMALY_THRESHOLD,
+                                    Config.ANOMALY_ALERT_COOLDOWN)
+    return claimed, metrics, timestamps, raw, scores, modes
+
+
+def observe_points(account, points):
+    """
+    Fold another worker's synced points into this worker's detector, if it has one,
+    without recording alerts (the syncing worker records them)
+
+    Args:
+        account: Account identifier
+        points: List of (epoch_seconds, metric, value)
+    """
+    detector = peek_anomaly_detector(account)
+    if detector is not None and points:
+        _score_points(detector, account, points)
+
+
+def detect_anomalies(account, points):
+    """
+    Score synced (timestamp, metric, value) points and record an alert insight for every
+    new anomaly
+
+    Args:
+        account: Account identifier
+        points: List of (epoch_seconds, metric, value), already written to the metric store
+
+    Returns:
+        List of stored alert insights
+    """
+    from storage.insights import record_insight
+
+    if not points:
+        return []
+    claimed, metrics, timestamps, raw, scores, modes = _score_points(
+        get_anomaly_detector(account), account, points
+    )
+    alerts = []
+    for i in claimed:
+        metric, z = metrics[i], float(scores[i])
+        direction = 'spike' if z > 0 else 'drop'
+        label = metric.replace('_', ' ')
+        change = 'change' if modes[i] == DELTA else 'value'
+        alerts.append(record_insight(
+            account, 'alert', 'high' if abs(z) >= HIGH_PRIORITY_Z else 'medium',
+            f'Unusual {direction} in {label}',
+            f'The latest {label} {change} is {abs(z):.1f} standard deviations '
+            f"{'above' if z > 0 else 'below'} its usual level for this time.",
+            impact=f'{z:+.1f} standard deviations',
+            action=f'Check what changed around the {label} {direction}',
+            category='anomaly',
+            metric=metric,
+            value=float(raw[i]),
+            z_score=round(z, 2),
+            observed_at=int(timestamps[i])
+        ))
+    return alerts
+
+
+def count_anomalies(metric, account='default', window=7 * 86400):
+    """
+    Number of anomalies detected for a metric over a recent window
+
+    Args:
+        metric: Metric name
+        account: Account identifier
+        window: Look-back in seconds
+
+    Returns:
+        Anomaly count
+    """
+    return get_anomaly_detector(account).count_since(metric, time.time() - window)
+
+
+bus.on_resync(_detectors.clear)
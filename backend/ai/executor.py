@@ -0,0 +1,168 @@
+"""
+AI Executor
+Process pool for CPU-bound model fitting and scoring, kept off the request threads
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from config import Config
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the executor already has max_pending jobs in flight"""
+
+
+class JobTimeout(Exception):
+    """Raised when a job does not finish within its timeout"""
+
+
+class AIExecutor:
+    """
+    Bounded front-end to a ProcessPoolExecutor.
+
+    At most max_pending jobs may be queued or running at once; further submissions fail
+    fast with ExecutorSaturated so callers can shed load instead of piling up threads.
+    A slot is released only when its job really finishes, so a timed-out job that is
+    still running keeps counting against the bound.
+
+    With workers=0 jobs run inline on the calling thread (useful for tests and local dev).
+    """
+
+    def __init__(self, workers=2, max_pending=8, timeout=30):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.in_flight = 0
+
+    def _get_pool(self):
+        # Pools do not survive fork: each gunicorn worker lazily builds its own
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Submit a job without waiting for it
+
+        Args:
+            fn: Picklable top-level function
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            concurrent.futures.Future
+
+        Raises:
+            ExecutorSaturated: If max_pending jobs are already in flight
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturated(f'AI executor is saturated ({self.max_pending} jobs in flight)')
+
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            try:
+                future = self._get_pool().submit(fn, *args, **kwargs)
+            except Exception:
+                self._release(None)
+                raise
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Run a job in the pool and wait for its result
+
+        Args:
+            fn: Picklable top-level function
+            timeout: Seconds to wait (defaults to the executor timeout)
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            Result of fn
+
+        Raises:
+            ExecutorSaturated: If the executor is full
+            JobTimeout: If the job does not finish in time
+        """
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise JobTimeout(f'{getattr(fn, "__name__", "job")} did not finish in time')
+
+    def stats(self):
+        """
+        Get executor counters
+
+        Returns:
+            Dictionary of configuration and counters
+        """
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'timeout': self.timeout,
+            'in_flight': self.in_flight,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out
+        }
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._lock:
+            pool, owned = self._pool, self._pool_pid == os.getpid()
+            self._pool = None
+        # Shut down outside the lock: completion callbacks still need it to release slots
+        if pool is not None and owned:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+ai_executor = AIExecutor(Config.AI_POOL_WORKERS, Config.AI_POOL_MAX_PENDING, Config.AI_JOB_TIMEOUT)
+
+
+def run_cpu(fn, *args, **kwargs):
+    """
+    Run a CPU-bound function on the shared AI executor
+
+    Args:
+        fn: Picklable top-level function
+        *args, **kwargs: Arguments for fn
+
+    Returns:
+        Result of fn
+    """
+    return ai_executor.run(fn, *args, **kwargs)
@@ -0,0 +1,221 @@
+"""
+Forecasting Engine
+Batched additive Holt-Winters (damped trend) vectorized across series with NumPy
+"""
+
+import itertools
+
+import numpy as np
+
+# Smoothing parameters searched per series; every combination is fitted in the same pass
+ALPHAS = (0.1, 0.3, 0.5, 0.8)
+BETAS = (0.01, 0.05, 0.15)
+GAMMAS = (0.05, 0.2)
+PHI = 0.98
+
+# z-score for the prediction interval (80%)
+INTERVAL_Z = 1.2816
+
+
+def _initial_state(y, season_length):
+    """Classical decomposition of the first two seasons into level, trend and season"""
+    m = season_length
+    first = np.nanmean(y[:, :m], axis=1)
+    second = np.nanmean(y[:, m:2 * m], axis=1) if y.shape[1] >= 2 * m else first
+    level = np.nan_to_num(first)
+    trend = np.nan_to_num((second - first) / m)
+    season = np.nan_to_num(y[:, :m] - first[:, None])
+    return level, trend, season
+
+
+def _smooth(y, level, trend, season, phase, alpha, beta, gamma, phi, skip=0):
+    """
+    Run the Holt-Winters recursions over y, updating state arrays in place
+
+    Args:
+        y: (n, T) observations, NaN entries are treated as missing
+        level, trend: (n,) state arrays
+        season: (n, m) seasonal state
+        phase: (n,) season index of y[:, 0] per series
+        alpha, beta, gamma: (n,) smoothing parameters
+        phi: Trend damping factor
+        skip: Leading steps excluded from the error statistics
+
+    Returns:
+        Tuple of (sse, ape_sum, counts) one-step error statistics per series
+    """
+    n, steps = y.shape
+    m = season.shape[1]
+    rows = np.arange(n)
+    sse = np.zeros(n)
+    ape = np.zeros(n)
+    counts = np.zeros(n)
+
+    for t in range(steps):
+        s_idx = (phase + t) % m
+        s_prev = season[rows, s_idx]
+        damped = phi * trend
+        forecast = level + damped + s_prev
+        obs = y[:, t]
+        seen = ~np.isnan(obs)
+        obs = np.where(seen, obs, forecast)
+
+        if t >= skip:
+            err = obs - forecast
+            sse += err * err
+            ape += np.abs(err) / np.maximum(np.abs(obs), 1e-9) * seen
+            counts += seen
+
+        new_level = alpha * (obs - s_prev) + (1 - alpha) * (level + damped)
+        trend[:] = beta * (new_level - level) + (1 - beta) * damped
+        season[rows, s_idx] = gamma * (obs - new_level) + (1 - gamma) * s_prev
+        level[:] = new_level
+
+    return sse, ape, counts
+
+
+def fit_holt_winters(series, season_length=7):
+    """
+    Fit damped additive Holt-Winters models to many series in one batched call
+
+    Every series is fitted with each smoothing-parameter combination from the grid at once
+    and keeps the combination with the lowest one-step squared error.
+
+    Args:
+        series: Array-like of shape (n_series, n_obs) or (n_obs,)
+        season_length: Seasonal period in observations (7 for daily data)
+
+    Returns:
+        Model state dict of arrays, one entry per series
+    """
+    y = np.atleast_2d(np.asarray(series, dtype=np.float64))
+    n, steps = y.shape
+    if steps < 2 * season_length:
+        season_length = 1
+    m = season_length
+
+    grid = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS if m > 1 else (0.0,))))
+    g = grid.shape[0]
+
+    level, trend, season = _initial_state(y, m)
+    tiled_y = np.repeat(y, g, axis=0)
+    level = np.repeat(level, g)
+    trend = np.repeat(trend, g)
+    season = np.repeat(season, g, axis=0)
+    alpha, beta, gamma = (np.tile(grid[:, i], n) for i in range(3))
+
+    phase = np.zeros(n * g, dtype=np.int64)
+    sse, ape, counts = _smooth(tiled_y, level, trend, season, phase, alpha, beta, gamma, PHI, skip=m)
+
+    best = np.argmin(sse.reshape(n, g), axis=1) + np.arange(n) * g
+    counts = np.maximum(counts[best], 1)
+    return {
+        'level': level[best],
+        'trend': trend[best],
+        'season': season[best],
+        'phase': np.full(n, steps % m, dtype=np.int64),
+        'alpha': alpha[best],
+        'beta': beta[best],
+        'gamma': gamma[best],
+        'phi': PHI,
+        'sigma': np.sqrt(sse[best] / counts),
+        'mape': ape[best] / counts,
+        'n_obs': np.full(n, steps, dtype=np.int64)
+    }
+
+
+def forecast_holt_winters(state, horizon):
+    """
+    Forecast every fitted series with prediction intervals
+
+    Args:
+        state: Model state from fit_holt_winters
+        horizon: Number of steps to forecast
+
+    Returns:
+        Tuple of (mean, lower, upper, confidence) arrays of shape (n_series, horizon)
+    """
+    steps = np.arange(1, horizon + 1)
+    phi = state['phi']
+    damping = np.cumsum(phi ** steps)
+    m = state['season'].shape[1]
+    rows = np.arange(state['season'].shape[0])[:, None]
+    season = state['season'][rows, (state['phase'][:, None] + steps[None, :] - 1) % m]
+
+    mean = state['level'][:, None] + state['trend'][:, None] * damping[None, :] + season
+    alpha = state['alpha'][:, None]
+    spread = INTERVAL_Z * state['sigma'][:, None] * np.sqrt(1 + (steps[None, :] - 1) * alpha ** 2)
+    confidence = np.clip(1 - spread / np.maximum(np.abs(mean), 1e-9), 0.0, 0.99)
+    return mean, mean - spread, mean + spread, confidence
+
+
+def update_holt_winters(state, new_values):
+    """
+    Warm-start a fitted model with newly observed points instead of refitting from zero
+
+    The smoothing parameters chosen at fit time are kept; only the level/trend/season
+    recursions run over the new observations.
+
+    Args:
+        state: Model state from fit_holt_winters
+        new_values: Array-like of shape (n_series, n_new) continuing the fitted series
+
+    Returns:
+        New model state (the input state is not modified)
+    """
+    y = np.atleast_2d(np.asarray(new_values, dtype=np.float64))
+    if y.shape[1] == 0:
+        return state
+
+    updated = dict(state)
+    updated['level'] = state['level'].copy()
+    updated['trend'] = state['trend'].copy()
+    updated['season'] = state['season'].copy()
+    sse, ape, counts = _smooth(
+        y, updated['level'], updated['trend'], updated['season'], state['phase'],
+        state['alpha'], state['beta'], state['gamma'], state['phi']
+    )
+
+    m = state['season'].shape[1]
+    prior = np.maximum(state['n_obs'] - m, 1)
+    total = prior + counts
+    updated['sigma'] = np.sqrt((state['sigma'] ** 2 * prior + sse) / total)
+    updated['mape'] = (state['mape'] * prior + ape) / total
+    updated['phase'] = (state['phase'] + y.shape[1]) % m
+    updated['n_obs'] = state['n_obs'] + y.shape[1]
+    return updated
+
+
+def select_series(state, rows):
+    """
+    Extract a subset of series from a batched model state
+
+    Args:
+        state: Model state
+        rows: Index or list of series indices
+
+    Returns:
+        Model state containing only the selected series
+    """
+    rows = np.atleast_1d(rows)
+    return {
+        key: value[rows] if isinstance(value, np.ndarray) else value
+        for key, value in state.items()
+    }
+
+
+def concat_states(states):
+    """
+    Stack model states that share a season length into one batch
+
+    Args:
+        states: List of model states
+
+    Returns:
+        Batched model state
+    """
+    first = states[0]
+    return {
+        key: np.concatenate([s[key] for s in states]) if isinstance(value, np.ndarray) else value
+        for key, value in first.items()
+    }
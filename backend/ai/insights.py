@@ -1,93 +1,332 @@
 """
 AI Insights Generator
-Uses Gemini API to generate natural language insights
+Ranks candidate insights computed from the data and has an LLM phrase only the top few
 """
 
-import random
+import heapq
+import threading
 from datetime import datetime
-import os
 
-def generate_insights():
+import numpy as np
+
+from ai.anomalies import get_anomaly_detector
+from ai.keywords import get_keyword_index
+from ai.llm import DRAFT_PREFIX, get_llm_client
+from ai.predictor import DEFAULT_ENGAGEMENT_METRIC, WEEKDAYS
+from ai.trends import TrendTracker, format_growth, get_metric_tracker, metric_trends, rank_topics
+from config import Config
+from services.cluster import bus
+from storage.metric_store import AGGREGATIONS, bucket_start, get_metric_store, to_epoch_seconds
+from storage.ttl_cache import TTLCache
+
+# Series whose weekday pattern is reported, first one stored wins
+SEASONAL_METRICS = ['engagement', 'traffic', 'social']
+
+# Relative spread between best and worst weekday that counts as a weekly pattern
+SEASONAL_SPREAD = 0.1
+
+# Change that counts as one unit of significance: week-over-week for metrics (counters
+# such as followers move far less), relative average position for search rank, and
+# decayed mention growth for topics
+DELTA_UNIT = 0.10
+COUNTER_UNIT = 0.01
+RANK_UNIT = 0.10
+TOPIC_UNIT = 0.5
+
+# An anomaly at ANOMALY_THRESHOLD ranks like a two-unit weekly swing
+ANOMALY_WEIGHT = 2.0
+
+# Anomalies this recent (seconds) become candidates
+ANOMALY_WINDOW = 2 * 86400
+
+# Topics per direction considered as candidates
+TOPIC_CANDIDATES = 3
+
+# Candidates below this significance are never shown; priority thresholds above it
+MIN_SIGNIFICANCE = 0.5
+MEDIUM_SIGNIFICANCE = 1.5
+HIGH_SIGNIFICANCE = 3.0
+
+# Cached candidates per account for incremental refresh: {'day', 'metrics': {metric: [...]}, 'topics'}
+_candidates = TTLCache(Config.ACCOUNT_STATE_SIZE, ttl=float('inf'))  # LRU over accounts
+_candidates_lock = threading.Lock()
+
+PROMPT_INSTRUCTIONS = (
+    'You write insights for a marketing analytics dashboard. Rewrite the draft as one or two '
+    'plain sentences for the account owner. Keep every number and add no new facts.'
+)
+
+def generate_insights(account='default', k=None):
     """
-    Generate AI-powered insights from current metrics
+    Generate insights from the account's current data
     
+    Candidates are computed from week-over-week metric changes, search rank and topic rank
+    movement, recent anomalies and today's engagement peak, ranked by significance, and
+    only the top k are sent to the LLM in one batched, cached call. Prompts hold rounded
+    facts, so repeat calls hit the cache until the numbers really move.
+    
+    Args:
+        account: Account identifier
+        k: Number of insights (defaults to INSIGHT_TOP_K)
+        
     Returns:
-        List of insight objects
+        List of insight objects, most significant first
     """
-    # Sample insights (replace with actual Gemini API calls)
-    insights = [
-        {
-            'id': 1,
-            'type': 'opportunity',
-            'priority': 'high',
-            'title': 'Optimal Posting Window Detected',
-            'description': 'Your audience engagement peaks between 1-3 PM today. Consider posting your prepared content during this window for maximum reach.',
-            'impact': '+35% expected engagement',
-            'action': 'Schedule post for 2:00 PM',
-            'category': 'social_media',
-            'timestamp': datetime.utcnow().isoformat()
-        },
-        {
-            'id': 2,
-            'type': 'alert',
-            'priority': 'medium',
-            'title': 'SEO Ranking Decline Detected',
-            'description': 'Your keyword "AI marketing tools" dropped 5 positions in the last 48 hours. Competitors have published fresh content.',
-            'impact': '-12% organic traffic',
-            'action': 'Update content or publish new article',
-            'category': 'seo',
-            'timestamp': datetime.utcnow().isoformat()
-        },
-        {
-            'id': 3,
-            'type': 'achievement',
-            'priority': 'low',
-            'title': 'Engagement Milestone Reached',
-            'description': 'Your average engagement rate has increased by 23% this week, exceeding your monthly target.',
-            'impact': '+23% engagement growth',
-            'action': 'Continue current content strategy',
-            'category': 'performance',
-            'timestamp': datetime.utcnow().isoformat()
-        },
-        {
-            'id': 4,
-            'type': 'recommendation',
-            'priority': 'medium',
-            'title': 'Content Gap Opportunity',
-            'description': 'Analysis shows high search volume for "automation workflows" with low competition. This aligns with your expertise.',
-            'impact': 'Potential 5K+ monthly visitors',
-            'action': 'Create comprehensive guide',
-            'category': 'content',
-            'timestamp': datetime.utcnow().isoformat()
-        }
-    ]
-    
-    return insights
+    candidates = (_metric_candidates(account) + _topic_candidates(account) +
+                  _anomaly_candidates(account) + _posting_window_candidates(account))
+    return _phrase(candidates, k or Config.INSIGHT_TOP_K)
 
-def generate_insight_with_gemini(metrics_data):
+def refresh_insights(account='default', metrics=None, topics=True, k=None):
     """
-    Use Gemini API to generate contextual insights
+    Recompute an account's insights reusing the candidates of unchanged metrics and topics
+    
+    Metric candidates are cached per metric and recomputed only for the metrics given (all
+    of them on first use and when the day rolls over, since the weekly windows move). The
+    anomaly and posting-window candidates are cheap and always recomputed.
     
     Args:
-        metrics_data: Current metrics and analytics data
+        account: Account identifier
+        metrics: Metrics whose data changed, None for all
+        topics: Whether the account's keyword index changed
+        k: Number of insights (defaults to INSIGHT_MATERIALIZE_K)
         
     Returns:
-        AI-generated insight
+        List of insight objects, most significant first
     """
-    # Placeholder for Gemini API integration
-    # In production, call actual Gemini API here
+    today = int(bucket_start(to_epoch_seconds(datetime.utcnow()), 'day'))
+    with _candidates_lock:
+        cached = _candidates.get(account)
+        if cached is None or cached['day'] != today:
+            cached = {'day': today, 'metrics': {}, 'topics': []}
+            _candidates.put(account, cached)
+            metrics, topics = None, True
+        
+        if metrics is None:
+            cached['metrics'].clear()
+        else:
+            known = set(get_metric_store(account).metrics)
+            metrics = [metric for metric in metrics if metric in known]
+            for metric in metrics:
+                cached['metrics'].pop(metric, None)
+        if metrics is None or metrics:
+            for candidate in _metric_candidates(account, metrics):
+                cached['metrics'].setdefault(candidate['metric'], []).append(candidate)
+        if topics:
+            cached['topics'] = _topic_candidates(account)
+        
+        candidates = [c for group in cached['metrics'].values() for c in group] + cached['topics']
+    candidates += _anomaly_candidates(account) + _posting_window_candidates(account)
+    return _phrase(candidates, k or Config.INSIGHT_MATERIALIZE_K)
+
+def _phrase(candidates, k):
+    """Top k candidates by significance, phrased by the LLM in one batched call"""
+    top = heapq.nlargest(
+        k,
+        (c for c in candidates if c['significance'] >= MIN_SIGNIFICANCE),
+        key=lambda c: c['significance']
+    )
+    
+    client = get_llm_client()
+    texts = client.complete([_prompt(c) for c in top])
+    timestamp = datetime.utcnow().isoformat()
+    
+    return [{
+        'id': i + 1,
+        'type': c['type'],
+        'priority': _priority(c['significance']),
+        'title': c['title'],
+        'description': text or c['draft'],
+        'impact': c['impact'],
+        'action': c['action'],
+        'category': c['category'],
+        'source': client.model.name if text else 'template',
+        'timestamp': timestamp
+    } for i, (c, text) in enumerate(zip(top, texts))]
+
+def _priority(significance):
+    if significance >= HIGH_SIGNIFICANCE:
+        return 'high'
+    return 'medium' if significance >= MEDIUM_SIGNIFICANCE else 'low'
+
+def _prompt(candidate):
+    """Deterministic prompt for a candidate; identical facts give an identical cache key"""
+    facts = '; '.join(f'{key}={value}' for key, value in sorted(candidate['facts'].items()))
+    return '\n'.join([
+        PROMPT_INSTRUCTIONS,
+        f"Type: {candidate['type']}",
+        f"Title: {candidate['title']}",
+        f'Facts: {facts}',
+        f"Suggested action: {candidate['action']}",
+        DRAFT_PREFIX + candidate['draft']
+    ])
+
+def _number(value):
+    """Three significant figures with thousands separators"""
+    rounded = float(f'{value:.3g}')
+    return f'{rounded:,.0f}' if abs(rounded) >= 100 else f'{rounded:g}'
+
+def _label(metric):
+    return metric.replace('_', ' ')
+
+def _category(metric):
+    if metric.startswith('search_'):
+        return 'seo'
+    if metric.split('_')[0] in ('twitter', 'instagram', 'youtube', 'social', 'engagement'):
+        return 'social_media'
+    return 'performance'
+
+def _week_totals(values, aggs):
+    """Collapse daily buckets (one row per metric) with each metric's own aggregation"""
+    result = np.full(values.shape[0], np.nan)
+    present = ~np.isnan(values)
+    has_data = present.any(axis=1)
+    with np.errstate(invalid='ignore'):
+        for agg in set(aggs):
+            rows = np.array([a == agg for a in aggs]) & has_data
+            if agg == 'last':
+                last = values.shape[1] - 1 - np.argmax(present[rows][:, ::-1], axis=1)
+                result[rows] = values[rows, last]
+            elif agg == 'mean':
+                result[rows] = np.nanmean(values[rows], axis=1)
+            else:
+                result[rows] = np.nansum(values[rows], axis=1)
+    return result
+
+def _metric_candidates(account, metrics=None):
+    """Week-over-week changes of stored metrics (all by default), search position as rank movement"""
+    store = get_metric_store(account)
+    metrics = store.metrics if metrics is None else metrics
+    if not metrics:
+        return []
+    
+    today = int(bucket_start(to_epoch_seconds(datetime.utcnow()), 'day'))
+    days, values = store.resample(metrics, today - 14 * 86400, today, 'day')
+    if not len(days):
+        return []
+    recent = np.asarray(days) >= today - 7 * 86400
+    aggs = [AGGREGATIONS.get(metric, 'sum') for metric in metrics]
+    current = _week_totals(values[:, recent], aggs)
+    previous = _week_totals(values[:, ~recent], aggs)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = np.where(np.abs(previous) > 0, (current - previous) / np.abs(previous), np.nan)
+    
+    candidates = []
+    for i in np.flatnonzero(~np.isnan(change)):
+        metric, label = metrics[i], _label(metrics[i])
+        facts = {
+            'metric': label,
+            'this_week': _number(current[i]),
+            'last_week': _number(previous[i])
+        }
+        if metric == 'search_position':
+            moved = previous[i] - current[i]  # Positive: moved up the results page
+            improved = moved > 0
+            facts['positions'] = f'{moved:+.1f}'
+            candidates.append({
+                'metric': metric,
+                'type': 'achievement' if improved else 'alert',
+                'category': 'seo',
+                'significance': abs(change[i]) / RANK_UNIT,
+                'title': 'Search Ranking Improved' if improved else 'SEO Ranking Decline Detected',
+                'facts': facts,
+                'impact': f'{moved:+.1f} positions',
+                'action': 'Build on the pages that gained' if improved else 'Update content or publish new article',
+                'draft': (f"Your average search position moved {'up' if improved else 'down'} "
+                          f'{abs(moved):.1f} places this week, from {facts["last_week"]} to {facts["this_week"]}.')
+            })
+            continue
+        
+        improved = change[i] > 0
+        facts['change'] = format_growth(change[i])
+        unit = COUNTER_UNIT if aggs[i] == 'last' else DELTA_UNIT
+        candidates.append({
+            'metric': metric,
+            'type': 'achievement' if improved else 'alert',
+            'category': _category(metric),
+            'significance': abs(change[i]) / unit,
+            'title': f"{label.title()} {'Up' if improved else 'Down'} {format_growth(abs(change[i])).lstrip('+')} This Week",
+            'facts': facts,
+            'impact': f"{facts['change']} {label}",
+            'action': 'Continue current content strategy' if improved else f'Review what changed for {label}',
+            'draft': (f"{label.capitalize()} {'rose' if improved else 'fell'} "
+                      f"{facts['change'].lstrip('+-')} week over week ({facts['this_week']} vs "
+                      f"{facts['last_week']} the week before).")
+        })
+    return candidates
+
+def _topic_candidates(account):
+    """Topics climbing or falling in the account's decayed mention rankings"""
+    emerging, declining = rank_topics(get_keyword_index(account).trends, TOPIC_CANDIDATES)
+    candidates = []
+    for topic, rising in [(t, True) for t in emerging] + [(t, False) for t in declining]:
+        growth = topic['growth'] if rising else topic['decline']
+        name = topic['topic']
+        candidates.append({
+            'type': 'opportunity' if rising else 'recommendation',
+            'category': 'content',
+            'significance': abs(float(growth.rstrip('%'))) / 100 / TOPIC_UNIT,
+            'title': f'Rising Topic: "{name}"' if rising else f'Fading Topic: "{name}"',
+            'facts': {'topic': name, 'mention_growth': growth, 'mentions_per_day': topic['mentions_per_day']},
+            'impact': f'{growth} mentions',
+            'action': f'Create content on "{name}"' if rising else f'Refresh or retire content on "{name}"',
+            'draft': (f'Mentions of "{name}" are {"up" if rising else "down"} {growth.lstrip("+-")} '
+                      f"against their weekly rate, now {topic['mentions_per_day']} a day.")
+        })
+    return candidates
+
+def _anomaly_candidates(account):
+    """The latest recent anomaly of each metric"""
+    since = datetime.utcnow().timestamp() - ANOMALY_WINDOW
+    latest = {}
+    for ts, metric, z in list(get_anomaly_detector(account).history):
+        if ts >= since:
+            latest[metric] = (ts, z)
     
-    gemini_api_key = os.getenv('GEMINI_API_KEY')
+    candidates = []
+    for metric, (ts, z) in latest.items():
+        label = _label(metric)
+        direction = 'spike' if z > 0 else 'drop'
+        observed = datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d %H:00 UTC')
+        candidates.append({
+            'type': 'alert',
+            'category': _category(metric),
+            'significance': ANOMALY_WEIGHT * abs(z) / Config.ANOMALY_THRESHOLD,
+            'title': f'Unusual {direction.title()} in {label.title()}',
+            'facts': {'metric': label, 'z_score': f'{z:+.1f}', 'observed': observed},
+            'impact': f'{z:+.1f} standard deviations',
+            'action': f'Check what changed around the {label} {direction}',
+            'draft': (f'{label.capitalize()} showed an unusual {direction} at {observed}, '
+                      f"{abs(z):.1f} standard deviations {'above' if z > 0 else 'below'} its usual level.")
+        })
+    return candidates
+
+def _posting_window_candidates(account):
+    """The hour still ahead today with the highest average engagement"""
+    store = get_metric_store(account)
+    if DEFAULT_ENGAGEMENT_METRIC not in store.metrics:
+        return []
     
-    # Example structure for Gemini API call:
-    # prompt = f"Analyze this marketing data and provide actionable insights: {metrics_data}"
-    # response = call_gemini_api(prompt, gemini_api_key)
+    now = int(to_epoch_seconds(datetime.utcnow()))
+    day, hour = (now // 86400 + 3) % 7, (now // 3600) % 24
+    today = store.weekly_profile([DEFAULT_ENGAGEMENT_METRIC])[0, day]
+    ahead = today[hour + 1:]
+    if np.isnan(ahead).all():
+        return []
     
-    return {
-        'insight': 'Sample AI-generated insight',
-        'confidence': 0.89,
-        'source': 'Gemini AI'
-    }
+    best = hour + 1 + int(np.nanargmax(ahead))
+    lift = float(today[best] / np.nanmean(today) - 1)
+    window = f'{best:02d}:00 UTC'
+    return [{
+        'type': 'opportunity',
+        'category': 'social_media',
+        'significance': lift / DELTA_UNIT,
+        'title': 'Optimal Posting Window Detected',
+        'facts': {'day': WEEKDAYS[day], 'peak_hour': window, 'lift': format_growth(lift)},
+        'impact': f'{format_growth(lift)} expected engagement',
+        'action': f'Schedule post for {window}',
+        'draft': (f'Your audience engagement on {WEEKDAYS[day]}s peaks around {window}, '
+                  f"{format_growth(lift).lstrip('+')} above the day's average.")
+    }]
 
 def analyze_content_performance(content_data):
     """
@@ -116,30 +355,80 @@ def analyze_content_performance(content_data):
     
     return analysis
 
-def detect_trends(timeseries_data):
+def _series_points(timeseries_data):
+    """Flatten {'metric': [{'date', 'value'}, ...]} or a single [{'date', 'value'}] list into points"""
+    if isinstance(timeseries_data, list):
+        timeseries_data = {'value': timeseries_data}
+    points = []
+    for metric, rows in timeseries_data.items():
+        for row in rows:
+            if row.get('value') is None:
+                continue
+            when = datetime.fromisoformat(str(row['date']).replace('Z', ''))
+            points.append((to_epoch_seconds(when), metric, float(row['value'])))
+    return points
+
+def _seasonal_pattern(account):
+    """Peak and low weekdays from the account's hour-of-week profile"""
+    store = get_metric_store(account)
+    metric = next((m for m in SEASONAL_METRICS if m in store.metrics), None)
+    if metric is None:
+        return {'detected': False, 'peak_period': None, 'low_period': None}
+    
+    sums = store.weekly_profile([metric], 'sum')[0].sum(axis=1)
+    counts = store.weekly_profile([metric], 'count')[0].sum(axis=1)
+    daily = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    if np.isnan(daily).all():
+        return {'detected': False, 'peak_period': None, 'low_period': None}
+    
+    valid = np.flatnonzero(~np.isnan(daily))
+    ranked = valid[np.argsort(-daily[valid], kind='stable')]
+    spread = (np.nanmax(daily) - np.nanmin(daily)) / max(abs(np.nanmean(daily)), 1e-9)
+    return {
+        'detected': bool(spread > SEASONAL_SPREAD),
+        'metric': metric,
+        'peak_period': _period(ranked[:2]),
+        'low_period': _period(ranked[-2:])
+    }
+
+def _period(days):
+    """Name a set of weekdays, e.g. 'Wednesday-Thursday' or 'Weekend'"""
+    days = sorted(int(d) for d in days)
+    return 'Weekend' if days == [5, 6] else '-'.join(WEEKDAYS[d] for d in days)
+
+def detect_trends(timeseries_data=None, account='default', k=5):
     """
     Detect emerging trends in data
     
+    Topics come from decayed mention rates in the account's keyword index; metric trends
+    from the account's streaming metric tracker, or from `timeseries_data` when given.
+    
     Args:
-        timeseries_data: Time series metrics data
+        timeseries_data: Optional {'metric': [{'date', 'value'}, ...]} (or one such list)
+        account: Account identifier
+        k: Topics per list
         
     Returns:
         Detected trends
     """
+    emerging, declining = rank_topics(get_keyword_index(account).trends, k)
+    
+    if timeseries_data:
+        points = _series_points(timeseries_data)
+        tracker = TrendTracker()
+        tracker.update([p[1] for p in points], [p[0] for p in points], [p[2] for p in points])
+        metrics = metric_trends(tracker, now=max((p[0] for p in points), default=None))
+    else:
+        metrics = metric_trends(get_metric_tracker(account))
+    
     trends = {
-        'emerging_topics': [
-            {'topic': 'AI agents', 'growth': '+145%', 'velocity': 'high'},
-            {'topic': 'marketing automation', 'growth': '+78%', 'velocity': 'medium'}
-        ],
-        'declining_topics': [
-            {'topic': 'traditional SEO', 'decline': '-23%', 'velocity': 'low'}
-        ],
-        'seasonal_patterns': {
-            'detected': True,
-            'peak_period': 'Wednesday-Thursday',
-            'low_period': 'Weekend'
-        }
+        'emerging_topics': emerging,
+        'declining_topics': declining,
+        'metrics': metrics,
+        'seasonal_patterns': _seasonal_pattern(account)
     }
     
     return trends
 
+
+bus.on_resync(_candidates.clear)
@@ -0,0 +1,383 @@
+"""
+Keyword Index
+Incremental inverted index over synced posts, comments and page content, with TF-IDF keywords
+"""
+
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+
+from ai.trends import TrendTracker
+from config import Config
+from services.cluster import broadcast, bus
+from storage.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#'-]*[a-z0-9+#]|[a-z]")
+
+STOPWORDS = frozenset('''
+a about above after again against all also am an and any are as at be because been before
+being below between both but by can could did do does doing down during each few for from
+further get got had has have having he her here hers herself him himself his how i if in
+into is it its itself just let like me more most my myself no nor not now of off on once
+only or other our ours ourselves out over own really same she should so some such than that
+the their theirs them themselves then there these they this those through to too under until
+up very via was we were what when where which while who whom why will with would you your
+yours yourself yourselves im ive dont doesnt didnt cant wont isnt thats its it's i'm i've
+don't can't won't just one new get make us see rt amp http https www com
+'''.split())
+
+# Document kinds the index accepts
+DOCUMENT_KINDS = ('post', 'comment', 'page')
+
+# Documents a term must appear in before it ranks as a corpus keyword
+MIN_DOCUMENT_FREQUENCY = 2
+
+# Stored documents added per lock hold while an index loads, so queries interleave
+LOAD_CHUNK = 5000
+
+# Seconds before retrying a failed load; doubles per failure up to LOAD_RETRY_MAX
+LOAD_RETRY_DELAY = 5
+LOAD_RETRY_MAX = 300
+
+
+def tokenize(text):
+    """
+    Split text into keyword terms: single words and two-word phrases, stopwords excluded
+
+    Args:
+        text: Raw text
+
+    Returns:
+        List of terms (phrases joined with a space)
+    """
+    words = TOKEN_RE.findall(text.lower())
+    keep = [len(w) > 1 and w not in STOPWORDS and not w.isdigit() for w in words]
+    terms = [w for w, k in zip(words, keep) if k]
+    terms.extend(
+        f'{words[i]} {words[i + 1]}' for i in range(len(words) - 1) if keep[i] and keep[i + 1]
+    )
+    return terms
+
+
+class KeywordIndex:
+    """
+    Inverted index with document and collection frequencies kept as NumPy arrays.
+
+    Each term gets an integer id, a postings list of (doc, term count) in compact arrays,
+    df/cf counters and a decayed mention rate (see ai.trends) for trending topics. Adding
+    a document touches only its own terms, and corpus-wide top-k keywords are one
+    vectorized TF-IDF pass over the vocabulary plus argpartition, so query cost is
+    independent of how many documents are indexed.
+    """
+
+    def __init__(self, capacity=4096):
+        self._lock = threading.RLock()
+        self._terms = {}
+        self._names = []
+        self._df = np.zeros(capacity, dtype=np.int64)
+        self._cf = np.zeros(capacity, dtype=np.int64)
+        self._postings = []
+        self._counts = []
+        self._doc_index = {}
+        self._doc_ids = []
+        self._doc_kinds = array('b')
+        self._doc_times = array('q')
+        self._candidates = array('I')
+        self._top = {}
+        self.trends = TrendTracker(capacity, names=self._names)
+        self.loading = False
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    @property
+    def vocabulary_size(self):
+        return len(self._names)
+
+    def _term_id(self, term):
+        tid = self._terms.get(term)
+        if tid is None:
+            tid = len(self._names)
+            if tid == self._df.shape[0]:
+                self._df = np.concatenate([self._df, np.zeros_like(self._df)])
+                self._cf = np.concatenate([self._cf, np.zeros_like(self._cf)])
+            self._terms[term] = tid
+            self._names.append(term)
+            self._postings.append(array('I'))
+            self._counts.append(array('H'))
+        return tid
+
+    def add_documents(self, documents):
+        """
+        Index documents, skipping ids already indexed
+
+        Args:
+            documents: Iterable of dicts with 'id', 'text', 'kind' and 'timestamp'
+
+        Returns:
+            Number of documents added
+
+        Raises:
+            ValueError: If any document is malformed (nothing is added then)
+        """
+        # Validate the whole batch first so a bad document cannot leave it half-indexed
+        batch = []
+        for doc in documents:
+            kind = doc.get('kind', 'post')
+            if 'id' not in doc or not isinstance(doc.get('text'), str) or kind not in DOCUMENT_KINDS:
+                raise ValueError(f"Malformed document {doc.get('id')!r}: needs id, text and a known kind")
+            try:
+                timestamp = int(doc.get('timestamp', 0))
+            except (TypeError, ValueError):
+                raise ValueError(f"Malformed document {doc['id']!r}: timestamp must be epoch seconds")
+            batch.append((doc['id'], DOCUMENT_KINDS.index(kind), timestamp, doc['text']))
+
+        added = 0
+        touched, mentions, times = [], [], []
+        with self._lock:
+            terms, postings, counts = self._terms, self._postings, self._counts
+            for doc_id, kind, timestamp, text in batch:
+                if doc_id in self._doc_index:
+                    continue
+                number = len(self._doc_ids)
+                self._doc_index[doc_id] = number
+                self._doc_ids.append(doc_id)
+                self._doc_kinds.append(kind)
+                self._doc_times.append(timestamp)
+                for term, count in Counter(tokenize(text)).items():
+                    tid = terms.get(term)
+                    if tid is None:
+                        tid = self._term_id(term)
+                    postings[tid].append(number)
+                    counts[tid].append(count if count < 65535 else 65535)
+                    touched.append(tid)
+                    mentions.append(count)
+                    times.append(timestamp)
+                added += 1
+            if not added:
+                return 0
+
+            # Frequencies are updated once per batch rather than per term; terms reaching
+            # MIN_DOCUMENT_FREQUENCY join the candidate list that top_keywords scans
+            unique = np.unique(touched)
+            rare = unique[self._df[unique] < MIN_DOCUMENT_FREQUENCY]
+            np.add.at(self._df, touched, 1)
+            np.add.at(self._cf, touched, mentions)
+            self._candidates.extend(rare[self._df[rare] >= MIN_DOCUMENT_FREQUENCY].tolist())
+            self._top.clear()
+            self.trends.update_ids(touched, times)
+        return added
+
+    def _idf(self, df):
+        return np.log((1 + len(self._doc_ids)) / (1 + df)) + 1
+
+    def top_keywords(self, k=10, min_df=MIN_DOCUMENT_FREQUENCY):
+        """
+        Highest-weighted terms across the corpus: term count x IDF
+
+        Args:
+            k: Number of keywords
+            min_df: Minimum number of documents a term must appear in (at least
+                MIN_DOCUMENT_FREQUENCY)
+
+        Returns:
+            List of {'keyword', 'score', 'documents', 'mentions'}, best first
+        """
+        with self._lock:
+            cached = self._top.get((k, min_df))
+            if cached is not None:
+                return cached
+            # Hapax terms (most of any vocabulary, phrases especially) are never scanned
+            candidates = np.frombuffer(self._candidates, dtype=np.uint32)
+            df = self._df[candidates]
+            cf = self._cf[candidates]
+            scores = np.where(df >= min_df, cf * self._idf(df), 0.0)
+            count = min(k, int(np.count_nonzero(scores)))
+            top = np.argpartition(-scores, count - 1)[:count] if count > 0 else []
+            top = sorted(top, key=lambda i: -scores[i])
+            result = [{
+                'keyword': self._names[candidates[i]],
+                'score': round(float(scores[i]), 2),
+                'documents': int(df[i]),
+                'mentions': int(cf[i])
+            } for i in top]
+            self._top[(k, min_df)] = result
+            return result
+
+    def extract_keywords(self, text, k=5):
+        """
+        Keywords of one text: term frequency in the text x IDF from the index
+
+        Args:
+            text: Raw text
+            k: Number of keywords
+
+        Returns:
+            List of terms, best first
+        """
+        counts = Counter(tokenize(text))
+        if not counts:
+            return []
+        with self._lock:
+            n = len(self._doc_ids)
+            weights = {
+                term: count * (math.log((1 + n) / (1 + self._df_of(term))) + 1)
+                for term, count in counts.items()
+            }
+        return heapq.nlargest(k, weights, key=lambda term: (weights[term], -len(term)))
+
+    def _df_of(self, term):
+        tid = self._terms.get(term)
+        return 0 if tid is None else int(self._df[tid])
+
+    def search(self, query, k=10, kind=None):
+        """
+        Documents best matching a topic or keyword query, by summed TF-IDF over its terms
+
+        Args:
+            query: Query text
+            k: Number of documents
+            kind: Optional document kind filter ('post', 'comment', 'page')
+
+        Returns:
+            List of {'id', 'kind', 'timestamp', 'score'}, best first
+        """
+        with self._lock:
+            n = len(self._doc_ids)
+            tids = [self._terms[t] for t in set(tokenize(query)) if t in self._terms]
+            if not tids or not n:
+                return []
+            docs = np.concatenate([np.frombuffer(self._postings[t], dtype=np.uint32) for t in tids])
+            weights = np.concatenate([
+                np.frombuffer(self._counts[t], dtype=np.uint16) * self._idf(self._df[t]) for t in tids
+            ])
+            scores = np.bincount(docs, weights=weights, minlength=n)
+            if kind is not None:
+                scores[np.frombuffer(self._doc_kinds, dtype=np.int8) != DOCUMENT_KINDS.index(kind)] = 0.0
+            k = min(k, int(np.count_nonzero(scores)))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return [{
+                'id': self._doc_ids[i],
+                'kind': DOCUMENT_KINDS[self._doc_kinds[i]],
+                'timestamp': self._doc_times[i],
+                'score': round(float(scores[i]), 3)
+            } for i in top]
+
+    def stats(self):
+        """Document and vocabulary counts, and whether stored content is still loading"""
+        return {'documents': len(self._doc_ids), 'terms': len(self._names), 'loading': self.loading}
+
+
+_indexes = TTLCache(Config.ACCOUNT_STATE_SIZE, ttl=float('inf'))  # LRU over accounts
+_indexes_lock = threading.Lock()  # Guards creating an account's index, never held while loading
+
+
+def get_keyword_index(account='default'):
+    """
+    Get the keyword index for an account, loading stored content in the background
+
+    The first call returns an empty index with `loading` set while a thread adds the
+    account's stored documents in chunks; queries in the meantime see the documents
+    loaded so far. A load that fails is logged, its partial index is replaced with an
+    empty one, and it is retried with backoff.
+
+    Args:
+        account: Account identifier
+
+    Returns:
+        KeywordIndex instance
+    """
+    index = _indexes.get(account)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(account)
+            if index is None:
+                index = KeywordIndex()
+                index.loading = True
+                _indexes.put(account, index)
+                threading.Thread(
+                    target=_load_index, args=(account, index), name=f'keyword-load-{account}', daemon=True
+                ).start()
+    return index
+
+
+def _load_index(account, index):
+    from services.insight_refresher import get_insight_refresher
+    from services.response_cache import invalidate_responses
+    from storage.db import find_documents
+
+    delay = LOAD_RETRY_DELAY
+    while True:
+        started = time.perf_counter()
+        try:
+            documents = find_documents(account)
+            while True:
+                chunk = list(islice(documents, LOAD_CHUNK))
+                if not chunk:
+                    break
+                index.add_documents(chunk)
+        except Exception as e:
+            logger.warning('Loading the keyword index of %s failed, retrying in %gs: %s', account, delay, e)
+            time.sleep(delay)
+            delay = min(delay * 2, LOAD_RETRY_MAX)
+            with _indexes_lock:
+                if _indexes.get(account) is not index:
+                    return  # Evicted or reset meanwhile; the next use starts a fresh load
+                index = KeywordIndex()
+                index.loading = True
+                _indexes.put(account, index)
+            continue
+
+        index.loading = False
+        logger.info('Loaded keyword index of %s: %d documents in %.1fs',
+                    account, len(index), time.perf_counter() - started)
+        invalidate_responses('/api/ai/keywords')
+        get_insight_refresher().mark_dirty(account, (), topics=True)
+        return
+
+
+def index_documents(account, documents):
+    """
+    Persist documents and add them to the account's keyword index
+
+    Args:
+        account: Account identifier
+        documents: List of dicts with 'id', 'text', 'kind' and 'timestamp'
+
+    Returns:
+        Number of new documents indexed
+    """
+    from storage.db import save_documents
+
+    added = get_keyword_index(account).add_documents(documents)
+    if added:
+        save_documents(account, documents)
+        broadcast('documents', {'account': account, 'documents': documents})
+    return added
+
+
+def _apply_documents(payload):
+    """Add documents another worker indexed, if this worker has the account's index loaded"""
+    from services.insight_refresher import get_insight_refresher
+
+    index = _indexes.get(payload['account'])
+    if index is not None:
+        index.add_documents(payload['documents'])
+    get_insight_refresher().mark_dirty(payload['account'], (), topics=True)
+
+
+bus.on('documents', _apply_documents)
+bus.on_resync(_indexes.clear)
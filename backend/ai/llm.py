@@ -0,0 +1,212 @@
+"""
+LLM Client
+Batched, deduplicated and cached text generation for insights, with a local stub model
+"""
+
+import hashlib
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from config import Config
+from connectors.base import BaseConnector, ConnectorError
+from storage.ttl_cache import TTLCache
+
+# Line of every prompt holding the template text the model rewrites (the stub returns it)
+DRAFT_PREFIX = 'Draft: '
+
+
+class StubModel:
+    """
+    Local stand-in for the LLM API: answers every prompt with its draft text.
+
+    Keeps insight generation deterministic and free in development and tests while
+    exercising the same batching and caching path as the real model.
+    """
+
+    name = 'stub'
+
+    def generate(self, prompts):
+        """
+        Complete a batch of prompts
+
+        Args:
+            prompts: List of prompt strings
+
+        Returns:
+            List of completions aligned with prompts
+        """
+        completions = []
+        for prompt in prompts:
+            drafts = [line[len(DRAFT_PREFIX):] for line in prompt.splitlines() if line.startswith(DRAFT_PREFIX)]
+            completions.append(drafts[-1] if drafts else '')
+        return completions
+
+
+class GeminiModel(BaseConnector):
+    """
+    Gemini generateContent API.
+
+    A batch of prompts is sent as one request asking for a JSON array with one answer per
+    prompt, so k insights cost one round trip and one rate-limiter token.
+    """
+
+    name = 'gemini'
+    BASE_URL = 'https://generativelanguage.googleapis.com/v1beta'
+    MODEL = 'gemini-1.5-flash'
+    RATE_LIMIT = 1.0
+    BURST = 2
+    TIMEOUT = 30
+
+    def auth(self):
+        return {}, {'key': self.credentials}
+
+    def generate(self, prompts):
+        """
+        Complete a batch of prompts in one API call
+
+        Args:
+            prompts: List of prompt strings
+
+        Returns:
+            List of completions aligned with prompts
+
+        Raises:
+            ConnectorError: When the API fails or answers with the wrong shape
+        """
+        numbered = '\n\n'.join(f'### Prompt {i + 1}\n{prompt}' for i, prompt in enumerate(prompts))
+        data = self.request('POST', f'models/{self.MODEL}:generateContent', json={
+            'contents': [{'parts': [{'text': (
+                f'Answer each of the {len(prompts)} prompts below. Reply with a JSON array of '
+                f'{len(prompts)} strings, one answer per prompt, in order.\n\n{numbered}'
+            )}]}],
+            'generationConfig': {'responseMimeType': 'application/json', 'temperature': 0.2}
+        })
+        try:
+            answers = json.loads(data['candidates'][0]['content']['parts'][0]['text'])
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise ConnectorError(f'{self.name}: unreadable response ({e})')
+        if not isinstance(answers, list) or len(answers) != len(prompts):
+            raise ConnectorError(f'{self.name}: expected {len(prompts)} answers')
+        return [str(answer).strip() for answer in answers]
+
+
+class LLMClient:
+    """
+    Front-end to a model that memoizes completions by prompt hash.
+
+    Prompts are deduplicated within a call and against identical prompts already in flight
+    from other requests, cache misses are grouped into batches of batch_size, and batches
+    run on a bounded thread pool. A failed batch yields None for its prompts and is not
+    cached, so callers fall back to their draft text and retry on the next load.
+    """
+
+    def __init__(self, model, batch_size=8, max_concurrency=4, cache_size=10000, cache_ttl=6 * 3600):
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix='llm')
+        self._cache = TTLCache(cache_size, cache_ttl)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompts = 0
+        self.failures = 0
+
+    @staticmethod
+    def prompt_key(prompt):
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def complete(self, prompts):
+        """
+        Complete prompts, serving repeats from the cache
+
+        Args:
+            prompts: List of prompt strings
+
+        Returns:
+            List of completions aligned with prompts (None where the model failed)
+        """
+        keys = [self.prompt_key(prompt) for prompt in prompts]
+        futures = {}
+        owned = {}
+        with self._lock:
+            for key, prompt in zip(keys, prompts):
+                if key in futures:
+                    continue
+                cached = self._cache.get(key)
+                if cached is not None:
+                    futures[key] = cached
+                elif key in self._inflight:
+                    futures[key] = self._inflight[key]
+                else:
+                    futures[key] = self._inflight[key] = Future()
+                    owned[key] = prompt
+
+        missing = list(owned.items())
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        for batch in batches:
+            self._pool.submit(self._run_batch, batch)
+
+        results = {}
+        for key, value in futures.items():
+            results[key] = value.result() if isinstance(value, Future) else value
+        return [results[key] for key in keys]
+
+    def _run_batch(self, batch):
+        try:
+            completions = self.model.generate([prompt for _, prompt in batch])
+            failed = 0
+        except Exception:
+            completions = [None] * len(batch)
+            failed = 1
+
+        with self._lock:
+            self.failures += failed
+            self.calls += 1
+            self.prompts += len(batch)
+            for (key, _), completion in zip(batch, completions):
+                if completion:
+                    self._cache.put(key, completion)
+                self._inflight.pop(key).set_result(completion or None)
+
+    def stats(self):
+        """Cache counters plus model calls, prompts sent and failed batches"""
+        return dict(
+            self._cache.stats(),
+            model=self.model.name,
+            calls=self.calls,
+            prompts=self.prompts,
+            failures=self.failures
+        )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """
+    Get the process-wide LLM client
+
+    The Gemini API is used when INSIGHT_MODEL is 'gemini' and GEMINI_API_KEY is set;
+    otherwise the local stub model answers.
+
+    Returns:
+        LLMClient instance
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if Config.INSIGHT_MODEL == 'gemini' and Config.GEMINI_API_KEY:
+                    model = GeminiModel(credentials=Config.GEMINI_API_KEY)
+                else:
+                    model = StubModel()
+                _client = LLMClient(
+                    model,
+                    batch_size=Config.LLM_BATCH_SIZE,
+                    max_concurrency=Config.LLM_MAX_CONCURRENCY,
+                    cache_size=Config.LLM_CACHE_SIZE,
+                    cache_ttl=Config.LLM_CACHE_TTL
+                )
+    return _client
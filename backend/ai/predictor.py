@@ -1,118 +1,481 @@
 """
 AI Prediction Module
-Uses Prophet and scikit-learn for predictive analytics
+Uses a batched NumPy Holt-Winters engine for predictive analytics
 """
 
-import random
+import math
+import threading
 from datetime import datetime, timedelta
 
-def predict_engagement(metric_type='engagement', time_horizon=7):
+import numpy as np
+
+from ai.anomalies import count_anomalies
+from ai.executor import run_cpu
+from ai.forecaster import (
+    concat_states, fit_holt_winters, forecast_holt_winters, select_series, update_holt_winters
+)
+from config import Config
+from storage.metric_store import bucket_start, get_metric_store, to_epoch_seconds
+from storage.ttl_cache import TTLCache
+
+# Days of daily history used to fit forecasting models
+HISTORY_DAYS = 120
+
+# Relative trend (per day, as a fraction of level) below which a series counts as stable
+TREND_THRESHOLD = 0.002
+
+# Week-over-week change (as a fraction) below which the forecast counts as 'maintain'
+WEEKLY_CHANGE_THRESHOLD = 0.02
+
+# Per-post engagement metric per platform; platforms without one use the account-wide series
+ENGAGEMENT_METRICS = {
+    'twitter': 'twitter_engagements'
+}
+DEFAULT_ENGAGEMENT_METRIC = 'engagement'
+
+# Posts a platform needs before its own history is trusted over the account-wide series
+MIN_POSTING_SAMPLES = 50
+
+# Longest forecast horizon accepted, in days
+MAX_HORIZON_DAYS = 365
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Finished forecast payloads keyed by (account, metric, horizon, series fingerprint)
+_forecast_cache = TTLCache(Config.FORECAST_CACHE_SIZE, Config.FORECAST_CACHE_TTL)
+
+# Fitted model state per (account, metric), used to warm-start when new days land
+_model_cache = TTLCache(Config.MODEL_CACHE_SIZE, Config.MODEL_CACHE_TTL)
+
+_fit_counters = {'warm_starts': 0, 'cold_fits': 0}
+_fit_counters_lock = threading.Lock()
+
+def load_daily_history(metrics, account='default', days=HISTORY_DAYS):
     """
-    Predict future engagement metrics
+    Load complete days of history for several metrics as one dense matrix
     
     Args:
-        metric_type: Type of metric to predict
+        metrics: List of metric names
+        account: Account identifier
+        days: Number of complete days to load (today is excluded)
+        
+    Returns:
+        Tuple of (day_starts, values) with one row per metric; days without data are NaN
+    """
+    today = bucket_start(to_epoch_seconds(datetime.utcnow()), 'day')
+    start = today - days * 86400
+    buckets, values = get_metric_store(account).resample(metrics, start, today, 'day')
+    
+    dense = np.full((len(metrics), days), np.nan)
+    dense[:, (buckets - start) // 86400] = values
+    return start + np.arange(days, dtype=np.int64) * 86400, dense
+
+def _trend_label(model, index, labels):
+    """Pick (up, down, flat) label from the fitted trend relative to the level"""
+    relative_trend = model['trend'][index] / max(abs(model['level'][index]), 1e-9)
+    if relative_trend > TREND_THRESHOLD:
+        return labels[0]
+    if relative_trend < -TREND_THRESHOLD:
+        return labels[1]
+    return labels[2]
+
+def _normal_cdf(z):
+    return 0.5 * (1 + math.erf(z / math.sqrt(2)))
+
+def format_forecast(metric_type, model, index, time_horizon, forecast=None):
+    """
+    Build the prediction payload for one fitted series
+    
+    Args:
+        metric_type: Metric name
+        model: Model state from train_engagement_model
+        index: Row of the series within the model
         time_horizon: Number of days to predict ahead
+        forecast: Optional forecast_holt_winters output covering time_horizon + 1 steps
         
     Returns:
         Dictionary with prediction data
     """
-    # Generate sample predictions (replace with actual Prophet model)
-    predictions = []
-    base_value = random.randint(1000, 5000)
+    # History ends yesterday, so step 0 is today and predictions start tomorrow
+    if forecast is None:
+        forecast = forecast_holt_winters(model, time_horizon + 1)
+    mean, lower, upper = (np.maximum(a[index, 1:time_horizon + 1], 0) for a in forecast[:3])
+    confidence = forecast[3][index, 1:time_horizon + 1]
     
+    predictions = []
     for i in range(time_horizon):
         date = datetime.utcnow() + timedelta(days=i+1)
-        variation = random.uniform(-0.1, 0.15)
-        predicted_value = int(base_value * (1 + variation))
-        confidence = round(random.uniform(0.75, 0.95), 2)
-        
         predictions.append({
             'date': date.strftime('%Y-%m-%d'),
-            'predicted_value': predicted_value,
-            'confidence': confidence,
-            'lower_bound': int(predicted_value * 0.85),
-            'upper_bound': int(predicted_value * 1.15)
+            'predicted_value': round(float(mean[i]), 2),
+            'confidence': round(float(confidence[i]), 2),
+            'lower_bound': round(float(lower[i]), 2),
+            'upper_bound': round(float(upper[i]), 2)
         })
     
     return {
         'metric_type': metric_type,
         'predictions': predictions,
-        'model_accuracy': 0.87,
-        'trend': random.choice(['increasing', 'decreasing', 'stable'])
+        'model_accuracy': round(float(max(0.0, 1 - model['mape'][index])), 2),
+        'trend': _trend_label(model, index, ('increasing', 'decreasing', 'stable'))
     }
 
-def predict_trend(metric='traffic'):
+def format_trend(model, index, history, forecast, anomalies=0):
     """
-    Analyze and predict trends
+    Build the trend analysis payload for one fitted series
     
     Args:
-        metric: Metric to analyze
+        model: Model state from train_engagement_model
+        index: Row of the series within the model
+        history: Daily history of the series (ending yesterday)
+        forecast: forecast_holt_winters output covering at least 8 steps
+        anomalies: Anomalies detected in the series over the last week
         
     Returns:
         Trend analysis data
     """
-    trends = {
-        'current_trend': random.choice(['upward', 'downward', 'stable']),
-        'strength': round(random.uniform(0.6, 0.95), 2),
+    sigma = float(model['sigma'][index])
+    observed = history[~np.isnan(history)]
+    variance = float(np.var(observed)) if observed.size > 1 else 0.0
+    strength = min(max(1 - sigma ** 2 / variance, 0.0), 1.0) if variance > 0 else 0.0
+    
+    # Compare the coming week against the last observed week
+    last_week = float(np.nanmean(history[-7:]))
+    change = float(forecast[0][index, 1:8].mean()) - last_week
+    band = WEEKLY_CHANGE_THRESHOLD * abs(last_week)
+    error = max(sigma * math.sqrt(2 / 7), 1e-9)
+    if change > band:
+        next_week, probability = 'increase', _normal_cdf(change / error)
+    elif change < -band:
+        next_week, probability = 'decrease', _normal_cdf(-change / error)
+    else:
+        next_week, probability = 'maintain', _normal_cdf((band - abs(change)) / error)
+    
+    # Map seasonal slots back to weekdays: slot `phase` is today
+    season = model['season'][index]
+    m = season.shape[0]
+    weekly = m == 7 and float(season.std()) > sigma
+    peak_days, low_days = [], []
+    if m == 7:
+        today = int(bucket_start(to_epoch_seconds(datetime.utcnow()), 'day'))
+        today_weekday = (today // 86400 + 3) % 7
+        phase = int(model['phase'][index])
+        weekdays = [WEEKDAYS[(today_weekday + (slot - phase) % m) % 7] for slot in range(m)]
+        ranked = np.argsort(season)
+        peak_days = [weekdays[slot] for slot in ranked[::-1][:2]]
+        low_days = [weekdays[slot] for slot in ranked[:2]]
+    
+    return {
+        'current_trend': _trend_label(model, index, ('upward', 'downward', 'stable')),
+        'strength': round(strength, 2),
         'forecast': {
-            'next_week': random.choice(['increase', 'decrease', 'maintain']),
-            'probability': round(random.uniform(0.7, 0.95), 2)
+            'next_week': next_week,
+            'probability': round(min(probability, 0.99), 2)
         },
-        'anomalies_detected': random.randint(0, 3),
+        'anomalies_detected': anomalies,
         'seasonality': {
-            'weekly_pattern': True,
-            'peak_days': ['Wednesday', 'Thursday'],
-            'low_days': ['Saturday', 'Sunday']
+            'weekly_pattern': weekly,
+            'peak_days': peak_days,
+            'low_days': low_days
         }
     }
+
+def series_fingerprint(account='default'):
+    """
+    Fingerprint of an account's data: changes whenever points are appended or revised
+    
+    Args:
+        account: Account identifier
+        
+    Returns:
+        Hashable fingerprint tuple
+    """
+    store = get_metric_store(account)
+    today = bucket_start(to_epoch_seconds(datetime.utcnow()), 'day')
+    return (int(today), id(store), store.version)
+
+def get_fitted_models(metrics, account='default', history=None):
+    """
+    Get fitted models for several metrics, reusing cached state where possible
+    
+    Metrics with no cached model are fitted together in one batched call. Cached models
+    whose history is behind by whole days are warm-started with just the new days; models
+    fitted before stored history was revised are refitted from scratch.
+    
+    Args:
+        metrics: List of metric names
+        account: Account identifier
+        history: Optional load_daily_history values aligned with metrics, to avoid reloading
+        
+    Returns:
+        Batched model state with one series per metric, in order
+    """
+    today = int(bucket_start(to_epoch_seconds(datetime.utcnow()), 'day'))
+    store = get_metric_store(account)
+    revision = (id(store), store.revisions)
+    models = {}
+    cold = []
+    stale = {}
+    
+    for metric in dict.fromkeys(metrics):
+        entry = _model_cache.get((account, metric))
+        if entry is None or entry['revision'] != revision or today - entry['end'] > HISTORY_DAYS * 86400:
+            cold.append(metric)
+        elif entry['end'] == today:
+            models[metric] = entry['model']
+        else:
+            stale.setdefault(entry['end'], []).append((metric, entry['model']))
+    
+    if cold:
+        if history is None:
+            _, cold_history = load_daily_history(cold, account)
+        else:
+            cold_history = history[[metrics.index(metric) for metric in cold]]
+        batch = run_cpu(train_engagement_model, cold_history)
+        with _fit_counters_lock:
+            _fit_counters['cold_fits'] += len(cold)
+        for row, metric in enumerate(cold):
+            models[metric] = select_series(batch, row)
+    
+    for end, group in stale.items():
+        names = [metric for metric, _ in group]
+        _, new_days = load_daily_history(names, account, (today - end) // 86400)
+        batch = run_cpu(update_holt_winters, concat_states([model for _, model in group]), new_days)
+        with _fit_counters_lock:
+            _fit_counters['warm_starts'] += len(names)
+        for row, metric in enumerate(names):
+            models[metric] = select_series(batch, row)
+    
+    for metric in cold + [m for group in stale.values() for m, _ in group]:
+        _model_cache.put((account, metric), {'model': models[metric], 'end': today, 'revision': revision})
+    
+    return concat_states([models[metric] for metric in metrics])
+
+def parse_horizon(time_horizon):
+    """
+    Validate a forecast horizon
+
+    Args:
+        time_horizon: Requested days ahead
+
+    Returns:
+        Horizon as an int
+
+    Raises:
+        ValueError: Unless it is a whole number of days from 1 to MAX_HORIZON_DAYS
+    """
+    try:
+        horizon = int(time_horizon)
+    except (TypeError, ValueError):
+        horizon = None
+    if horizon is None or isinstance(time_horizon, bool) or not 1 <= horizon <= MAX_HORIZON_DAYS:
+        raise ValueError(f'time_horizon must be a number of days from 1 to {MAX_HORIZON_DAYS}')
+    return horizon
+
+def predict_engagement(metric_type='engagement', time_horizon=7, account='default'):
+    """
+    Predict future engagement metrics
+    
+    Args:
+        metric_type: Type of metric to predict
+        time_horizon: Number of days to predict ahead
+        account: Account whose history is used
+        
+    Returns:
+        Dictionary with prediction data
+
+    Raises:
+        ValueError: If time_horizon is outside 1..MAX_HORIZON_DAYS
+    """
+    time_horizon = parse_horizon(time_horizon)
+    key = (account, metric_type, time_horizon, series_fingerprint(account))
+    prediction = _forecast_cache.get(key)
+    if prediction is None:
+        model = get_fitted_models([metric_type], account)
+        prediction = format_forecast(metric_type, model, 0, time_horizon)
+        _forecast_cache.put(key, prediction)
+    return prediction
+
+def get_cache_stats():
+    """
+    Get forecast and model cache counters
+    
+    Returns:
+        Dictionary of cache statistics
+    """
+    with _fit_counters_lock:
+        fits = dict(_fit_counters)
+    return {
+        'forecasts': _forecast_cache.stats(),
+        'models': dict(_model_cache.stats(), **fits)
+    }
+
+def predict_trend(metric='traffic', account='default'):
+    """
+    Analyze and predict trends
+    
+    Args:
+        metric: Metric to analyze
+        account: Account whose history is used
+        
+    Returns:
+        Trend analysis data
+    """
+    _, history = load_daily_history([metric], account)
+    model = get_fitted_models([metric], account, history)
+    return format_trend(
+        model, 0, history[0], forecast_holt_winters(model, 8), count_anomalies(metric, account)
+    )
+
+def predict_batch(jobs, account='default'):
+    """
+    Run many prediction and trend jobs together
+    
+    History for every distinct metric is loaded once, models for all of them are fitted
+    (or fetched from cache) in one batched call and forecast once at the longest horizon.
     
-    return trends
+    Args:
+        jobs: List of {'type': 'predict'|'trend', 'metric_type'/'metric', 'time_horizon'}
+        account: Account whose history is used
+        
+    Returns:
+        List of per-job results in the same order as jobs
+    """
+    known = set(get_metric_store(account).metrics)
+    fingerprint = series_fingerprint(account)
+    results = [None] * len(jobs)
+    pending = []
+    
+    for i, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            results[i] = {'success': False, 'error': 'Each job must be an object'}
+            continue
+        kind = job.get('type', 'predict')
+        if kind not in ('predict', 'trend'):
+            results[i] = {'success': False, 'type': kind, 'error': f'Unsupported job type: {kind}'}
+            continue
+        
+        if kind == 'predict':
+            metric = job.get('metric_type', job.get('metric', 'engagement'))
+            try:
+                horizon = parse_horizon(job.get('time_horizon', 7))
+            except ValueError as e:
+                results[i] = {'success': False, 'type': kind, 'metric_type': metric, 'error': str(e)}
+                continue
+            result = {'success': True, 'type': kind, 'metric_type': metric, 'time_horizon': horizon}
+        else:
+            metric = job.get('metric', job.get('metric_type', 'traffic'))
+            horizon = 0
+            result = {'success': True, 'type': kind, 'metric': metric}
+        
+        if metric not in known:
+            results[i] = dict(result, success=False, error=f'Unknown metric: {metric}')
+            continue
+        
+        if kind == 'predict':
+            cached = _forecast_cache.get((account, metric, horizon, fingerprint))
+            if cached is not None:
+                results[i] = dict(result, prediction=cached)
+                continue
+        
+        results[i] = result
+        pending.append((i, kind, metric, horizon))
+    
+    if pending:
+        metrics = list(dict.fromkeys(metric for _, _, metric, _ in pending))
+        _, history = load_daily_history(metrics, account)
+        model = get_fitted_models(metrics, account, history)
+        forecast = forecast_holt_winters(model, max(max(job[3] for job in pending), 7) + 1)
+        
+        for i, kind, metric, horizon in pending:
+            row = metrics.index(metric)
+            if kind == 'predict':
+                prediction = format_forecast(metric, model, row, horizon, forecast)
+                _forecast_cache.put((account, metric, horizon, fingerprint), prediction)
+                results[i]['prediction'] = prediction
+            else:
+                results[i]['trend'] = format_trend(
+                    model, row, history[row], forecast, count_anomalies(metric, account)
+                )
+    
+    return results
 
-def predict_best_posting_time(platform='all'):
+def predict_best_posting_time(platform='all', account='default'):
     """
-    Predict optimal posting times based on historical engagement
+    Predict optimal posting times from the account's engagement history, binned by day
+    of week and hour (UTC)
     
     Args:
         platform: Social media platform
+        account: Account identifier
         
     Returns:
-        Best posting times with scores
+        Best posting slots over the week and for today, plus the weekday pattern
     """
-    times = []
-    hours = [9, 12, 13, 15, 18, 19, 21]
+    store = get_metric_store(account)
+    metric = ENGAGEMENT_METRICS.get(platform)
+    if metric not in store.metrics or \
+            store.weekly_profile([metric], 'count').sum() < MIN_POSTING_SAMPLES:
+        metric = DEFAULT_ENGAGEMENT_METRIC
+    counts = store.weekly_profile([metric], 'count')[0]
+    sums = store.weekly_profile([metric], 'sum')[0]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, 0.0)
+        daily = np.where(counts.sum(axis=1) > 0, sums.sum(axis=1) / counts.sum(axis=1), 0.0)
+    peak = means.max() or 1.0
+    scores = means / peak
     
-    for hour in hours:
-        score = round(random.uniform(0.65, 0.95), 2)
-        times.append({
+    def slot(day, hour):
+        return {
+            'day': WEEKDAYS[day],
             'time': f'{hour:02d}:00',
-            'score': score,
-            'expected_reach': random.randint(5000, 20000)
-        })
+            'score': round(float(scores[day, hour]), 2),
+            'expected_engagement': round(float(means[day, hour]), 2)
+        }
     
-    times.sort(key=lambda x: x['score'], reverse=True)
+    ranked = np.argsort(-scores, axis=None, kind='stable')[:3]
+    today = int((to_epoch_seconds(datetime.utcnow()) // 86400 + 3) % 7)
+    today_hours = np.argsort(-scores[today], kind='stable')[:3]
     
     return {
         'platform': platform,
-        'recommended_times': times[:3],
+        'metric': metric,
+        'samples': int(counts.sum()),
+        'recommended_times': [slot(*divmod(int(i), 24)) for i in ranked],
+        'today': [
+            dict(slot(today, int(hour)), reason=f'{int(round(scores[today, hour] * 100))}% of peak engagement')
+            for hour in today_hours
+        ],
+        'weekly_pattern': {
+            day: round(float(value), 2) for day, value in zip(WEEKDAYS, daily / (daily.max() or 1.0))
+        },
         'timezone': 'UTC'
     }
 
-# Placeholder for Prophet model initialization
-def initialize_prophet_model():
+def initialize_prophet_model(season_length=7):
     """
-    Initialize Prophet model for time series forecasting
-    Note: Implement actual Prophet model in production
+    Initialize the forecasting model configuration
+    Note: Holt-Winters replaces Prophet so thousands of series fit in one batched call
+    
+    Args:
+        season_length: Seasonal period in observations
+        
+    Returns:
+        Model configuration
     """
-    pass
+    return {'season_length': season_length}
 
-# Placeholder for ML model training
-def train_engagement_model(historical_data):
+def train_engagement_model(historical_data, config=None):
     """
-    Train ML model on historical engagement data
+    Train forecasting models on historical engagement data
     
     Args:
-        historical_data: Historical metrics data
+        historical_data: Array-like of shape (n_series, n_days) or (n_days,)
+        config: Model configuration from initialize_prophet_model
+        
+    Returns:
+        Fitted model state with one entry per series
     """
-    pass
-
+    config = config or initialize_prophet_model()
+    return fit_holt_winters(historical_data, config['season_length'])
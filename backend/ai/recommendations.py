@@ -3,157 +3,624 @@ AI Recommendations Engine
 Provides actionable recommendations based on data analysis
 """
 
-import random
-from datetime import datetime
+import heapq
+import json
+import logging
+import time
 
-def get_recommendations(category='all'):
+import numpy as np
+
+from ai.trends import get_metric_tracker, metric_growth, peek_metric_tracker
+from config import Config
+from storage.redis_client import get_redis
+from storage.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Ordinal levels shared by priority, impact and effort
+LEVELS = {'low': 1, 'medium': 2, 'high': 3}
+
+# Goals a recommendation can serve and a user can weight
+GOALS = ('traffic', 'engagement', 'conversions', 'visibility', 'efficiency')
+
+# Metrics where a higher value is worse
+LOWER_IS_BETTER = frozenset(['search_position'])
+
+# Weights of the score terms: stated priority, impact per unit of effort, fit with the
+# user's goals, and need (how much the metrics it moves have declined lately)
+PRIORITY_WEIGHT = 1.0
+VALUE_WEIGHT = 1.0
+GOAL_WEIGHT = 2.0
+NEED_WEIGHT = 2.0
+
+# Recommendations returned when no k is given
+DEFAULT_TOP_K = 10
+
+# Cost of each effort level and value of each impact level (USD), indexed by level code
+EFFORT_COST = np.array([0.0, 100.0, 500.0, 1500.0])
+IMPACT_VALUE = np.array([0.0, 300.0, 1000.0, 3000.0])
+
+# Extra value, as a share of the base, when every metric a recommendation moves is in
+# sharp decline for the account
+NEED_VALUE_LIFT = 1.0
+
+# Weeks over which the estimated value accrues, for payback periods
+VALUE_HORIZON_WEEKS = 8
+
+# Weeks of work per effort level, indexed by level code, for plan completion estimates
+EFFORT_WEEKS = np.array([0.0, 0.5, 1.0, 3.0])
+
+# Action plan sections, indexed by RecommendationIndex.bucket
+PLAN_BUCKETS = ('immediate_actions', 'short_term', 'long_term')
+
+# Redis key prefix of cached plan rows, shared by every worker
+PLAN_KEY_PREFIX = 'flowmind:plan:'
+
+# Fields used for scoring only, left out of API responses
+INTERNAL_FIELDS = ('goals', 'metrics')
+
+CATALOGUE = {
+    'seo': [
+        {
+            'id': 'seo_1',
+            'title': 'Update Title Tags',
+            'description': 'Optimize title tags for top 5 pages to include trending keywords',
+            'priority': 'high',
+            'impact': 'High',
+            'effort': 'Low',
+            'estimated_improvement': '+15% CTR',
+            'goals': {'traffic': 1.0, 'visibility': 1.0},
+            'metrics': ['search_position', 'search_clicks', 'traffic'],
+            'action_items': [
+                'Review current title tags',
+                'Research trending keywords',
+                'Update and A/B test'
+            ]
+        },
+        {
+            'id': 'seo_2',
+            'title': 'Build Backlinks',
+            'description': 'Reach out to 10 high-authority sites in your niche for backlink opportunities',
+            'priority': 'medium',
+            'impact': 'High',
+            'effort': 'High',
+            'estimated_improvement': '+8 Domain Authority',
+            'goals': {'visibility': 1.0, 'traffic': 0.5},
+            'metrics': ['search_position', 'search_impressions'],
+            'action_items': [
+                'Identify target websites',
+                'Create outreach email template',
+                'Track responses'
+            ]
+        }
+    ],
+    'social': [
+        {
+            'id': 'social_1',
+            'title': 'Increase Posting Frequency',
+            'description': 'Data shows posting 2x per day increases engagement by 40%',
+            'priority': 'high',
+            'impact': 'High',
+            'effort': 'Medium',
+            'estimated_improvement': '+40% engagement',
+            'goals': {'engagement': 1.0, 'visibility': 0.5},
+            'metrics': ['engagement', 'social', 'twitter_engagements'],
+            'action_items': [
+                'Create content calendar',
+                'Prepare 2 weeks of content',
+                'Use auto-scheduling'
+            ]
+        },
+        {
+            'id': 'social_2',
+            'title': 'Leverage Video Content',
+            'description': 'Video posts generate 3x more engagement than static images',
+            'priority': 'medium',
+            'impact': 'High',
+            'effort': 'High',
+            'estimated_improvement': '+200% reach',
+            'goals': {'engagement': 1.0, 'visibility': 1.0},
+            'metrics': ['engagement', 'social', 'youtube_views'],
+            'action_items': [
+                'Plan video content strategy',
+                'Create short-form videos',
+                'Test on multiple platforms'
+            ]
+        }
+    ],
+    'content': [
+        {
+            'id': 'content_1',
+            'title': 'Create Pillar Content',
+            'description': 'Build comprehensive guide on "Marketing Automation 2025"',
+            'priority': 'high',
+            'impact': 'High',
+            'effort': 'High',
+            'estimated_improvement': '+5K monthly visitors',
+            'goals': {'traffic': 1.0, 'conversions': 0.5},
+            'metrics': ['traffic', 'search_clicks'],
+            'action_items': [
+                'Research topic thoroughly',
+                'Create detailed outline',
+                'Write and optimize content'
+            ]
+        },
+        {
+            'id': 'content_2',
+            'title': 'Repurpose Top Content',
+            'description': 'Convert your best blog posts into infographics and videos',
+            'priority': 'medium',
+            'impact': 'Medium',
+            'effort': 'Low',
+            'estimated_improvement': '+30% content reach',
+            'goals': {'traffic': 0.5, 'engagement': 0.5, 'efficiency': 1.0},
+            'metrics': ['traffic', 'social'],
+            'action_items': [
+                'Identify top 5 performing posts',
+                'Design infographics',
+                'Create short video summaries'
+            ]
+        }
+    ],
+    'automation': [
+        {
+            'id': 'auto_1',
+            'title': 'Set Up Engagement Alerts',
+            'description': 'Get notified when engagement drops below threshold',
+            'priority': 'high',
+            'impact': 'Medium',
+            'effort': 'Low',
+            'estimated_improvement': 'Faster response time',
+            'goals': {'efficiency': 1.0, 'engagement': 0.5},
+            'metrics': ['engagement'],
+            'action_items': [
+                'Define engagement thresholds',
+                'Set up automated alerts',
+                'Create response playbook'
+            ]
+        }
+    ]
+}
+
+
+class RecommendationIndex:
+    """
+    Recommendation catalogue encoded for vectorized scoring.
+
+    Built once: every recommendation gets ordinal priority/impact/effort codes, a row in a
+    goal-affinity matrix and a row in a metric matrix (which metrics it moves), plus
+    position lists by category, effort and impact for candidate selection. Scoring an
+    account is two matrix-vector products over the candidates, and the top k come off a
+    heap, so cost grows linearly with the catalogue and only k log k with the result.
+    """
+
+    def __init__(self, recommendations):
+        self.items = [
+            {key: value for key, value in rec.items() if key not in INTERNAL_FIELDS}
+            for rec in recommendations
+        ]
+        self.metric_names = sorted({m for rec in recommendations for m in rec.get('metrics', ())})
+        metric_column = {metric: i for i, metric in enumerate(self.metric_names)}
+
+        n = len(recommendations)
+        self.priority = np.array([LEVELS.get(str(rec.get('priority', 'medium')).lower(), 2) for rec in recommendations])
+        self.impact = np.array([LEVELS.get(str(rec.get('impact', 'medium')).lower(), 2) for rec in recommendations])
+        self.effort = np.array([LEVELS.get(str(rec.get('effort', 'medium')).lower(), 2) for rec in recommendations])
+        self.goals = np.zeros((n, len(GOALS)))
+        self.metrics = np.zeros((n, len(self.metric_names)))
+        self.by_category, self.by_effort, self.by_impact = {}, {}, {}
+        for i, rec in enumerate(recommendations):
+            for j, goal in enumerate(GOALS):
+                self.goals[i, j] = float(rec.get('goals', {}).get(goal, 0.0))
+            for metric in rec.get('metrics', ()):
+                self.metrics[i, metric_column[metric]] = 1.0
+            self.by_category.setdefault(rec.get('category', 'other'), []).append(i)
+            self.by_effort.setdefault(int(self.effort[i]), []).append(i)
+            self.by_impact.setdefault(int(self.impact[i]), []).append(i)
+        self.by_category = {key: np.array(rows) for key, rows in self.by_category.items()}
+        self.by_effort = {key: np.array(rows) for key, rows in self.by_effort.items()}
+        self.by_impact = {key: np.array(rows) for key, rows in self.by_impact.items()}
+
+        # Static part of the score, shared by every account
+        self.base = PRIORITY_WEIGHT * self.priority / 3 + VALUE_WEIGHT * self.impact / (3 * self.effort)
+        # Plan section: immediate for high priority at low effort, short term for the rest
+        # of high priority and medium effort, long term otherwise
+        high = self.priority == 3
+        self.bucket = np.where(high & (self.effort == 1), 0, np.where(high | (self.effort == 2), 1, 2))
+
+    @classmethod
+    def from_catalogue(cls, catalogue):
+        """Build from a {category: [recommendation, ...]} mapping"""
+        return cls([dict(rec, category=category) for category, recs in catalogue.items() for rec in recs])
+
+    def __len__(self):
+        return len(self.items)
+
+    def candidates(self, category='all', max_effort=None, min_impact=None):
+        """
+        Positions of recommendations matching the filters, read from the indexes
+
+        Args:
+            category: Category name or 'all'
+            max_effort: Optional highest effort level ('low', 'medium', 'high')
+            min_impact: Optional lowest impact level
+
+        Returns:
+            Sorted array of positions
+        """
+        if category == 'all':
+            rows = np.arange(len(self.items))
+        else:
+            rows = self.by_category.get(category, np.empty(0, dtype=np.int64))
+        if max_effort is not None:
+            allowed = [self.by_effort[level] for level in self.by_effort if level <= LEVELS[max_effort]]
+            rows = np.intersect1d(rows, np.concatenate(allowed) if allowed else [])
+        if min_impact is not None:
+            allowed = [self.by_impact[level] for level in self.by_impact if level >= LEVELS[min_impact]]
+            rows = np.intersect1d(rows, np.concatenate(allowed) if allowed else [])
+        return rows.astype(np.int64)
+
+    def score(self, rows, goal_weights=None, needs=None):
+        """
+        Score candidate recommendations
+
+        Args:
+            rows: Candidate positions
+            goal_weights: Array aligned with GOALS (None for no goal preference)
+            needs: Array aligned with metric_names, 0 (healthy) to 1 (sharp decline)
+
+        Returns:
+            Array of scores aligned with rows
+        """
+        scores = self.base[rows].copy()
+        if goal_weights is not None and goal_weights.any():
+            scores += GOAL_WEIGHT * (self.goals[rows] @ (goal_weights / goal_weights.sum()))
+        if needs is not None and needs.any():
+            counts = np.maximum(self.metrics[rows].sum(axis=1), 1.0)
+            scores += NEED_WEIGHT * (self.metrics[rows] @ needs) / counts
+        return scores
+
+    def top(self, k, rows, goal_weights=None, needs=None):
+        """
+        The k best candidates, best first
+
+        Returns:
+            List of recommendation dicts with their score
+        """
+        scores = self.score(rows, goal_weights, needs)
+        # Negated positions break ties in catalogue order
+        best = heapq.nlargest(k, zip(scores.tolist(), (-rows).tolist()))
+        return [dict(self.items[-negated], score=round(score, 3)) for score, negated in best]
+
+    def needs_from_growth(self, growth):
+        """
+        Need per metric: relative decline (rise, for lower-is-better metrics), clipped to [0, 1]
+
+        Args:
+            growth: Dictionary of metric -> relative growth
+
+        Returns:
+            Array aligned with metric_names
+        """
+        decline = np.array([
+            growth.get(metric, 0.0) if metric in LOWER_IS_BETTER else -growth.get(metric, 0.0)
+            for metric in self.metric_names
+        ])
+        return np.clip(decline, 0.0, 1.0)
+
+    def account_needs(self, account='default', now=None):
+        """
+        Need per metric from the account's streaming trends (fast-window mean against the
+        slow one)
+
+        Returns:
+            Array aligned with metric_names
+        """
+        tracker = get_metric_tracker(account)
+        return self.needs_from_growth(metric_growth(tracker, time.time() if now is None else now))
+
+    def relevance(self, needs):
+        """
+        Mean need over the metrics each recommendation moves, for many accounts at once
+
+        Args:
+            needs: Array (accounts, metrics) aligned with metric_names
+
+        Returns:
+            Array (accounts, recommendations)
+        """
+        counts = np.maximum(self.metrics.sum(axis=1), 1.0)
+        return (np.atleast_2d(needs) @ self.metrics.T) / counts
+
+
+_index = RecommendationIndex.from_catalogue(CATALOGUE)
+_catalogue_by_id = {rec['id']: rec for recs in CATALOGUE.values() for rec in recs}
+
+
+def goal_weights(user_goals):
     """
-    Get AI-powered recommendations
+    Goal weights aligned with GOALS
+
+    Args:
+        user_goals: None, a comma-separated string or list of goal names, or a
+            {goal: weight} dict (unknown goals are ignored)
+
+    Returns:
+        NumPy array of weights
+    """
+    if not user_goals:
+        return np.zeros(len(GOALS))
+    if isinstance(user_goals, str):
+        user_goals = [goal.strip() for goal in user_goals.split(',')]
+    if not isinstance(user_goals, dict):
+        user_goals = {goal: 1.0 for goal in user_goals}
+    return np.array([max(float(user_goals.get(goal, 0.0)), 0.0) for goal in GOALS])
+
+def get_recommendations(category='all', account='default', user_goals=None, k=None, max_effort=None):
+    """
+    Get AI-powered recommendations ranked for an account
     
     Args:
-        category: Category of recommendations (all, seo, social, content)
+        category: Category of recommendations (all, seo, social, content, automation)
+        account: Account whose metric trends weight the ranking
+        user_goals: Goals to favour (see goal_weights)
+        k: Number of recommendations (defaults to DEFAULT_TOP_K)
+        max_effort: Optional highest effort level ('low', 'medium', 'high')
         
     Returns:
-        List of recommendations
-    """
-    all_recommendations = {
-        'seo': [
-            {
-                'id': 'seo_1',
-                'title': 'Update Title Tags',
-                'description': 'Optimize title tags for top 5 pages to include trending keywords',
-                'priority': 'high',
-                'impact': 'High',
-                'effort': 'Low',
-                'estimated_improvement': '+15% CTR',
-                'action_items': [
-                    'Review current title tags',
-                    'Research trending keywords',
-                    'Update and A/B test'
-                ]
-            },
-            {
-                'id': 'seo_2',
-                'title': 'Build Backlinks',
-                'description': 'Reach out to 10 high-authority sites in your niche for backlink opportunities',
-                'priority': 'medium',
-                'impact': 'High',
-                'effort': 'High',
-                'estimated_improvement': '+8 Domain Authority',
-                'action_items': [
-                    'Identify target websites',
-                    'Create outreach email template',
-                    'Track responses'
-                ]
-            }
-        ],
-        'social': [
-            {
-                'id': 'social_1',
-                'title': 'Increase Posting Frequency',
-                'description': 'Data shows posting 2x per day increases engagement by 40%',
-                'priority': 'high',
-                'impact': 'High',
-                'effort': 'Medium',
-                'estimated_improvement': '+40% engagement',
-                'action_items': [
-                    'Create content calendar',
-                    'Prepare 2 weeks of content',
-                    'Use auto-scheduling'
-                ]
-            },
-            {
-                'id': 'social_2',
-                'title': 'Leverage Video Content',
-                'description': 'Video posts generate 3x more engagement than static images',
-                'priority': 'medium',
-                'impact': 'High',
-                'effort': 'High',
-                'estimated_improvement': '+200% reach',
-                'action_items': [
-                    'Plan video content strategy',
-                    'Create short-form videos',
-                    'Test on multiple platforms'
-                ]
-            }
-        ],
-        'content': [
-            {
-                'id': 'content_1',
-                'title': 'Create Pillar Content',
-                'description': 'Build comprehensive guide on "Marketing Automation 2025"',
-                'priority': 'high',
-                'impact': 'High',
-                'effort': 'High',
-                'estimated_improvement': '+5K monthly visitors',
-                'action_items': [
-                    'Research topic thoroughly',
-                    'Create detailed outline',
-                    'Write and optimize content'
-                ]
-            },
-            {
-                'id': 'content_2',
-                'title': 'Repurpose Top Content',
-                'description': 'Convert your best blog posts into infographics and videos',
-                'priority': 'medium',
-                'impact': 'Medium',
-                'effort': 'Low',
-                'estimated_improvement': '+30% content reach',
-                'action_items': [
-                    'Identify top 5 performing posts',
-                    'Design infographics',
-                    'Create short video summaries'
-                ]
-            }
-        ],
-        'automation': [
-            {
-                'id': 'auto_1',
-                'title': 'Set Up Engagement Alerts',
-                'description': 'Get notified when engagement drops below threshold',
-                'priority': 'high',
-                'impact': 'Medium',
-                'effort': 'Low',
-                'estimated_improvement': 'Faster response time',
-                'action_items': [
-                    'Define engagement thresholds',
-                    'Set up automated alerts',
-                    'Create response playbook'
-                ]
-            }
-        ]
-    }
-    
-    if category == 'all':
-        recommendations = []
-        for cat_recs in all_recommendations.values():
-            recommendations.extend(cat_recs)
-        return recommendations
-    
-    return all_recommendations.get(category, [])
+        List of recommendations with scores, best first
+    """
+    rows = _index.candidates(category, max_effort)
+    if not rows.shape[0]:
+        return []
+    return _index.top(k or DEFAULT_TOP_K, rows, goal_weights(user_goals), _index.account_needs(account))
 
-def prioritize_recommendations(recommendations, user_goals):
+def prioritize_recommendations(recommendations, user_goals, account=None):
     """
     Prioritize recommendations based on user goals and constraints
     
     Args:
         recommendations: List of recommendations
-        user_goals: User's goals and preferences
+        user_goals: User's goals and preferences (see goal_weights); a dict may also
+            carry 'max_effort' to drop recommendations above that effort
+        account: Optional account whose metric trends also weight the ranking
         
     Returns:
         Prioritized list of recommendations
     """
-    # Sort by priority and impact
-    priority_map = {'high': 3, 'medium': 2, 'low': 1}
-    
-    sorted_recs = sorted(
-        recommendations,
-        key=lambda x: priority_map.get(x['priority'], 0),
-        reverse=True
+    user_goals = dict(user_goals) if isinstance(user_goals, dict) else user_goals
+    max_effort = user_goals.pop('max_effort', None) if isinstance(user_goals, dict) else None
+    # Catalogue entries come back from get_recommendations without their scoring fields
+    index = RecommendationIndex([dict(_catalogue_by_id.get(rec.get('id'), {}), **rec) for rec in recommendations])
+    rows = index.candidates(max_effort=max_effort)
+    needs = index.account_needs(account) if account is not None else None
+    return index.top(len(rows), rows, goal_weights(user_goals), needs)
+
+def batch_roi(index, needs):
+    """
+    ROI of every recommendation for every account in one vectorized pass
+
+    Cost depends on effort alone. Value is the impact's base value, raised by up to
+    NEED_VALUE_LIFT when the metrics the recommendation moves are declining for the account.
+
+    Args:
+        index: RecommendationIndex
+        needs: Array (accounts, metrics) aligned with index.metric_names
+
+    Returns:
+        Dictionary of 'cost' (recommendations,) and 'value', 'roi_percentage' and
+        'payback_weeks' arrays (accounts, recommendations)
+    """
+    cost = EFFORT_COST[index.effort]
+    value = IMPACT_VALUE[index.impact] * (1.0 + NEED_VALUE_LIFT * index.relevance(needs))
+    return {
+        'cost': cost,
+        'value': value,
+        'roi_percentage': (value - cost) / cost * 100,
+        'payback_weeks': cost * VALUE_HORIZON_WEEKS / value
+    }
+
+
+def batch_action_plans(index, needs, weights=None, k=DEFAULT_TOP_K):
+    """
+    Pick and value the k best recommendations for many accounts in one vectorized pass
+
+    The score matrix is RecommendationIndex.score for every account at once; the top k per
+    row come from a partial sort, so cost is linear in accounts x recommendations.
+
+    Args:
+        index: RecommendationIndex
+        needs: Array (accounts, metrics) aligned with index.metric_names
+        weights: Goal weights aligned with GOALS (None for no goal preference)
+        k: Recommendations per plan
+
+    Returns:
+        Tuple of (rows, scores, values) arrays (accounts, k), best first: catalogue
+        positions, their scores and their estimated values
+    """
+    relevance = index.relevance(needs)
+    scores = index.base + NEED_WEIGHT * relevance
+    if weights is not None and weights.any():
+        scores += GOAL_WEIGHT * (index.goals @ (weights / weights.sum()))
+
+    k = min(k, len(index))
+    if k < len(index):
+        rows = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        rows = np.broadcast_to(np.arange(len(index)), scores.shape)
+    top = np.take_along_axis(scores, rows, axis=1)
+    # Best first, ties in catalogue order
+    order = np.lexsort((rows, -top), axis=1)
+    rows = np.take_along_axis(rows, order, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    values = IMPACT_VALUE[index.impact[rows]] * (1.0 + NEED_VALUE_LIFT * np.take_along_axis(relevance, rows, axis=1))
+    return rows, top, values
+
+
+def _weeks(weeks):
+    return f'{float(weeks):.1f} weeks'
+
+
+def _roi_entry(cost, value):
+    return {
+        'roi_percentage': round(float((value - cost) / cost * 100), 2),
+        'estimated_cost': round(float(cost), 2),
+        'estimated_value': round(float(value), 2),
+        'payback_period': _weeks(cost * VALUE_HORIZON_WEEKS / value)
+    }
+
+
+def _render_plan(index, rows, scores, values):
+    """Action plan dict from one account's batch_action_plans row"""
+    plan = {bucket: [] for bucket in PLAN_BUCKETS}
+    cost = EFFORT_COST[index.effort[rows]]
+    for row, score, item_cost, value in zip(rows.tolist(), scores.tolist(), cost.tolist(), values.tolist()):
+        plan[PLAN_BUCKETS[index.bucket[row]]].append(
+            dict(index.items[row], score=round(score, 3), roi=_roi_entry(item_cost, value))
+        )
+    plan.update(_roi_entry(cost.sum(), values.sum()) if rows.shape[0] else {})
+    plan['estimated_completion'] = _weeks(EFFORT_WEEKS[index.effort[rows]].sum())
+    return plan
+
+
+# Plan rows live in Redis so every worker serves a batch run's plans. This in-process
+# tier sits in front of it for PLAN_CACHE_L1_TTL seconds; without Redis it is the only
+# tier and keeps plans for PLAN_CACHE_TTL.
+_plans = TTLCache(Config.PLAN_CACHE_SIZE, Config.PLAN_CACHE_TTL)
+_shared_stats = {'hits': 0, 'misses': 0, 'errors': 0}
+
+
+def _plan_key(account, weights, k):
+    return f"{PLAN_KEY_PREFIX}{k}:{','.join(map(repr, weights.tolist()))}:{account}"
+
+
+def _cached_plan(key):
+    entry = _plans.get(key)
+    if entry is not None:
+        return entry
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(key)
+    except Exception as e:
+        _shared_stats['errors'] += 1
+        logger.warning('Plan cache read failed: %s', e)
+        return None
+    if raw is None:
+        _shared_stats['misses'] += 1
+        return None
+    _shared_stats['hits'] += 1
+    rows, scores, values = json.loads(raw)
+    entry = (np.array(rows, dtype=np.int64), np.array(scores), np.array(values))
+    _plans.put(key, entry, Config.PLAN_CACHE_L1_TTL)
+    return entry
+
+
+def _cache_plans(entries):
+    """Store {key: (rows, scores, values)} plan rows, pipelined into Redis when available"""
+    client = get_redis()
+    if client is None:
+        for key, entry in entries.items():
+            _plans.put(key, entry)
+        return
+    for key in entries:
+        _plans.pop(key)  # This worker's copy would otherwise outlive the new plan
+    try:
+        pipe = client.pipeline(transaction=False)
+        for key, entry in entries.items():
+            pipe.set(key, json.dumps([part.tolist() for part in entry], separators=(',', ':')),
+                     ex=Config.PLAN_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        _shared_stats['errors'] += 1
+        logger.warning('Plan cache write of %d plans failed: %s', len(entries), e)
+
+
+def _compute_plans(accounts, growth, weights, k):
+    """
+    Score accounts PLAN_BATCH_CHUNK at a time and cache each plan that has a need signal
+
+    Yields:
+        Tuples of (account, (rows, scores, values), cached)
+    """
+    now = time.time()
+    no_need = np.zeros(len(_index.metric_names))
+    for start in range(0, len(accounts), Config.PLAN_BATCH_CHUNK):
+        chunk = accounts[start:start + Config.PLAN_BATCH_CHUNK]
+        needs = np.empty((len(chunk), no_need.shape[0]))
+        known = np.ones(len(chunk), dtype=bool)
+        for i, account in enumerate(chunk):
+            if account in growth:
+                needs[i] = _index.needs_from_growth(growth[account])
+                continue
+            # Trends already loaded in this process; priming thousands of trackers from
+            # the metric store would dominate a nightly run
+            tracker = peek_metric_tracker(account)
+            if tracker is not None:
+                needs[i] = _index.needs_from_growth(metric_growth(tracker, now))
+            else:
+                # Not cached: get_action_plan plans it from its trends when asked
+                needs[i] = no_need
+                known[i] = False
+        rows, scores, values = batch_action_plans(_index, needs, weights, k)
+        entries = [(rows[i], scores[i], values[i]) for i in range(len(chunk))]
+        _cache_plans({
+            _plan_key(account, weights, k): entry
+            for account, entry, cached in zip(chunk, entries, known) if cached
+        })
+        yield from zip(chunk, entries, known.tolist())
+
+
+def plan_accounts(accounts, growth=None, user_goals=None, k=None):
+    """
+    Compute and cache action plans for many accounts, e.g. in a nightly run
+
+    Args:
+        accounts: Account identifiers
+        growth: Optional {account: {metric: relative growth}}; other accounts use the metric
+            trends already loaded in this process, and are skipped without them
+        user_goals: Goals to favour (see goal_weights)
+        k: Recommendations per plan (defaults to DEFAULT_TOP_K)
+
+    Returns:
+        Number of plans cached
+    """
+    accounts = list(dict.fromkeys(accounts))
+    return sum(
+        cached for _, _, cached in
+        _compute_plans(accounts, growth or {}, goal_weights(user_goals), k or DEFAULT_TOP_K)
     )
-    
-    return sorted_recs
+
+
+def get_action_plan(account='default', user_goals=None, k=None):
+    """
+    Get an account's action plan, from the plan cache when a batch run already computed it
+
+    Args:
+        account: Account whose metric trends weight the plan
+        user_goals: Goals to favour (see goal_weights)
+        k: Recommendations in the plan (defaults to DEFAULT_TOP_K)
+
+    Returns:
+        Action plan with its sections, ROI per recommendation and totals
+    """
+    weights = goal_weights(user_goals)
+    k = k or DEFAULT_TOP_K
+    entry = _cached_plan(_plan_key(account, weights, k))
+    if entry is None:
+        get_metric_tracker(account)
+        _, entry, _ = next(_compute_plans([account], {}, weights, k))
+    return _render_plan(_index, *entry)
+
+
+def get_plan_cache_stats():
+    """Plan cache counters: the in-process tier, plus Redis reads when it is shared"""
+    stats = _plans.stats()
+    if get_redis() is not None:
+        stats['shared'] = dict(_shared_stats)
+    return stats
+
 
 def generate_action_plan(recommendations):
     """
@@ -165,46 +632,25 @@ def generate_action_plan(recommendations):
     Returns:
         Action plan with timeline
     """
-    plan = {
-        'immediate_actions': [],
-        'short_term': [],
-        'long_term': [],
-        'estimated_completion': '2-4 weeks'
-    }
-    
-    for rec in recommendations:
-        if rec['priority'] == 'high' and rec['effort'] == 'Low':
-            plan['immediate_actions'].append(rec)
-        elif rec['priority'] == 'high' or rec['effort'] == 'Medium':
-            plan['short_term'].append(rec)
-        else:
-            plan['long_term'].append(rec)
-    
+    index = RecommendationIndex([dict(_catalogue_by_id.get(rec.get('id'), {}), **rec) for rec in recommendations])
+    plan = {bucket: [] for bucket in PLAN_BUCKETS}
+    for rec, bucket in zip(recommendations, index.bucket.tolist()):
+        plan[PLAN_BUCKETS[bucket]].append(rec)
+    plan['estimated_completion'] = _weeks(EFFORT_WEEKS[index.effort].sum())
     return plan
 
-def calculate_roi_estimate(recommendation):
+def calculate_roi_estimate(recommendation, account=None):
     """
     Calculate estimated ROI for a recommendation
     
     Args:
         recommendation: Recommendation object
+        account: Optional account whose metric trends raise the value of needed fixes
         
     Returns:
         ROI estimate
     """
-    # Simple ROI calculation (replace with actual model)
-    effort_cost = {'Low': 100, 'Medium': 500, 'High': 1500}
-    impact_value = {'Low': 300, 'Medium': 1000, 'High': 3000}
-    
-    cost = effort_cost.get(recommendation.get('effort', 'Medium'), 500)
-    value = impact_value.get(recommendation.get('impact', 'Medium'), 1000)
-    
-    roi = ((value - cost) / cost) * 100
-    
-    return {
-        'roi_percentage': round(roi, 2),
-        'estimated_cost': cost,
-        'estimated_value': value,
-        'payback_period': '2-8 weeks'
-    }
-
+    index = RecommendationIndex([dict(_catalogue_by_id.get(recommendation.get('id'), {}), **recommendation)])
+    needs = index.account_needs(account) if account is not None else np.zeros(len(index.metric_names))
+    roi = batch_roi(index, needs)
+    return _roi_entry(roi['cost'][0], roi['value'][0, 0])
@@ -0,0 +1,182 @@
+"""
+Sentiment Analysis
+Lexicon-based sentiment scoring, vectorized over batches of texts with NumPy
+"""
+
+import re
+
+import numpy as np
+
+from config import Config
+from storage.ttl_cache import TTLCache
+
+# Word valences on a -4..4 scale (VADER convention)
+LEXICON = {
+    'amazing': 2.8, 'awesome': 3.1, 'beautiful': 2.9, 'best': 3.2, 'better': 1.9,
+    'brilliant': 2.8, 'clean': 1.7, 'cool': 1.3, 'easy': 1.9, 'effective': 2.1,
+    'enjoy': 2.2, 'enjoyed': 2.3, 'excellent': 2.7, 'excited': 1.4, 'exciting': 2.2,
+    'fantastic': 2.6, 'fast': 1.2, 'favorite': 2.0, 'fine': 0.8, 'fun': 2.3,
+    'glad': 2.0, 'good': 1.9, 'great': 3.1, 'happy': 2.7, 'helpful': 1.8,
+    'impressive': 2.3, 'incredible': 2.5, 'informative': 1.6, 'insightful': 2.0, 'interesting': 1.7,
+    'like': 1.5, 'liked': 1.8, 'love': 3.2, 'loved': 2.9, 'lovely': 2.8,
+    'nice': 1.8, 'perfect': 2.7, 'pleased': 1.9, 'powerful': 1.8, 'recommend': 1.5,
+    'recommended': 1.6, 'reliable': 1.9, 'smooth': 1.4, 'solid': 1.2,
+    'superb': 3.1, 'thank': 1.5, 'thanks': 1.9, 'top': 0.8, 'useful': 1.9,
+    'valuable': 2.1, 'win': 2.8, 'wonderful': 2.7, 'wow': 2.8, 'yes': 1.7,
+    'agree': 1.5, 'appreciate': 1.7, 'beneficial': 1.9, 'clear': 1.6, 'congrats': 2.4,
+    'congratulations': 2.9, 'cute': 2.0, 'delighted': 2.9, 'genius': 2.1, 'gorgeous': 3.0,
+    'growth': 1.6, 'inspiring': 2.4, 'outstanding': 3.0, 'positive': 2.3, 'quality': 1.4,
+    'success': 2.7, 'successful': 2.8, 'worth': 0.9, 'legit': 1.1, 'fire': 1.5,
+    'annoying': -1.7, 'awful': -2.0, 'bad': -2.5, 'boring': -1.3, 'broken': -2.1,
+    'bug': -1.2, 'buggy': -1.6, 'cheap': -0.8, 'confusing': -1.4, 'crap': -1.6,
+    'disappointed': -1.9, 'disappointing': -2.2, 'dislike': -1.6, 'error': -1.4, 'expensive': -0.9,
+    'fail': -2.5, 'failed': -2.3, 'fake': -2.1, 'garbage': -2.1, 'hate': -2.7,
+    'hated': -3.2, 'horrible': -2.5, 'issue': -0.8, 'issues': -0.9, 'lame': -1.8,
+    'lost': -1.3, 'mess': -1.5, 'poor': -2.1, 'problem': -1.7, 'problems': -1.7,
+    'sad': -2.1, 'scam': -2.8, 'slow': -1.0, 'spam': -1.5, 'stupid': -2.4,
+    'sucks': -1.5, 'terrible': -2.1, 'trash': -2.0, 'ugly': -2.3, 'unhappy': -1.8,
+    'useless': -1.8, 'waste': -1.8, 'worse': -2.1, 'worst': -3.1, 'wrong': -2.1,
+    'angry': -2.3, 'complaint': -1.5, 'crash': -1.7, 'decline': -1.1, 'difficult': -1.5,
+    'misleading': -1.7, 'refund': -0.8, 'rude': -2.0, 'unfortunately': -1.4,
+    ':)': 2.0, ':-)': 2.0, ':d': 2.3, ';)': 1.5, ':(': -1.9, ':-(': -1.9,
+    '❤': 3.0, '😍': 3.0, '😂': 1.5, '🔥': 1.8, '👍': 1.8, '🙏': 1.5,
+    '👎': -1.8, '😡': -2.5, '😢': -1.8, '😞': -1.9, '💩': -1.6
+}
+
+# Words that flip the valence of the next few tokens
+NEGATIONS = frozenset([
+    'not', 'no', 'never', 'none', 'nobody', 'nothing', 'neither', 'nor', 'cannot',
+    "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "won't", "can't", "shouldn't",
+    'dont', 'doesnt', 'didnt', 'isnt', 'wasnt', 'arent', 'wont', 'cant', 'without'
+])
+
+# Intensifiers and dampeners: added to the magnitude of the following word
+BOOSTERS = {
+    'very': 0.293, 'really': 0.293, 'so': 0.293, 'extremely': 0.293, 'absolutely': 0.293,
+    'super': 0.293, 'totally': 0.293, 'incredibly': 0.293, 'highly': 0.293, 'most': 0.293,
+    'slightly': -0.293, 'somewhat': -0.293, 'barely': -0.293, 'kinda': -0.293, 'little': -0.293
+}
+
+NEGATION_SCALAR = -0.74
+NEGATION_WINDOW = 3  # tokens after a negation that it applies to
+EXCLAMATION_BOOST = 0.292  # per '!', at most 4
+NORMALIZATION_ALPHA = 15  # compound = s / sqrt(s^2 + alpha)
+
+# Compound score bounds for the neutral label
+NEUTRAL_BAND = 0.05
+
+TOKEN_RE = re.compile(r"[:;]-?[()d]|[a-z0-9']+|[❤\U0001F300-\U0001FAFF]")
+
+_scores = TTLCache(Config.SENTIMENT_CACHE_SIZE, Config.SENTIMENT_CACHE_TTL)
+
+_token_index = {token: i for i, token in enumerate(set(LEXICON) | NEGATIONS | set(BOOSTERS))}
+_valences = np.zeros(len(_token_index) + 1)  # last slot: out-of-vocabulary
+_negators = np.zeros(len(_token_index) + 1, dtype=bool)
+_boosts = np.zeros(len(_token_index) + 1)
+for _token, _i in _token_index.items():
+    _valences[_i] = LEXICON.get(_token, 0.0)
+    _negators[_i] = _token in NEGATIONS
+    _boosts[_i] = BOOSTERS.get(_token, 0.0)
+
+
+def label_for(score):
+    """Map a compound score to 'positive', 'neutral' or 'negative'"""
+    if score >= NEUTRAL_BAND:
+        return 'positive'
+    if score <= -NEUTRAL_BAND:
+        return 'negative'
+    return 'neutral'
+
+
+def score_texts(texts):
+    """
+    Score texts without the cache, all tokens of the batch in one flat array
+
+    Args:
+        texts: List of strings
+
+    Returns:
+        NumPy array of compound scores in [-1, 1], one per text
+    """
+    oov = len(_token_index)
+    ids, docs, exclamations = [], [], []
+    for doc, text in enumerate(texts):
+        lowered = text.lower()
+        tokens = [_token_index.get(token, oov) for token in TOKEN_RE.findall(lowered)]
+        ids.extend(tokens)
+        docs.extend([doc] * len(tokens))
+        exclamations.append(min(lowered.count('!'), 4))
+
+    ids = np.array(ids, dtype=np.int64)
+    docs = np.array(docs, dtype=np.int64)
+    valence = _valences[ids]
+
+    # A booster or negation affects the following tokens only within the same text
+    for lag in range(1, NEGATION_WINDOW + 1):
+        same = np.zeros(ids.shape[0], dtype=bool)
+        same[lag:] = docs[lag:] == docs[:-lag]
+        prior = np.zeros(ids.shape[0], dtype=np.int64)
+        prior[lag:] = ids[:-lag]
+        if lag == 1:
+            boost = np.where(same, _boosts[prior], 0.0)
+            valence = valence + np.sign(valence) * boost
+        valence = np.where(same & _negators[prior], valence * NEGATION_SCALAR, valence)
+
+    sums = np.bincount(docs, weights=valence, minlength=len(texts))
+    sums += np.sign(sums) * np.array(exclamations) * EXCLAMATION_BOOST
+    return sums / np.sqrt(sums * sums + NORMALIZATION_ALPHA)
+
+
+def analyze_sentiment_batch(texts):
+    """
+    Score a batch of texts, reusing cached scores for texts seen before
+
+    Duplicates within the batch are scored once.
+
+    Args:
+        texts: List of strings
+
+    Returns:
+        List of {'score', 'label'} dicts in input order
+    """
+    scores = {}
+    missing = []
+    for text in texts:
+        if text in scores:
+            continue
+        cached = _scores.get(text)
+        if cached is None:
+            scores[text] = None
+            missing.append(text)
+        else:
+            scores[text] = cached
+
+    if missing:
+        for text, score in zip(missing, score_texts(missing)):
+            score = round(float(score), 4)
+            scores[text] = score
+            _scores.put(text, score)
+
+    return [{'score': scores[text], 'label': label_for(scores[text])} for text in texts]
+
+
+def summarize_sentiment(results):
+    """
+    Label counts and mean score for a batch of results
+
+    Args:
+        results: Output of analyze_sentiment_batch
+
+    Returns:
+        Summary dictionary
+    """
+    counts = {'positive': 0, 'neutral': 0, 'negative': 0}
+    for result in results:
+        counts[result['label']] += 1
+    mean = sum(r['score'] for r in results) / len(results) if results else 0.0
+    return dict(counts, total=len(results), average_score=round(mean, 4), label=label_for(mean))
+
+
+def get_sentiment_cache_stats():
+    """Hit/miss statistics of the sentiment score cache"""
+    return _scores.stats()
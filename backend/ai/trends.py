@@ -0,0 +1,312 @@
+"""
+Trend Tracking
+Streaming exponentially decayed counters for topics and metrics, with growth and velocity
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+
+from config import Config
+from services.cluster import bus
+from storage.ttl_cache import TTLCache
+
+# Half-lives of the short and long windows compared to measure growth (seconds)
+FAST_HALF_LIFE = 86400
+SLOW_HALF_LIFE = 7 * 86400
+
+# The landmark moves forward once points get this many fast half-lives past it, so scaled
+# weights stay far from float overflow
+RENORMALIZE_AFTER = 64
+
+# History replayed into a new metric tracker, in slow half-lives
+PRIME_HALF_LIVES = 12
+
+# Topics need this many mentions per day in the fast window to be reported
+MIN_TOPIC_RATE = 2.0
+
+# Growth thresholds for velocity labels and for counting as declining
+HIGH_VELOCITY = 1.0
+MEDIUM_VELOCITY = 0.25
+DECLINE_THRESHOLD = -0.2
+
+
+class TrendTracker:
+    """
+    Forward-decayed sums per key over a fast and a slow half-life.
+
+    A point at time t adds weight * 2^((t - landmark) / half_life) to its key, so the sum at
+    any later time is the stored value times one shared decay factor. Updates are a single
+    vectorized add per batch, need no per-key timestamps, and give the same result whatever
+    order points arrive in. Memory is four floats per key.
+    """
+
+    def __init__(self, capacity=1024, names=None):
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._names = [] if names is None else names  # Shared with the caller when fed by id
+        self._half_lives = np.array([FAST_HALF_LIFE, SLOW_HALF_LIFE], dtype=np.float64)
+        self._landmark = None
+        self._mass = np.zeros((2, capacity))
+        self._total = np.zeros((2, capacity))
+
+    def __len__(self):
+        return len(self._names)
+
+    def key_ids(self, keys):
+        """Integer ids for keys, registering new ones"""
+        ids = np.empty(len(keys), dtype=np.int64)
+        with self._lock:
+            for i, key in enumerate(keys):
+                kid = self._keys.get(key)
+                if kid is None:
+                    kid = self._keys[key] = len(self._names)
+                    self._names.append(key)
+                ids[i] = kid
+            self._ensure_capacity(len(self._names))
+        return ids
+
+    def _ensure_capacity(self, needed):
+        capacity = self._mass.shape[1]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        extra = np.zeros((2, capacity - self._mass.shape[1]))
+        self._mass = np.hstack([self._mass, extra])
+        self._total = np.hstack([self._total, extra])
+
+    def update_ids(self, ids, timestamps, values=None):
+        """
+        Add points by key id
+
+        Args:
+            ids: Array-like of key ids (from key_ids)
+            timestamps: Array-like of epoch seconds
+            values: Optional values for mean tracking (counts only when omitted)
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.shape[0] == 0:
+            return
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.ones(ids.shape[0]) if values is None else np.asarray(values, dtype=np.float64)
+
+        with self._lock:
+            self._ensure_capacity(int(ids.max()) + 1)
+            newest = float(timestamps.max())
+            if self._landmark is None:
+                self._landmark = newest
+            elif newest - self._landmark > RENORMALIZE_AFTER * FAST_HALF_LIFE:
+                shift = np.exp2(-(newest - self._landmark) / self._half_lives)[:, None]
+                self._mass *= shift
+                self._total *= shift
+                self._landmark = newest
+
+            weights = np.exp2((timestamps[None, :] - self._landmark) / self._half_lives[:, None])
+            for row in range(2):
+                np.add.at(self._mass[row], ids, weights[row])
+                np.add.at(self._total[row], ids, weights[row] * values)
+
+    def update(self, keys, timestamps, values=None):
+        """
+        Add points by key
+
+        Args:
+            keys: List of hashable keys (topics, metric names)
+            timestamps: Epoch seconds aligned with keys
+            values: Optional values aligned with keys
+        """
+        self.update_ids(self.key_ids(keys), timestamps, values)
+
+    def _decayed(self, now):
+        with self._lock:
+            size = len(self._names)
+            if self._landmark is None or not size:
+                empty = np.zeros((2, 0))
+                return empty, empty
+            decay = np.exp2(-(now - self._landmark) / self._half_lives)[:, None]
+            return self._mass[:, :size] * decay, self._total[:, :size] * decay
+
+    def rates(self, now=None):
+        """
+        Events per day in the fast and slow windows, for every key
+
+        A steady rate r keeps a decayed count of r * half_life / ln 2.
+
+        Returns:
+            Array shaped (2, keys): fast rates, slow rates
+        """
+        mass, _ = self._decayed(time.time() if now is None else now)
+        return mass * (math.log(2) * 86400 / self._half_lives[:, None])
+
+    def means(self, now=None):
+        """
+        Exponentially weighted mean value in the fast and slow windows, for every key
+
+        Returns:
+            Array shaped (2, keys), NaN for keys without points
+        """
+        mass, total = self._decayed(time.time() if now is None else now)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(mass > 0, total / mass, np.nan)
+
+    def name(self, kid):
+        return self._names[kid]
+
+    def names(self):
+        return list(self._names)
+
+
+def growth_of(fast, slow):
+    """Relative change of the fast window against the slow one (NaN when slow is zero)"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(slow > 0, fast / slow - 1.0, np.nan)
+
+
+def velocity_label(growth):
+    """'high', 'medium' or 'low' from the magnitude of growth"""
+    magnitude = abs(growth)
+    if magnitude >= HIGH_VELOCITY:
+        return 'high'
+    if magnitude >= MEDIUM_VELOCITY:
+        return 'medium'
+    return 'low'
+
+
+def format_growth(growth):
+    return f'{growth * 100:+.0f}%'
+
+
+def rank_topics(tracker, k=5, now=None, min_rate=MIN_TOPIC_RATE):
+    """
+    Fastest-growing and fastest-declining topics
+
+    Args:
+        tracker: TrendTracker fed with topic mentions
+        k: Topics per list
+        now: Epoch seconds to evaluate at
+        min_rate: Minimum mentions per day (fast window for emerging, slow for declining)
+
+    Returns:
+        Tuple of (emerging, declining) lists of topic dicts
+    """
+    fast, slow = tracker.rates(now)
+    growth = growth_of(fast, slow)
+    candidates = ~np.isnan(growth)
+
+    def top(mask, order):
+        scores = np.where(mask, order, -np.inf)
+        count = min(k, int(np.count_nonzero(mask)))
+        if count <= 0:
+            return []
+        best = np.argpartition(-scores, count - 1)[:count]
+        return best[np.argsort(-scores[best], kind='stable')]
+
+    emerging = top(candidates & (fast >= min_rate) & (growth > 0), growth)
+    declining = top(candidates & (slow >= min_rate) & (growth <= DECLINE_THRESHOLD), -growth)
+    return (
+        [{
+            'topic': tracker.name(i),
+            'growth': format_growth(growth[i]),
+            'velocity': velocity_label(growth[i]),
+            'mentions_per_day': round(float(fast[i]), 2)
+        } for i in emerging],
+        [{
+            'topic': tracker.name(i),
+            'decline': format_growth(growth[i]),
+            'velocity': velocity_label(growth[i]),
+            'mentions_per_day': round(float(fast[i]), 2)
+        } for i in declining]
+    )
+
+
+def metric_growth(tracker, now=None):
+    """
+    Relative growth of every tracked metric: fast vs slow weighted mean
+
+    Returns:
+        Dictionary of metric -> growth, metrics without a slow-window mean left out
+    """
+    fast, slow = tracker.means(now)
+    growth = growth_of(fast, slow)
+    return {metric: float(growth[i]) for i, metric in enumerate(tracker.names()) if not np.isnan(growth[i])}
+
+
+def metric_trends(tracker, now=None):
+    """
+    Direction and growth of every tracked metric: fast vs slow weighted mean
+
+    Returns:
+        Dictionary of metric -> {'direction', 'growth', 'velocity'}
+    """
+    fast, slow = tracker.means(now)
+    growth = growth_of(fast, slow)
+    trends = {}
+    for i, metric in enumerate(tracker.names()):
+        if np.isnan(growth[i]):
+            continue
+        direction = 'up' if growth[i] > 0.02 else 'down' if growth[i] < -0.02 else 'stable'
+        trends[metric] = {
+            'direction': direction,
+            'growth': format_growth(growth[i]),
+            'velocity': velocity_label(growth[i])
+        }
+    return trends
+
+
+_metric_trackers = TTLCache(Config.ACCOUNT_STATE_SIZE, ttl=float('inf'))  # LRU over accounts
+_metric_trackers_lock = threading.Lock()
+
+
+def get_metric_tracker(account='default'):
+    """
+    Get the metric trend tracker for an account, primed from its metric store
+
+    Args:
+        account: Account identifier
+
+    Returns:
+        TrendTracker instance
+    """
+    from storage.metric_store import get_metric_store
+
+    tracker = _metric_trackers.get(account)
+    if tracker is None:
+        with _metric_trackers_lock:
+            tracker = _metric_trackers.get(account)
+            if tracker is None:
+                tracker = TrendTracker()
+                store = get_metric_store(account)
+                metrics = store.metrics
+                if metrics:
+                    # Points older than PRIME_HALF_LIVES slow half-lives no longer carry weight
+                    timestamps, values = store.fetch(metrics, time.time() - PRIME_HALF_LIVES * SLOW_HALF_LIFE)
+                    for kid, column in zip(tracker.key_ids(metrics), values):
+                        present = ~np.isnan(column)
+                        tracker.update_ids(np.full(int(present.sum()), kid), timestamps[present], column[present])
+                _metric_trackers.put(account, tracker)
+    return tracker
+
+
+def peek_metric_tracker(account='default'):
+    """The account's metric tracker if this process already has one (never primes a new one)"""
+    return _metric_trackers.get(account)
+
+
+def track_points(account, points):
+    """
+    Feed synced (timestamp, metric, value) points into the account's metric tracker
+
+    Args:
+        account: Account identifier
+        points: List of (epoch_seconds, metric, value)
+    """
+    if points:
+        get_metric_tracker(account).update(
+            [p[1] for p in points], [p[0] for p in points], [p[2] for p in points]
+        )
+
+
+bus.on_resync(_metric_trackers.clear)
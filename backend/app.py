@@ -17,6 +17,11 @@ from routes.analytics import analytics_bp
 from routes.ai_engine import ai_bp
 from routes.automation import automation_bp
 from routes.integrations import integrations_bp
+from routes.jobs import jobs_bp
+from routes.stream import stream_bp
+from services.cluster import bus
+from services.insight_refresher import get_insight_refresher
+from services.scheduler import get_scheduler
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -31,6 +36,13 @@ app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
 app.register_blueprint(ai_bp, url_prefix='/api/ai')
 app.register_blueprint(automation_bp, url_prefix='/api/automation')
 app.register_blueprint(integrations_bp, url_prefix='/api/integrations')
+app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
+app.register_blueprint(stream_bp, url_prefix='/api/stream')
+
+# Background services, started in every worker process
+bus.start()  # Applies other workers' syncs and edits to this worker's in-memory state
+get_scheduler()  # Dispatches due posts, including ones queued before a restart
+get_insight_refresher()  # Materializes insights; one worker in the cluster leads
 
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
@@ -39,7 +51,8 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
-        'service': 'FlowMind AI Backend'
+        'service': 'FlowMind AI Backend',
+        'cluster': bus.stats()
     }), 200
 
 # Root endpoint
@@ -54,7 +67,9 @@ def root():
             'analytics': '/api/analytics',
             'ai': '/api/ai',
             'automation': '/api/automation',
-            'integrations': '/api/integrations'
+            'integrations': '/api/integrations',
+            'jobs': '/api/jobs',
+            'stream': '/api/stream'
         }
     }), 200
 
@@ -12,6 +12,9 @@ class Config:
     """Base configuration"""
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/flowmind')
+    MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 50))
+    MONGODB_WRITE_BATCH = int(os.getenv('MONGODB_WRITE_BATCH', 500))
+    MONGODB_FLUSH_INTERVAL = float(os.getenv('MONGODB_FLUSH_INTERVAL', 1.0))  # seconds
     
     # AI API Keys
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
@@ -26,9 +29,88 @@ class Config:
     GOOGLE_SEARCH_CONSOLE_CREDENTIALS = os.getenv('GOOGLE_SEARCH_CONSOLE_CREDENTIALS')
     GOOGLE_ANALYTICS_TRACKING_ID = os.getenv('GOOGLE_ANALYTICS_TRACKING_ID')
     
+    # Accounts synced by the connectors
+    YOUTUBE_CHANNEL_ID = os.getenv('YOUTUBE_CHANNEL_ID')
+    TWITTER_USER_ID = os.getenv('TWITTER_USER_ID')
+    INSTAGRAM_USER_ID = os.getenv('INSTAGRAM_USER_ID')
+    SEARCH_CONSOLE_SITE_URL = os.getenv('SEARCH_CONSOLE_SITE_URL')
+    
+    # Connector base URLs (override to point at local fake servers)
+    YOUTUBE_API_BASE = os.getenv('YOUTUBE_API_BASE')
+    TWITTER_API_BASE = os.getenv('TWITTER_API_BASE')
+    INSTAGRAM_API_BASE = os.getenv('INSTAGRAM_API_BASE')
+    SEARCH_CONSOLE_API_BASE = os.getenv('SEARCH_CONSOLE_API_BASE')
+    GOOGLE_ANALYTICS_API_BASE = os.getenv('GOOGLE_ANALYTICS_API_BASE')
+    
+    # Concurrent (account, platform) fetches per sync
+    SYNC_MAX_WORKERS = int(os.getenv('SYNC_MAX_WORKERS', 32))
+    
+    # Accounts whose metric store, trackers and indexes each worker keeps in memory (LRU)
+    ACCOUNT_STATE_SIZE = int(os.getenv('ACCOUNT_STATE_SIZE', 256))
+    
     # Redis
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Forecast caching
+    FORECAST_CACHE_SIZE = int(os.getenv('FORECAST_CACHE_SIZE', 2048))
+    FORECAST_CACHE_TTL = int(os.getenv('FORECAST_CACHE_TTL', 300))  # seconds
+    MODEL_CACHE_SIZE = int(os.getenv('MODEL_CACHE_SIZE', 4096))
+    MODEL_CACHE_TTL = int(os.getenv('MODEL_CACHE_TTL', 6 * 3600))  # seconds
+    
+    # Sentiment scoring
+    SENTIMENT_CACHE_SIZE = int(os.getenv('SENTIMENT_CACHE_SIZE', 100000))
+    SENTIMENT_CACHE_TTL = int(os.getenv('SENTIMENT_CACHE_TTL', 24 * 3600))  # seconds
+    SENTIMENT_MAX_BATCH = int(os.getenv('SENTIMENT_MAX_BATCH', 10000))
+    
+    # Anomaly detection (robust z-score threshold; minimum gap between alerts per metric)
+    ANOMALY_THRESHOLD = float(os.getenv('ANOMALY_THRESHOLD', 4.0))
+    ANOMALY_ALERT_COOLDOWN = int(os.getenv('ANOMALY_ALERT_COOLDOWN', 6 * 3600))  # seconds
+    
+    # Insight generation ('stub' answers locally; 'gemini' calls the API with GEMINI_API_KEY)
+    INSIGHT_MODEL = os.getenv('INSIGHT_MODEL', 'stub')
+    INSIGHT_TOP_K = int(os.getenv('INSIGHT_TOP_K', 5))
+    INSIGHT_MATERIALIZE_K = int(os.getenv('INSIGHT_MATERIALIZE_K', 20))  # insights stored per account
+    INSIGHT_REFRESH_INTERVAL = float(os.getenv('INSIGHT_REFRESH_INTERVAL', 60))  # seconds
+    INSIGHT_MAX_AGE = int(os.getenv('INSIGHT_MAX_AGE', 3600))  # seconds before an unchanged account is refreshed
+    LLM_BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', 8))  # prompts per model call
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+    LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', 10000))
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 6 * 3600))  # seconds
+    
+    # Action plans (batch ROI planning across accounts, cached per account)
+    PLAN_CACHE_SIZE = int(os.getenv('PLAN_CACHE_SIZE', 100000))
+    PLAN_CACHE_TTL = int(os.getenv('PLAN_CACHE_TTL', 24 * 3600))  # seconds
+    PLAN_CACHE_L1_TTL = float(os.getenv('PLAN_CACHE_L1_TTL', 60))  # seconds, in front of Redis
+    PLAN_BATCH_CHUNK = int(os.getenv('PLAN_BATCH_CHUNK', 10000))  # accounts scored per pass
+    PLAN_SYNC_MAX_ACCOUNTS = int(os.getenv('PLAN_SYNC_MAX_ACCOUNTS', 100))  # larger batches run as jobs
+    
+    # HTTP response cache (Redis shared, with a short-lived in-process L1)
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_L1_SIZE = int(os.getenv('RESPONSE_CACHE_L1_SIZE', 1024))
+    RESPONSE_CACHE_L1_TTL = float(os.getenv('RESPONSE_CACHE_L1_TTL', 2))  # seconds
+    
+    # AI process pool (workers=0 runs jobs inline)
+    AI_POOL_WORKERS = int(os.getenv('AI_POOL_WORKERS', 2))
+    AI_POOL_MAX_PENDING = int(os.getenv('AI_POOL_MAX_PENDING', 16))
+    AI_JOB_TIMEOUT = float(os.getenv('AI_JOB_TIMEOUT', 30))  # seconds
+    
+    # Background jobs
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+    JOB_MAX_QUEUED = int(os.getenv('JOB_MAX_QUEUED', 64))
+    JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 3600))  # seconds
+    
+    # Workflow execution
+    WORKFLOW_WORKERS = int(os.getenv('WORKFLOW_WORKERS', 16))
+    WORKFLOW_ACTION_TIMEOUT = float(os.getenv('WORKFLOW_ACTION_TIMEOUT', 30))  # seconds
+    
+    # Post scheduling
+    SCHEDULER_BATCH_SIZE = int(os.getenv('SCHEDULER_BATCH_SIZE', 500))
+    SCHEDULER_POLL_INTERVAL = float(os.getenv('SCHEDULER_POLL_INTERVAL', 0.25))  # seconds
+    SCHEDULER_DISPATCH_WORKERS = int(os.getenv('SCHEDULER_DISPATCH_WORKERS', 8))
+    
+    # Live event stream (open /api/stream connections per worker, each holding one thread)
+    STREAM_MAX_SUBSCRIBERS = int(os.getenv('STREAM_MAX_SUBSCRIBERS', 24))
+    
     # CORS
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',')
 
@@ -47,6 +129,7 @@ class TestingConfig(Config):
     DEBUG = True
     TESTING = True
     MONGODB_URI = 'mongodb://localhost:27017/flowmind_test'
+    REDIS_URL = ''  # In-memory backends
 
 # Configuration dictionary
 config = {
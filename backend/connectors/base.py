@@ -0,0 +1,227 @@
+"""
+Connector Base
+Pooled HTTP sessions, per-platform rate limiting and retry with jitter
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+# Status codes worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ConnectorError(Exception):
+    """Raised when a platform request fails permanently"""
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `burst`; acquire() blocks until a
+    token is available, so concurrent callers are smoothed to the platform quota.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class BaseConnector:
+    """
+    Base class for platform connectors.
+
+    One instance per platform is shared by every sync thread in a process, so the HTTP
+    connection pool and the rate limiter are shared too. Subclasses set the class
+    attributes below and implement fetch().
+    """
+
+    name = 'base'
+    CATEGORY = 'social'  # analytics collection `type` for this platform's points
+    BASE_URL = ''
+    RATE_LIMIT = 5.0  # requests per second
+    BURST = 5
+    MAX_RETRIES = 3
+    BACKOFF = 0.5  # seconds, doubled per attempt
+    TIMEOUT = 10  # seconds
+
+    def __init__(self, base_url=None, credentials=None):
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
+        self.credentials = credentials
+        self.limiter = RateLimiter(self.RATE_LIMIT, self.BURST)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.SYNC_MAX_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @property
+    def configured(self):
+        """True when credentials for the platform are available"""
+        return bool(self.credentials)
+
+    def auth(self):
+        """
+        Authentication for a request
+
+        Returns:
+            Tuple of (headers, params) to merge into the request
+        """
+        return {}, {}
+
+    def _send(self, method, path, params=None, json=None, headers=None):
+        """
+        Send a request with rate limiting and retries
+
+        Throttling, 5xx responses and connection errors are retried with exponential
+        backoff and full jitter; Retry-After is honoured when the platform sends it.
+
+        Returns:
+            requests.Response with a status below 400
+
+        Raises:
+            ConnectorError: On non-retryable errors or when retries are exhausted
+        """
+        auth_headers, auth_params = self.auth()
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        last_error = None
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            if attempt:
+                retry_after = getattr(last_error, 'retry_after', None)
+                time.sleep(retry_after or random.uniform(0, self.BACKOFF * 2 ** attempt))
+
+            self.limiter.acquire()
+            try:
+                response = self.session.request(
+                    method, url,
+                    params=dict(params or {}, **auth_params),
+                    json=json,
+                    headers=dict(headers or {}, **auth_headers),
+                    timeout=self.TIMEOUT
+                )
+            except requests.RequestException as e:
+                last_error = ConnectorError(f'{self.name}: {e}')
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                last_error = ConnectorError(f'{self.name}: HTTP {response.status_code}')
+                retry_after = response.headers.get('Retry-After', '')
+                last_error.retry_after = float(retry_after) if retry_after.isdigit() else None
+                continue
+            if response.status_code >= 400:
+                raise ConnectorError(f'{self.name}: HTTP {response.status_code} {response.text[:200]}')
+            return response
+
+        raise last_error
+
+    def request(self, method, path, params=None, json=None, headers=None):
+        """
+        Call the platform API with rate limiting and retries
+
+        Args:
+            method: HTTP method
+            path: Path relative to the base URL
+            params: Query parameters
+            json: JSON body
+            headers: Extra headers
+
+        Returns:
+            Decoded JSON response
+
+        Raises:
+            ConnectorError: On non-retryable errors or when retries are exhausted
+        """
+        return self._send(method, path, params, json, headers).json()
+
+    def request_conditional(self, method, path, etag=None, params=None, json=None):
+        """
+        Call the platform API with If-None-Match so unchanged resources cost no payload
+
+        Args:
+            method: HTTP method
+            path: Path relative to the base URL
+            etag: ETag from the previous response, if any
+            params: Query parameters
+            json: JSON body
+
+        Returns:
+            Tuple of (decoded JSON or None when not modified, ETag to store)
+        """
+        headers = {'If-None-Match': etag} if etag else None
+        response = self._send(method, path, params, json, headers)
+        if response.status_code == 304:
+            return None, etag
+        return response.json(), response.headers.get('ETag')
+
+    def fetch(self, ref, cursor=None):
+        """
+        Fetch what changed for one account on this platform since the last sync
+
+        Args:
+            ref: Platform-specific account reference (channel id, user id, site URL...)
+            cursor: Watermark from the previous successful sync with 'last_timestamp',
+                'page_token' and 'etag' (any may be None), or None for a first sync
+
+        Returns:
+            Dictionary with 'stats' (latest snapshot, None if unchanged), 'points' (list of
+            (epoch_seconds, metric, value) tuples), 'cursor' (watermark to persist) and
+            optionally 'documents' (new post/comment texts for the keyword index)
+        """
+        raise NotImplementedError
+
+    def publish(self, ref, post):
+        """
+        Publish one post to the platform
+
+        Args:
+            ref: Platform-specific account reference
+            post: Scheduled post dictionary ('content', 'media_url', ...)
+
+        Returns:
+            Platform id of the published item
+
+        Raises:
+            ConnectorError: If publishing fails or the platform does not support it
+        """
+        raise ConnectorError(f'{self.name}: publishing is not supported')
+
+    def publish_batch(self, ref, posts):
+        """
+        Publish several posts through the shared session and rate limiter
+
+        Args:
+            ref: Platform-specific account reference
+            posts: List of post dictionaries
+
+        Returns:
+            List of (post, platform_id or None, error or None) in input order
+        """
+        results = []
+        for post in posts:
+            try:
+                results.append((post, self.publish(ref, post), None))
+            except ConnectorError as e:
+                results.append((post, None, str(e)))
+        return results
@@ -0,0 +1,68 @@
+"""
+Instagram Connector
+Profile counts and daily insights from the Instagram Graph API
+"""
+
+import time
+from datetime import datetime
+
+from config import Config
+from connectors.base import BaseConnector, ConnectorError
+
+
+class InstagramConnector(BaseConnector):
+    """Instagram Graph API (access token auth)"""
+
+    name = 'instagram'
+    BASE_URL = 'https://graph.facebook.com/v18.0'
+    RATE_LIMIT = 3.0
+    BURST = 5
+
+    def __init__(self, base_url=None, credentials=None):
+        super().__init__(base_url or Config.INSTAGRAM_API_BASE, credentials or Config.INSTAGRAM_ACCESS_TOKEN)
+
+    def auth(self):
+        return {}, {'access_token': self.credentials}
+
+    def fetch(self, ref, cursor=None):
+        cursor = cursor or {}
+        profile = self.request('GET', ref, params={'fields': 'followers_count,media_count'})
+        stats = {
+            'followers': int(profile.get('followers_count', 0)),
+            'posts': int(profile.get('media_count', 0))
+        }
+        now = int(time.time())
+        points = [
+            (now, 'instagram_followers', stats['followers']),
+            (now, 'instagram_posts', stats['posts'])
+        ]
+
+        # Daily insights only since the last stored day
+        last_day = cursor.get('last_timestamp')
+        params = {'metric': 'reach', 'period': 'day', 'until': now}
+        if last_day:
+            params['since'] = last_day
+        insights = self.request('GET', f'{ref}/insights', params=params)
+        for series in insights.get('data', []):
+            for value in series.get('values', []):
+                ended = datetime.strptime(value['end_time'][:19], '%Y-%m-%dT%H:%M:%S')
+                day = int((ended - datetime(1970, 1, 1)).total_seconds()) - 86400
+                points.append((day, 'instagram_reach', float(value.get('value', 0))))
+                last_day = max(last_day or day, day)
+
+        return {
+            'stats': stats,
+            'points': points,
+            'cursor': {'last_timestamp': last_day, 'page_token': None, 'etag': None}
+        }
+
+    def publish(self, ref, post):
+        # Graph API publishing is two calls: create a media container, then publish it
+        if not post.get('media_url'):
+            raise ConnectorError('instagram: posts need a media_url')
+        container = self.request('POST', f'{ref}/media', params={
+            'image_url': post['media_url'],
+            'caption': post.get('content', '')
+        })
+        published = self.request('POST', f'{ref}/media_publish', params={'creation_id': container['id']})
+        return published.get('id')
@@ -0,0 +1,63 @@
+"""
+Connector Registry
+Platform connector singletons and configured accounts
+"""
+
+import threading
+
+from config import Config
+from connectors.google import GoogleAnalyticsConnector, SearchConsoleConnector
+from connectors.instagram import InstagramConnector
+from connectors.twitter import TwitterConnector
+from connectors.youtube import YouTubeConnector
+
+CONNECTORS = {
+    'youtube': YouTubeConnector,
+    'twitter': TwitterConnector,
+    'instagram': InstagramConnector,
+    'google_search_console': SearchConsoleConnector,
+    'google_analytics': GoogleAnalyticsConnector
+}
+
+PLATFORMS = list(CONNECTORS)
+
+_instances = {}
+_lock = threading.Lock()
+
+
+def get_connector(platform):
+    """
+    Get the shared connector for a platform
+
+    Args:
+        platform: Platform name from CONNECTORS
+
+    Returns:
+        Connector instance (shared session and rate limiter)
+    """
+    connector = _instances.get(platform)
+    if connector is None:
+        if platform not in CONNECTORS:
+            raise ValueError(f'Unknown platform: {platform}')
+        with _lock:
+            connector = _instances.get(platform)
+            if connector is None:
+                connector = _instances[platform] = CONNECTORS[platform]()
+    return connector
+
+
+def default_accounts():
+    """
+    Accounts to sync, built from configuration
+
+    Returns:
+        List of account dicts mapping platform -> platform account reference
+    """
+    return [{
+        'id': 'default',
+        'youtube': Config.YOUTUBE_CHANNEL_ID,
+        'twitter': Config.TWITTER_USER_ID,
+        'instagram': Config.INSTAGRAM_USER_ID,
+        'google_search_console': Config.SEARCH_CONSOLE_SITE_URL,
+        'google_analytics': Config.GOOGLE_ANALYTICS_TRACKING_ID
+    }]
@@ -0,0 +1,194 @@
+"""
+Sync Engine
+Fetches what changed for every (account, platform) pair concurrently and upserts it
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ai.anomalies import detect_anomalies, get_anomaly_detector, observe_points
+from ai.keywords import index_documents
+from ai.trends import get_metric_tracker, peek_metric_tracker, track_points
+from config import Config
+from connectors.registry import PLATFORMS, default_accounts, get_connector
+from services.cluster import broadcast, bus
+from services.events import publish_event
+from services.insight_refresher import get_insight_refresher
+from services.triggers import run_triggers
+from storage.db import bulk_upsert_points
+from storage.metric_store import get_metric_store, peek_metric_store
+from storage.watermarks import get_cursor, record_failure, record_success
+
+logger = logging.getLogger(__name__)
+
+# Latest stats snapshot per (account, platform) from the most recent successful sync
+_latest_stats = {}
+
+
+def sync_one(account, platform):
+    """
+    Sync a single platform for a single account
+
+    Args:
+        account: Account dict (see registry.default_accounts)
+        platform: Platform name
+
+    Returns:
+        Per-platform sync summary
+    """
+    connector = get_connector(platform)
+    ref = account.get(platform)
+    if not connector.configured or not ref:
+        return {'status': 'skipped', 'reason': 'not configured'}
+
+    started = time.monotonic()
+    cursor = get_cursor(account['id'], platform)
+    try:
+        result = connector.fetch(ref, cursor)
+        points = result['points']
+        if points:
+            # A cold tracker and detector prime from the store, so they must do so before
+            # the store holds this batch: otherwise track_points would count it twice and
+            # the detector would claim its anomalies silently while priming
+            get_metric_tracker(account['id'])
+            get_anomaly_detector(account['id'])
+        ingested = get_metric_store(account['id']).upsert_points(points)
+        bulk_upsert_points(account['id'], platform, connector.CATEGORY, points)
+        if result.get('documents'):
+            index_documents(account['id'], result['documents'])
+        record_success(account['id'], platform, result['cursor'], ingested)
+    except Exception as e:
+        record_failure(account['id'], platform, str(e))
+        return {'status': 'failed', 'error': str(e), 'duration': round(time.monotonic() - started, 3)}
+
+    # The batch is stored and the cursor has moved: a failing step below is reported in
+    # the summary and must not keep the other steps (or other pairs) from seeing the batch
+    errors = {}
+
+    def step(name, fn, *args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            logger.warning('Sync %s/%s: %s step failed: %s', account['id'], platform, name, e)
+            errors[name] = str(e)
+
+    if points or result['stats'] is not None:
+        broadcast('ingest', {
+            'account': account['id'],
+            'platform': platform,
+            'points': points,
+            'stats': result['stats']
+        })
+    if points:
+        latest = {metric: value for _, metric, value in sorted(points, key=lambda p: p[0])}
+        step('events', publish_event, 'metrics', {
+            'account': account['id'],
+            'platform': platform,
+            'points': ingested,
+            'latest': latest
+        })
+        step('triggers', run_triggers, account['id'], points)
+        step('trends', track_points, account['id'], points)
+        step('anomalies', detect_anomalies, account['id'], points)
+    if points or result.get('documents'):
+        step('insights', lambda: get_insight_refresher().mark_dirty(
+            account['id'], {metric for _, metric, _ in points}, topics=bool(result.get('documents'))
+        ))
+    if result['stats'] is not None:
+        step('stats', _set_latest_stats, account['id'], platform, result['stats'])
+    summary = {
+        'status': 'success',
+        'incremental': cursor is not None,
+        'points': ingested,
+        'duration': round(time.monotonic() - started, 3)
+    }
+    if errors:
+        summary['errors'] = errors
+    return summary
+
+
+def _set_latest_stats(account_id, platform, stats):
+    _latest_stats[(account_id, platform)] = dict(stats, synced_at=datetime.utcnow().isoformat())
+
+
+def _apply_ingest(payload):
+    """
+    Mirror another worker's sync into the in-memory state this worker has loaded
+
+    Stores, trackers and detectors not loaded here are skipped: they are built from
+    MongoDB on first use, which already holds the synced points. The metrics are marked
+    dirty here too, for when this worker leads insight refreshes.
+    """
+    account_id = payload['account']
+    points = [tuple(point) for point in payload['points']]
+    if points:
+        tracker = peek_metric_tracker(account_id)
+        store = peek_metric_store(account_id)
+        if store is not None:
+            store.upsert_points(points)
+        if tracker is not None:
+            track_points(account_id, points)
+        observe_points(account_id, points)
+        get_insight_refresher().mark_dirty(account_id, {metric for _, metric, _ in points})
+    if payload.get('stats') is not None:
+        _set_latest_stats(account_id, payload['platform'], payload['stats'])
+
+
+bus.on('ingest', _apply_ingest)
+
+
+def sync_accounts(accounts=None, platforms=None):
+    """
+    Sync many accounts across many platforms concurrently
+
+    Every (account, platform) pair runs on its own thread, bounded by SYNC_MAX_WORKERS,
+    so a full sync takes roughly as long as the slowest platform rather than the sum.
+    Per-platform rate limiters inside the connectors keep quotas intact.
+
+    Args:
+        accounts: List of account dicts (defaults to configured accounts)
+        platforms: List of platform names (defaults to all)
+
+    Returns:
+        Sync summary keyed by account and platform
+    """
+    accounts = accounts or default_accounts()
+    platforms = platforms or PLATFORMS
+    tasks = [(account, platform) for account in accounts for platform in platforms]
+
+    started_at = datetime.utcnow().isoformat()
+    started = time.monotonic()
+    summary = {account['id']: {} for account in accounts}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(tasks), Config.SYNC_MAX_WORKERS))) as pool:
+        futures = {pool.submit(sync_one, account, platform): (account['id'], platform)
+                   for account, platform in tasks}
+        for future, (account_id, platform) in futures.items():
+            try:
+                summary[account_id][platform] = future.result()
+            except Exception as e:
+                # One pair failing outside its own guards must not fail the whole sync
+                logger.warning('Sync %s/%s failed: %s', account_id, platform, e)
+                summary[account_id][platform] = {'status': 'failed', 'error': str(e)}
+
+    return {
+        'accounts': summary,
+        'started_at': started_at,
+        'finished_at': datetime.utcnow().isoformat(),
+        'duration': round(time.monotonic() - started, 3)
+    }
+
+
+def get_latest_stats(platform, account='default'):
+    """
+    Get the stats snapshot from the last successful sync
+
+    Args:
+        platform: Platform name
+        account: Account identifier
+
+    Returns:
+        Stats dict or None if the platform has not been synced
+    """
+    return _latest_stats.get((account, platform))
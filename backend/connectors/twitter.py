@@ -0,0 +1,115 @@
+"""
+Twitter Connector
+Account metrics from the Twitter (X) API v2
+"""
+
+import time
+from datetime import datetime
+
+from config import Config
+from connectors.base import BaseConnector, ConnectorError
+
+# Timeline pages fetched per sync (100 tweets each)
+MAX_PAGES = 10
+
+ENGAGEMENT_FIELDS = ('like_count', 'retweet_count', 'reply_count', 'quote_count')
+
+
+def parse_page_token(token):
+    """
+    Split a stored timeline watermark
+
+    The watermark is the since_id of the next sync. While a backlog longer than MAX_PAGES
+    is being read it is 'since_id:until_id:newest_id' instead: the oldest tweet read so far
+    (the next sync resumes below it) and the newest one, which becomes the since_id once
+    the backlog is drained.
+
+    Returns:
+        Tuple of (since_id, until_id, newest_id), None where absent
+    """
+    if not token:
+        return None, None, None
+    parts = token.split(':')
+    if len(parts) == 1:
+        return token, None, None
+    return tuple(part or None for part in parts)
+
+
+class TwitterConnector(BaseConnector):
+    """Twitter API v2 (bearer token auth)"""
+
+    name = 'twitter'
+    BASE_URL = 'https://api.twitter.com/2'
+    RATE_LIMIT = 1.0
+    BURST = 5
+
+    def __init__(self, base_url=None, credentials=None):
+        super().__init__(base_url or Config.TWITTER_API_BASE, credentials or Config.TWITTER_BEARER_TOKEN)
+
+    def auth(self):
+        return {'Authorization': f'Bearer {self.credentials}'}, {}
+
+    def fetch(self, ref, cursor=None):
+        cursor = cursor or {}
+        data = self.request('GET', f'users/{ref}', params={'user.fields': 'public_metrics'})
+        metrics = data.get('data', {}).get('public_metrics', {})
+        stats = {
+            'followers': int(metrics.get('followers_count', 0)),
+            'following': int(metrics.get('following_count', 0)),
+            'tweets': int(metrics.get('tweet_count', 0))
+        }
+        now = int(time.time())
+        points = [
+            (now, 'twitter_followers', stats['followers']),
+            (now, 'twitter_tweets', stats['tweets'])
+        ]
+
+        documents = []
+
+        # Only tweets newer than the stored since_id, newest first (see parse_page_token)
+        since_id, oldest_id, newest_id = parse_page_token(cursor.get('page_token'))
+        params = {'tweet.fields': 'created_at,public_metrics', 'max_results': 100}
+        if since_id:
+            params['since_id'] = since_id
+        if oldest_id:
+            params['until_id'] = oldest_id
+        drained = False
+        for _ in range(MAX_PAGES):
+            timeline = self.request('GET', f'users/{ref}/tweets', params=params)
+            meta = timeline.get('meta', {})
+            if newest_id is None and meta.get('newest_id'):
+                newest_id = meta['newest_id']
+            if meta.get('oldest_id'):
+                oldest_id = meta['oldest_id']
+            for tweet in timeline.get('data', []):
+                created = datetime.strptime(tweet['created_at'][:19], '%Y-%m-%dT%H:%M:%S')
+                created = int((created - datetime(1970, 1, 1)).total_seconds())
+                counts = tweet.get('public_metrics', {})
+                engagements = sum(counts.get(k, 0) for k in ENGAGEMENT_FIELDS)
+                points.append((created, 'twitter_engagements', float(engagements)))
+                if tweet.get('text'):
+                    documents.append({
+                        'id': f"twitter:{tweet['id']}", 'text': tweet['text'], 'kind': 'post', 'timestamp': created
+                    })
+            if not meta.get('next_token'):
+                drained = True
+                break
+            params['pagination_token'] = meta['next_token']
+
+        # The since_id only moves past tweets once everything newer than it has been read
+        if drained:
+            page_token = newest_id or since_id
+        else:
+            page_token = f"{since_id or ''}:{oldest_id}:{newest_id}"
+        return {
+            'stats': stats,
+            'points': points,
+            'documents': documents,
+            'cursor': {'last_timestamp': now, 'page_token': page_token, 'etag': None}
+        }
+
+    def publish(self, ref, post):
+        if not post.get('content'):
+            raise ConnectorError('twitter: post has no content')
+        data = self.request('POST', 'tweets', json={'text': post['content']})
+        return data.get('data', {}).get('id')
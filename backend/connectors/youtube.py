@@ -0,0 +1,54 @@
+"""
+YouTube Connector
+Channel statistics from the YouTube Data API v3
+"""
+
+import time
+
+from config import Config
+from connectors.base import BaseConnector, ConnectorError
+
+
+class YouTubeConnector(BaseConnector):
+    """YouTube Data API v3 (API key auth)"""
+
+    name = 'youtube'
+    BASE_URL = 'https://www.googleapis.com/youtube/v3'
+    RATE_LIMIT = 10.0
+    BURST = 10
+
+    def __init__(self, base_url=None, credentials=None):
+        super().__init__(base_url or Config.YOUTUBE_API_BASE, credentials or Config.YOUTUBE_API_KEY)
+
+    def auth(self):
+        return {}, {'key': self.credentials}
+
+    def fetch(self, ref, cursor=None):
+        cursor = cursor or {}
+        data, etag = self.request_conditional(
+            'GET', 'channels', cursor.get('etag'), params={'part': 'statistics', 'id': ref}
+        )
+        if data is None:
+            # 304: channel statistics unchanged since the last sync
+            return {'stats': None, 'points': [], 'cursor': dict(cursor, etag=etag)}
+
+        items = data.get('items') or []
+        if not items:
+            raise ConnectorError(f'youtube: channel {ref} not found')
+
+        statistics = items[0].get('statistics', {})
+        stats = {
+            'subscribers': int(statistics.get('subscriberCount', 0)),
+            'total_views': int(statistics.get('viewCount', 0)),
+            'videos': int(statistics.get('videoCount', 0))
+        }
+        now = int(time.time())
+        return {
+            'stats': stats,
+            'points': [
+                (now, 'youtube_subscribers', stats['subscribers']),
+                (now, 'youtube_views', stats['total_views']),
+                (now, 'youtube_videos', stats['videos'])
+            ],
+            'cursor': {'last_timestamp': now, 'page_token': None, 'etag': etag}
+        }
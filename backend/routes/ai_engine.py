@@ -5,31 +5,164 @@ Handles AI predictions, insights, and recommendations
 
 from flask import Blueprint, jsonify, request
 from datetime import datetime
-import random
+import hashlib
+import time
 
 # Import AI modules
-from ai.predictor import predict_engagement, predict_trend
-from ai.insights import generate_insights
-from ai.recommendations import get_recommendations
+from ai.executor import ExecutorSaturated, JobTimeout, ai_executor
+from ai.predictor import (
+    get_cache_stats, parse_horizon, predict_batch, predict_best_posting_time, predict_engagement,
+    predict_trend
+)
+from ai.insights import detect_trends
+from ai.keywords import DOCUMENT_KINDS, get_keyword_index, index_documents
+from ai.llm import get_llm_client
+from ai.sentiment import analyze_sentiment_batch, get_sentiment_cache_stats, summarize_sentiment
+from ai.recommendations import (
+    LEVELS, get_action_plan, get_plan_cache_stats, get_recommendations, plan_accounts
+)
+from config import Config
+from services.insight_refresher import get_insight_refresher
+from services.jobs import JobQueueFull, get_job_manager, job_handle
+from services.response_cache import cached_response, get_response_cache_stats, invalidate_responses
+from storage.insights import generated_insights
+from storage.metric_store import UnknownMetricError
 
 ai_bp = Blueprint('ai', __name__)
 
+# Upper bound on jobs accepted by a single batch request
+MAX_BATCH_JOBS = 100
+
 @ai_bp.route('/predict', methods=['POST'])
 def predict():
     """Generate predictions based on historical data"""
     try:
         data = request.get_json()
         metric_type = data.get('metric_type', 'engagement')
-        time_horizon = data.get('time_horizon', 7)  # days
+        account = data.get('account', 'default')
+        try:
+            time_horizon = parse_horizon(data.get('time_horizon', 7))  # days
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        if data.get('async'):
+            job = get_job_manager().submit('predict', predict_engagement, metric_type, time_horizon, account)
+            return jsonify({
+                'success': True,
+                'job': job_handle(job)
+            }), 202
         
         # Call prediction model
-        prediction = predict_engagement(metric_type, time_horizon)
+        prediction = predict_engagement(metric_type, time_horizon, account)
         
         return jsonify({
             'success': True,
             'prediction': prediction,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
+    except UnknownMetricError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except (ExecutorSaturated, JobQueueFull) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '1'}
+    except JobTimeout as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ai_bp.route('/predict/batch', methods=['POST'])
+def predict_many():
+    """Run several prediction and trend jobs in one request"""
+    try:
+        data = request.get_json()
+        jobs = data.get('jobs', [])
+        account = data.get('account', 'default')
+        
+        if not isinstance(jobs, list) or not jobs:
+            return jsonify({
+                'success': False,
+                'error': 'jobs must be a non-empty list'
+            }), 400
+        if len(jobs) > MAX_BATCH_JOBS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_BATCH_JOBS} jobs per batch'
+            }), 400
+        
+        if data.get('async'):
+            job = get_job_manager().submit('predict_batch', predict_batch, jobs, account)
+            return jsonify({
+                'success': True,
+                'job': job_handle(job)
+            }), 202
+        
+        results = predict_batch(jobs, account)
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except (ExecutorSaturated, JobQueueFull) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '1'}
+    except JobTimeout as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ai_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Get forecast/model cache hit and miss counters"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': dict(
+                get_cache_stats(),
+                responses=get_response_cache_stats(),
+                sentiment=get_sentiment_cache_stats(),
+                llm=get_llm_client().stats(),
+                plans=get_plan_cache_stats()
+            ),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ai_bp.route('/executor/stats', methods=['GET'])
+def executor_stats():
+    """Get AI process pool load and rejection counters"""
+    try:
+        return jsonify({
+            'success': True,
+            'executor': ai_executor.stats(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
     except Exception as e:
         return jsonify({
             'success': False,
@@ -37,11 +170,25 @@ def predict():
         }), 500
 
 @ai_bp.route('/insights', methods=['GET'])
+@cached_response(ttl=60)
 def get_insights():
-    """Get AI-generated insights from current data"""
+    """Get the account's materialized AI insights, most significant first"""
     try:
-        # Generate insights using AI
-        insights = generate_insights()
+        account = request.args.get('account', 'default')
+        k = min(max(request.args.get('k', Config.INSIGHT_TOP_K, type=int), 1), Config.INSIGHT_MATERIALIZE_K)
+        priority = request.args.get('priority')
+        if priority not in (None, 'low', 'medium', 'high'):
+            return jsonify({
+                'success': False,
+                'error': 'priority must be one of low, medium, high'
+            }), 400
+        
+        insights = generated_insights(account, k, priority)
+        refresher = get_insight_refresher()
+        if not insights and not refresher.refreshed(account) \
+                and (priority is None or not generated_insights(account, 1)):
+            # No generation stored yet for this account: materialize now
+            insights = [i for i in refresher.refresh(account) if priority in (None, i['priority'])][:k]
         
         return jsonify({
             'success': True,
@@ -54,13 +201,37 @@ def get_insights():
             'error': str(e)
         }), 500
 
+@ai_bp.route('/insights/stats', methods=['GET'])
+def insight_stats():
+    """Get insight refresher counters and pending dirty accounts"""
+    try:
+        return jsonify({
+            'success': True,
+            'refresher': get_insight_refresher().stats(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @ai_bp.route('/recommendations', methods=['GET'])
+@cached_response(ttl=300)
 def recommendations():
-    """Get AI-powered recommendations"""
+    """Get AI-powered recommendations ranked for an account's goals and metric trends"""
     try:
         category = request.args.get('category', 'all')
+        account = request.args.get('account', 'default')
+        max_effort = request.args.get('max_effort')
+        if max_effort is not None and max_effort not in LEVELS:
+            return jsonify({
+                'success': False,
+                'error': 'max_effort must be one of low, medium, high'
+            }), 400
+        k = min(max(request.args.get('k', 10, type=int), 1), 100)
         
-        recommendations = get_recommendations(category)
+        recommendations = get_recommendations(category, account, request.args.get('goals'), k, max_effort)
         
         return jsonify({
             'success': True,
@@ -73,20 +244,129 @@ def recommendations():
             'error': str(e)
         }), 500
 
+@ai_bp.route('/action-plan', methods=['GET'])
+@cached_response(ttl=300)
+def action_plan():
+    """Get an account's action plan with ROI estimates, from the nightly batch when available"""
+    try:
+        account = request.args.get('account', 'default')
+        k = min(max(request.args.get('k', 10, type=int), 1), 100)
+        
+        plan = get_action_plan(account, request.args.get('goals'), k)
+        
+        return jsonify({
+            'success': True,
+            'plan': plan,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ai_bp.route('/action-plan/batch', methods=['POST'])
+def action_plan_batch():
+    """Compute and cache action plans for many accounts in vectorized passes"""
+    try:
+        data = request.get_json()
+        accounts = data.get('accounts', [])
+        growth = data.get('growth') or {}
+        goals = data.get('goals')
+        k = min(max(int(data.get('k', 10)), 1), 100)
+        
+        if not isinstance(accounts, list) or not accounts:
+            return jsonify({
+                'success': False,
+                'error': 'accounts must be a non-empty list'
+            }), 400
+        if not isinstance(growth, dict):
+            return jsonify({
+                'success': False,
+                'error': 'growth must map accounts to {metric: growth}'
+            }), 400
+        
+        if data.get('async') or len(accounts) > Config.PLAN_SYNC_MAX_ACCOUNTS:
+            job = get_job_manager().submit('action_plans', _plan_accounts_job, accounts, growth, goals, k)
+            return jsonify({
+                'success': True,
+                'job': job_handle(job)
+            }), 202
+        
+        plan_accounts(accounts, growth, goals, k)
+        invalidate_responses('/api/ai/action-plan')
+        
+        return jsonify({
+            'success': True,
+            'plans': {account: get_action_plan(account, goals, k) for account in accounts},
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except JobQueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _plan_accounts_job(accounts, growth, goals, k):
+    started = time.time()
+    computed = plan_accounts(accounts, growth, goals, k)
+    invalidate_responses('/api/ai/action-plan')
+    return {'accounts': computed, 'seconds': round(time.time() - started, 3)}
+
 @ai_bp.route('/trend-analysis', methods=['POST'])
 def trend_analysis():
     """Analyze trends in data"""
     try:
         data = request.get_json()
         metric = data.get('metric', 'traffic')
+        account = data.get('account', 'default')
         
-        trend_data = predict_trend(metric)
+        trend_data = predict_trend(metric, account)
         
         return jsonify({
             'success': True,
             'trend': trend_data,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
+    except UnknownMetricError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except (ExecutorSaturated, JobQueueFull) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '1'}
+    except JobTimeout as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ai_bp.route('/trends', methods=['GET'])
+@cached_response(ttl=60)
+def trends():
+    """Get emerging and declining topics, metric momentum and weekly patterns"""
+    try:
+        account = request.args.get('account', 'default')
+        k = min(max(request.args.get('k', 5, type=int), 1), 50)
+        
+        return jsonify({
+            'success': True,
+            'trends': detect_trends(account=account, k=k),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
     except Exception as e:
         return jsonify({
             'success': False,
@@ -94,28 +374,14 @@ def trend_analysis():
         }), 500
 
 @ai_bp.route('/best-time-to-post', methods=['GET'])
+@cached_response(ttl=300)
 def best_time_to_post():
-    """Predict best times to post content"""
+    """Predict best times to post content from historical engagement"""
     try:
         platform = request.args.get('platform', 'all')
+        account = request.args.get('account', 'default')
         
-        # AI prediction for optimal posting times
-        best_times = {
-            'today': [
-                {'time': '09:00', 'score': 0.92, 'reason': 'High engagement period'},
-                {'time': '13:00', 'score': 0.85, 'reason': 'Lunch break peak'},
-                {'time': '19:00', 'score': 0.88, 'reason': 'Evening engagement spike'}
-            ],
-            'weekly_pattern': {
-                'Monday': 0.78,
-                'Tuesday': 0.85,
-                'Wednesday': 0.92,
-                'Thursday': 0.88,
-                'Friday': 0.75,
-                'Saturday': 0.65,
-                'Sunday': 0.70
-            }
-        }
+        best_times = predict_best_posting_time(platform, account)
         
         return jsonify({
             'success': True,
@@ -131,17 +397,34 @@ def best_time_to_post():
 
 @ai_bp.route('/sentiment', methods=['POST'])
 def analyze_sentiment():
-    """Analyze sentiment of content or comments"""
+    """Analyze sentiment of one text or a batch of comments"""
     try:
-        data = request.get_json()
-        text = data.get('text', '')
+        data = request.get_json(silent=True) or {}
+        texts = data.get('texts')
+        
+        if texts is not None:
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                return jsonify({
+                    'success': False,
+                    'error': 'texts must be a list of strings'
+                }), 400
+            if len(texts) > Config.SENTIMENT_MAX_BATCH:
+                return jsonify({
+                    'success': False,
+                    'error': f'At most {Config.SENTIMENT_MAX_BATCH} texts per request'
+                }), 400
+            
+            results = analyze_sentiment_batch(texts)
+            return jsonify({
+                'success': True,
+                'results': results,
+                'summary': summarize_sentiment(results),
+                'timestamp': datetime.utcnow().isoformat()
+            }), 200
         
-        # Placeholder for sentiment analysis
-        sentiment = {
-            'score': round(random.uniform(0.5, 1.0), 2),
-            'label': random.choice(['positive', 'neutral', 'negative']),
-            'keywords': ['AI', 'marketing', 'automation', 'growth']
-        }
+        text = str(data.get('text', ''))
+        sentiment = analyze_sentiment_batch([text])[0]
+        sentiment['keywords'] = get_keyword_index(data.get('account', 'default')).extract_keywords(text, 4)
         
         return jsonify({
             'success': True,
@@ -154,3 +437,89 @@ def analyze_sentiment():
             'error': str(e)
         }), 500
 
+@ai_bp.route('/keywords', methods=['GET'])
+@cached_response(ttl=60)
+def top_keywords():
+    """Get the top keywords across an account's posts, comments and pages"""
+    try:
+        account = request.args.get('account', 'default')
+        k = min(max(request.args.get('k', 20, type=int), 1), 200)
+        min_df = request.args.get('min_documents', 2, type=int)
+        index = get_keyword_index(account)
+        
+        return jsonify({
+            'success': True,
+            'keywords': index.top_keywords(k, min_df),
+            'index': index.stats(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ai_bp.route('/keywords/search', methods=['GET'])
+def search_keywords():
+    """Find the documents most relevant to a keyword or topic"""
+    try:
+        query = request.args.get('q', '')
+        kind = request.args.get('kind')
+        if not query or (kind is not None and kind not in DOCUMENT_KINDS):
+            return jsonify({
+                'success': False,
+                'error': f"q is required and kind must be one of {', '.join(DOCUMENT_KINDS)}"
+            }), 400
+        
+        k = min(max(request.args.get('k', 10, type=int), 1), 100)
+        index = get_keyword_index(request.args.get('account', 'default'))
+        
+        return jsonify({
+            'success': True,
+            'query': query,
+            'documents': index.search(query, k, kind),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@ai_bp.route('/keywords/documents', methods=['POST'])
+def add_keyword_documents():
+    """Add posts, comments or page content to the keyword index"""
+    try:
+        data = request.get_json(silent=True) or {}
+        account = data.get('account', 'default')
+        now = int(time.time())
+        documents = []
+        for doc in data.get('documents') or []:
+            text = doc.get('text') if isinstance(doc, dict) else None
+            if not isinstance(text, str) or doc.get('kind', 'post') not in DOCUMENT_KINDS:
+                return jsonify({
+                    'success': False,
+                    'error': f"Each document needs text and a kind of {', '.join(DOCUMENT_KINDS)}"
+                }), 400
+            documents.append({
+                'id': str(doc.get('id') or hashlib.sha1(text.encode('utf-8')).hexdigest()),
+                'text': text,
+                'kind': doc.get('kind', 'post'),
+                'timestamp': int(doc.get('timestamp', now))
+            })
+        
+        added = index_documents(account, documents)
+        if added:
+            invalidate_responses('/api/ai/keywords')
+            get_insight_refresher().mark_dirty(account, (), topics=True)
+        
+        return jsonify({
+            'success': True,
+            'added': added,
+            'duplicates': len(documents) - added
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -4,11 +4,59 @@ Handles data aggregation and metrics endpoints
 """
 
 from flask import Blueprint, jsonify, request
-from datetime import datetime, timedelta
+from datetime import datetime
 import random
 
+from services.response_cache import cached_response
+from services.streaming import ndjson_response, wants_ndjson
+from storage.metric_store import (
+    INTERVALS, UnknownMetricError, bucket_start, format_timestamps, get_metric_store, to_epoch_seconds,
+    to_json_list
+)
+
 analytics_bp = Blueprint('analytics', __name__)
 
+# Relative week-over-week change treated as flat
+TREND_TOLERANCE = 0.02
+
+def window_totals(store, metrics, days, agg=None):
+    """
+    Aggregate the metrics a store actually holds over the trailing `days` days
+
+    Args:
+        store: MetricStore to read
+        metrics: Metric names to look up
+        days: Window length in days, ending now
+        agg: Aggregation override (defaults per metric)
+
+    Returns:
+        Dictionary of metric -> value, omitting unknown metrics and empty windows
+    """
+    known = [m for m in metrics if m in store.metrics]
+    if not known:
+        return {}
+    now = to_epoch_seconds(datetime.utcnow())
+    values = store.aggregate(known, now + 1 - days * 86400, now + 1, agg)
+    return {m: float(v) for m, v in zip(known, values) if v == v}
+
+def week_trend(store, metric):
+    """Compare the last 7 days with the 7 before them: 'up', 'down' or 'stable'"""
+    if metric not in store.metrics:
+        return 'stable'
+    now = to_epoch_seconds(datetime.utcnow())
+    previous, current = (
+        store.aggregate([metric], now + 1 - weeks * 7 * 86400, now + 1 - (weeks - 1) * 7 * 86400)[0]
+        for weeks in (2, 1)
+    )
+    if not previous or previous != previous or current != current:
+        return 'stable'
+    change = (current - previous) / abs(previous)
+    if change > TREND_TOLERANCE:
+        return 'up'
+    if change < -TREND_TOLERANCE:
+        return 'down'
+    return 'stable'
+
 # Sample data generator (replace with real API calls)
 def generate_sample_metrics():
     """Generate sample metrics for demo purposes"""
@@ -35,10 +83,33 @@ def generate_sample_metrics():
     }
 
 @analytics_bp.route('/overview', methods=['GET'])
+@cached_response(ttl=30)
 def get_overview():
     """Get overall analytics overview"""
     try:
+        account = request.args.get('account', 'default')
+        store = get_metric_store(account)
         metrics = generate_sample_metrics()
+        
+        # Overlay whatever the store holds, read from daily rollups
+        week = window_totals(store, ['traffic', 'search_clicks', 'engagement', 'social', 'instagram_reach'], 7)
+        today = window_totals(store, ['conversions', 'social'], 1)
+        followers = window_totals(
+            store, ['youtube_subscribers', 'twitter_followers', 'instagram_followers'], 30, 'last'
+        )
+        seo_metric = 'search_clicks' if 'search_clicks' in week else 'traffic'
+        if seo_metric in week:
+            metrics['seo']['organic_traffic'] = int(round(week[seo_metric]))
+            metrics['seo']['trend'] = week_trend(store, seo_metric)
+        if followers:
+            metrics['social']['total_followers'] = int(sum(followers.values()))
+        if 'engagement' in week:
+            metrics['social']['engagement_rate'] = round(week['engagement'], 2)
+        if 'social' in today:
+            metrics['social']['reach'] = int(round(today['social']))
+        if 'conversions' in today:
+            metrics['content']['conversions'] = int(round(today['conversions']))
+        
         return jsonify({
             'success': True,
             'data': metrics,
@@ -50,27 +121,67 @@ def get_overview():
             'error': str(e)
         }), 500
 
+def timeseries_rows(store, metrics, start, end, interval):
+    """Yield timeseries rows window by window, so exports of any range use constant memory"""
+    for buckets, values in store.iter_resample(metrics, start, end, interval):
+        dates = format_timestamps(buckets, interval)
+        if len(metrics) == 1:
+            for date, value in zip(dates, to_json_list(values[0])):
+                yield {'date': date, 'value': value}
+        else:
+            for date, row in zip(dates, zip(*to_json_list(values))):
+                yield dict(zip(metrics, row), date=date)
+
 @analytics_bp.route('/timeseries', methods=['GET'])
 def get_timeseries():
     """Get time series data for charts"""
     try:
         days = int(request.args.get('days', 7))
         metric = request.args.get('metric', 'traffic')
+        interval = request.args.get('interval', 'day')
+        account = request.args.get('account', 'default')
+        metrics = [m.strip() for m in metric.split(',') if m.strip()]
+        if interval not in INTERVALS:
+            return jsonify({
+                'success': False,
+                'error': f"interval must be one of {', '.join(INTERVALS)}"
+            }), 400
         
-        # Generate sample time series data
-        data = []
-        for i in range(days):
-            date = datetime.utcnow() - timedelta(days=days-i-1)
-            data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'value': random.randint(1000, 5000)
-            })
+        # Window covers the last `days` calendar days including today
+        now = to_epoch_seconds(datetime.utcnow())
+        start = bucket_start(now, 'day') - (days - 1) * 86400
+        
+        store = get_metric_store(account)
+        if wants_ndjson(request.args):
+            store.resample(metrics, now, now + 1, interval)  # Validate before streaming starts
+            return ndjson_response(timeseries_rows(store, metrics, start, now + 1, interval))
+        
+        buckets, values = store.resample(metrics, start, now + 1, interval)
+        dates = format_timestamps(buckets, interval)
+        
+        if len(metrics) == 1:
+            data = [
+                {'date': date, 'value': value}
+                for date, value in zip(dates, to_json_list(values[0]))
+            ]
+        else:
+            columns = to_json_list(values)
+            data = [
+                dict(zip(metrics, row), date=date)
+                for date, row in zip(dates, zip(*columns))
+            ]
         
         return jsonify({
             'success': True,
             'metric': metric,
+            'interval': interval,
             'data': data
         }), 200
+    except UnknownMetricError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -78,9 +189,12 @@ def get_timeseries():
         }), 500
 
 @analytics_bp.route('/social-metrics', methods=['GET'])
+@cached_response(ttl=60)
 def get_social_metrics():
     """Get detailed social media metrics"""
     try:
+        account = request.args.get('account', 'default')
+        store = get_metric_store(account)
         platforms = {
             'youtube': {
                 'subscribers': random.randint(5000, 50000),
@@ -102,6 +216,21 @@ def get_social_metrics():
             }
         }
         
+        # Synced platform metrics replace the sample values they correspond to
+        synced = {
+            'youtube': {'subscribers': 'youtube_subscribers', 'views': 'youtube_views', 'videos': 'youtube_videos'},
+            'twitter': {'followers': 'twitter_followers', 'tweets': 'twitter_tweets'},
+            'instagram': {'followers': 'instagram_followers', 'posts': 'instagram_posts'}
+        }
+        for platform, fields in synced.items():
+            latest = window_totals(store, list(fields.values()), 30, 'last')
+            for field, metric in fields.items():
+                if metric in latest:
+                    platforms[platform][field] = int(latest[metric])
+        reach = window_totals(store, ['instagram_reach'], 7)
+        if 'instagram_reach' in reach:
+            platforms['instagram']['reach'] = int(reach['instagram_reach'])
+        
         return jsonify({
             'success': True,
             'data': platforms,
@@ -114,6 +243,7 @@ def get_social_metrics():
         }), 500
 
 @analytics_bp.route('/seo-health', methods=['GET'])
+@cached_response(ttl=300)
 def get_seo_health():
     """Get SEO health metrics"""
     try:
@@ -4,41 +4,37 @@ Handles autonomous actions and workflows
 """
 
 from flask import Blueprint, jsonify, request
-from datetime import datetime
-import random
+from datetime import datetime, timezone
+
+from connectors.registry import PLATFORMS
+from routes.integrations import time_ago
+from services.scheduler import get_scheduler, next_best_time
+from services.streaming import ndjson_response, wants_ndjson
+from services.triggers import ALL_ACCOUNTS, DEFAULT_COOLDOWN, get_trigger_engine, run_triggers
+from services.workflows import get_workflow_engine, run_action
+from storage.automation_logs import iter_automation_logs, recent_automation_logs
 
 automation_bp = Blueprint('automation', __name__)
 
+def describe_trigger(trigger):
+    """Shape a trigger for API responses"""
+    last = trigger['last_triggered']
+    return {
+        'id': trigger['id'],
+        'name': trigger['name'],
+        'status': trigger['status'],
+        'condition': trigger['condition'],
+        'action': trigger['action'],
+        'account': trigger['account'],
+        'last_triggered': time_ago(last) if last else 'Never'
+    }
+
 @automation_bp.route('/triggers', methods=['GET'])
 def get_triggers():
     """Get list of active automation triggers"""
     try:
-        triggers = [
-            {
-                'id': 1,
-                'name': 'Low Engagement Alert',
-                'status': 'active',
-                'condition': 'engagement_rate < 3%',
-                'action': 'Send notification',
-                'last_triggered': '2 hours ago'
-            },
-            {
-                'id': 2,
-                'name': 'Auto-Post Scheduler',
-                'status': 'active',
-                'condition': 'Best time reached',
-                'action': 'Post to social media',
-                'last_triggered': '5 hours ago'
-            },
-            {
-                'id': 3,
-                'name': 'SEO Rank Drop Alert',
-                'status': 'active',
-                'condition': 'rank_drop > 5 positions',
-                'action': 'Notify team + suggest fixes',
-                'last_triggered': 'Never'
-            }
-        ]
+        account = request.args.get('account')
+        triggers = [describe_trigger(t) for t in get_trigger_engine().list(account)]
         
         return jsonify({
             'success': True,
@@ -51,24 +47,116 @@ def get_triggers():
             'error': str(e)
         }), 500
 
+@automation_bp.route('/triggers', methods=['POST'])
+def create_trigger():
+    """Create a trigger; its condition is compiled and indexed immediately"""
+    try:
+        data = request.get_json() or {}
+        if not data.get('name') or not data.get('condition') or not data.get('action'):
+            return jsonify({
+                'success': False,
+                'error': 'name, condition and action are required'
+            }), 400
+        
+        try:
+            trigger = get_trigger_engine().add(
+                data['name'], data['condition'], data['action'],
+                account=data.get('account', ALL_ACCOUNTS),
+                cooldown=int(data.get('cooldown', DEFAULT_COOLDOWN))
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'trigger': describe_trigger(trigger)
+        }), 201
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/triggers/<int:trigger_id>', methods=['DELETE'])
+def delete_trigger(trigger_id):
+    """Delete a trigger"""
+    try:
+        if not get_trigger_engine().remove(trigger_id):
+            return jsonify({
+                'success': False,
+                'error': 'Trigger not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'deleted': trigger_id
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/triggers/evaluate', methods=['POST'])
+def evaluate_triggers():
+    """Push metric values through the trigger engine, e.g. from an external pipeline"""
+    try:
+        data = request.get_json() or {}
+        account = data.get('account', 'default')
+        now = datetime.utcnow().timestamp()
+        points = [(now, p['metric'], float(p['value'])) for p in data.get('points', [])]
+        if 'metric' in data:
+            points.append((now, data['metric'], float(data['value'])))
+        
+        fired = run_triggers(account, points)
+        
+        return jsonify({
+            'success': True,
+            'evaluated': len(points),
+            'fired': [describe_trigger(t) for t in fired],
+            'engine': get_trigger_engine().stats()
+        }), 200
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid points: {e}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @automation_bp.route('/execute', methods=['POST'])
 def execute_action():
     """Execute an automation action"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         action_type = data.get('action_type')
         params = data.get('params', {})
+        if not action_type:
+            return jsonify({
+                'success': False,
+                'error': 'action_type is required'
+            }), 400
         
-        # Simulate action execution
+        run = run_action(str(action_type), params, data.get('account', 'default'))
+        step = run['steps']['action']
         result = {
             'action': action_type,
-            'status': 'completed',
-            'details': f'Successfully executed {action_type}',
+            'status': 'completed' if step['status'] == 'succeeded' else step['status'],
+            'details': (step['result'] or {}).get('details', f'Successfully executed {action_type}')
+            if step['status'] == 'succeeded' else step['error'],
+            'attempts': step['attempts'],
+            'duration_ms': step['duration_ms'],
             'execution_time': datetime.utcnow().isoformat()
         }
         
         return jsonify({
-            'success': True,
+            'success': step['status'] == 'succeeded',
             'result': result
         }), 200
     except Exception as e:
@@ -81,15 +169,14 @@ def execute_action():
 def create_workflow():
     """Create a new automation workflow"""
     try:
-        data = request.get_json()
-        workflow = {
-            'id': random.randint(1000, 9999),
-            'name': data.get('name'),
-            'trigger': data.get('trigger'),
-            'actions': data.get('actions', []),
-            'status': 'active',
-            'created_at': datetime.utcnow().isoformat()
-        }
+        data = request.get_json() or {}
+        try:
+            workflow = get_workflow_engine().create(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
         return jsonify({
             'success': True,
@@ -101,10 +188,214 @@ def create_workflow():
             'error': str(e)
         }), 500
 
+@automation_bp.route('/workflows', methods=['GET'])
+def list_workflows():
+    """List saved workflows"""
+    try:
+        return jsonify({
+            'success': True,
+            'workflows': get_workflow_engine().list(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/workflow/<workflow_id>/run', methods=['POST'])
+def run_workflow(workflow_id):
+    """Start a workflow run; repeating an Idempotency-Key returns the original run"""
+    try:
+        engine = get_workflow_engine()
+        workflow = engine.get(workflow_id)
+        if workflow is None:
+            return jsonify({
+                'success': False,
+                'error': 'Workflow not found'
+            }), 404
+        
+        data = request.get_json(silent=True) or {}
+        key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        run = engine.start(workflow, idempotency_key=key, account=data.get('account'))
+        wait = min(max(float(data.get('wait', 0)), 0.0), 30.0)
+        if wait:
+            run = engine.get_run(run['id'], wait=wait)
+        
+        return jsonify({
+            'success': True,
+            'run': run
+        }), 200 if run['status'] != 'running' else 202
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/workflow/runs/<run_id>', methods=['GET'])
+def get_workflow_run(run_id):
+    """Get a workflow run with per-step status and latency"""
+    try:
+        wait = min(max(request.args.get('wait', 0, type=float), 0.0), 30.0)
+        run = get_workflow_engine().get_run(run_id, wait=wait)
+        if run is None:
+            return jsonify({
+                'success': False,
+                'error': 'Run not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'run': run
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/workflow/stats', methods=['GET'])
+def workflow_stats():
+    """Get workflow run counters and per-action step latency"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': get_workflow_engine().stats(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/schedule', methods=['POST'])
+def schedule_post():
+    """Schedule a post for a time ('at', ISO 8601 UTC) or the next predicted best time"""
+    try:
+        data = request.get_json(silent=True) or {}
+        platform = data.get('platform')
+        content = data.get('content', '')
+        account = data.get('account', 'default')
+        if not platform or not (content or data.get('media_url')):
+            return jsonify({
+                'success': False,
+                'error': 'platform and content are required'
+            }), 400
+        if platform not in PLATFORMS:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown platform: {platform}'
+            }), 400
+        
+        if data.get('at'):
+            at = datetime.fromisoformat(data['at'].replace('Z', '+00:00'))
+            due = (at if at.tzinfo else at.replace(tzinfo=timezone.utc)).timestamp()
+            source = 'manual'
+        elif data.get('best_time'):
+            due = next_best_time(platform, account)
+            source = 'best_time'
+        else:
+            return jsonify({
+                'success': False,
+                'error': "Either 'at' or 'best_time' is required"
+            }), 400
+        
+        post = get_scheduler().schedule(
+            platform, content, due, account=account,
+            media_url=data.get('media_url'), source=source
+        )
+        
+        return jsonify({
+            'success': True,
+            'post': post,
+            'scheduled_for': datetime.utcfromtimestamp(post['due']).isoformat() + 'Z'
+        }), 201
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/schedule/<post_id>', methods=['GET'])
+def get_scheduled_post(post_id):
+    """Get a scheduled post and its publish status"""
+    try:
+        post = get_scheduler().get(post_id)
+        if post is None:
+            return jsonify({
+                'success': False,
+                'error': 'Post not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'post': post
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/schedule/<post_id>', methods=['DELETE'])
+def cancel_scheduled_post(post_id):
+    """Cancel a post that has not been dispatched yet"""
+    try:
+        post = get_scheduler().cancel(post_id)
+        if post is None:
+            return jsonify({
+                'success': False,
+                'error': 'Post not found or already dispatched'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'post': post
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@automation_bp.route('/schedule/stats', methods=['GET'])
+def scheduler_stats():
+    """Get pending post count, dispatch counters and dispatch jitter"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': get_scheduler().stats(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @automation_bp.route('/logs', methods=['GET'])
 def get_automation_logs():
     """Get automation execution logs"""
     try:
+        if wants_ndjson(request.args):
+            return ndjson_response(iter_automation_logs(request.args.get('limit', type=int)))
+        
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        logs = recent_automation_logs(limit)
+        if logs:
+            return jsonify({
+                'success': True,
+                'logs': logs,
+                'timestamp': datetime.utcnow().isoformat()
+            }), 200
+
+        # Nothing recorded yet: sample entries
         logs = [
             {
                 'timestamp': '2025-10-12T08:30:00Z',
@@ -6,19 +6,76 @@ Handles third-party API integrations (YouTube, Twitter, Instagram, etc.)
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 
+from connectors.registry import PLATFORMS, default_accounts, get_connector
+from connectors.sync import get_latest_stats, sync_accounts
+from services.jobs import JobQueueFull, get_job_manager, job_handle
+from services.response_cache import cached_response, invalidate_responses
+from storage.watermarks import list_watermarks
+
 integrations_bp = Blueprint('integrations', __name__)
 
+def time_ago(moment):
+    """
+    Describe a past UTC datetime relative to now, e.g. '10 minutes ago'
+    
+    Args:
+        moment: Naive UTC datetime
+        
+    Returns:
+        Human readable string
+    """
+    seconds = max(int((datetime.utcnow() - moment).total_seconds()), 0)
+    for unit, size in (('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= size:
+            count = seconds // size
+            return f"{count} {unit}{'s' if count != 1 else ''} ago"
+    return 'just now'
+
+def run_sync(platform):
+    """
+    Sync data from one or all integrations (runs as a background job)
+    
+    Args:
+        platform: Platform name or 'all'
+        
+    Returns:
+        Sync summary
+    """
+    platforms = PLATFORMS if platform == 'all' else [platform]
+    summary = sync_accounts(default_accounts(), platforms)
+    
+    # Fresh data: drop cached dashboard responses rather than wait for their TTLs
+    invalidate_responses('/api/integrations/')
+    invalidate_responses('/api/analytics/')
+    return dict(summary, platform=platform)
+
 @integrations_bp.route('/status', methods=['GET'])
+@cached_response(ttl=15)
 def get_integration_status():
     """Get status of all integrations"""
     try:
-        integrations = {
-            'youtube': {'status': 'connected', 'last_sync': '10 minutes ago'},
-            'twitter': {'status': 'connected', 'last_sync': '5 minutes ago'},
-            'instagram': {'status': 'connected', 'last_sync': '15 minutes ago'},
-            'google_search_console': {'status': 'connected', 'last_sync': '1 hour ago'},
-            'google_analytics': {'status': 'connected', 'last_sync': '30 minutes ago'}
-        }
+        account = request.args.get('account', 'default')
+        refs = next((a for a in default_accounts() if a['id'] == account), {})
+        watermarks = list_watermarks(account)
+        
+        integrations = {}
+        for platform in PLATFORMS:
+            mark = watermarks.get(platform) or {}
+            if mark.get('status') == 'failed':
+                status = 'error'
+            elif get_connector(platform).configured and refs.get(platform):
+                status = 'connected'
+            else:
+                status = 'not_configured'
+            
+            last_sync = mark.get('last_success')
+            integrations[platform] = {
+                'status': status,
+                'last_sync': time_ago(last_sync) if last_sync else 'Never',
+                'last_sync_at': last_sync.isoformat() if last_sync else None
+            }
+            if mark.get('error'):
+                integrations[platform]['error'] = mark['error']
         
         return jsonify({
             'success': True,
@@ -35,18 +92,28 @@ def get_integration_status():
 def get_youtube_stats():
     """Get YouTube channel statistics"""
     try:
-        # Placeholder for YouTube API integration
-        stats = {
-            'subscribers': 45230,
-            'total_views': 1250000,
-            'videos': 156,
-            'avg_view_duration': 245,
-            'engagement_rate': 6.8,
-            'top_videos': [
-                {'title': 'AI Marketing Guide 2025', 'views': 125000, 'likes': 8500},
-                {'title': 'Automation Best Practices', 'views': 98000, 'likes': 6200}
-            ]
-        }
+        account = request.args.get('account', 'default')
+        stats = get_latest_stats('youtube', account)
+        
+        connector = get_connector('youtube')
+        channel = default_accounts()[0].get('youtube')
+        if stats is None and account == 'default' and connector.configured and channel:
+            stats = connector.fetch(channel)['stats']
+        
+        if stats is None:
+            # Sample data until the YouTube API key and channel are configured
+            stats = {
+                'subscribers': 45230,
+                'total_views': 1250000,
+                'videos': 156,
+                'avg_view_duration': 245,
+                'engagement_rate': 6.8,
+                'top_videos': [
+                    {'title': 'AI Marketing Guide 2025', 'views': 125000, 'likes': 8500},
+                    {'title': 'Automation Best Practices', 'views': 98000, 'likes': 6200}
+                ],
+                'source': 'sample'
+            }
         
         return jsonify({
             'success': True,
@@ -65,17 +132,29 @@ def sync_data():
     try:
         data = request.get_json()
         platform = data.get('platform', 'all')
+        if platform != 'all' and platform not in PLATFORMS:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown platform: {platform}'
+            }), 400
         
+        job = get_job_manager().submit('sync', run_sync, platform)
         result = {
             'platform': platform,
             'status': 'syncing',
-            'started_at': datetime.utcnow().isoformat()
+            'started_at': job['created_at'],
+            'job': job_handle(job)
         }
         
         return jsonify({
             'success': True,
             'result': result
-        }), 200
+        }), 202
+    except JobQueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({
             'success': False,
@@ -0,0 +1,38 @@
+"""
+Job Routes
+Status and results of background jobs
+"""
+
+from flask import Blueprint, jsonify, request
+from datetime import datetime
+
+from services.jobs import get_job_manager
+
+jobs_bp = Blueprint('jobs', __name__)
+
+# Longest long-poll a client may request, in seconds
+MAX_WAIT = 30
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get job status and result, optionally waiting for it to finish"""
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), MAX_WAIT)
+        
+        job = get_job_manager().get(job_id, wait)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': f'Job {job_id} not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
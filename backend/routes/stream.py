@@ -0,0 +1,74 @@
+"""
+Stream Routes
+Server-sent events channel for live dashboard updates
+"""
+
+import json
+import queue
+import threading
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from config import Config
+from services.events import broker
+
+stream_bp = Blueprint('stream', __name__)
+
+# Seconds between keep-alive comments on an idle connection
+KEEPALIVE_INTERVAL = 15
+
+# Each open stream holds a worker thread until the client leaves, so cap them per worker and
+# keep the remaining threads for ordinary requests
+_slots = threading.BoundedSemaphore(Config.STREAM_MAX_SUBSCRIBERS)
+
+@stream_bp.route('', methods=['GET'])
+def stream_events():
+    """Stream metrics, insights and automation events as text/event-stream"""
+    types = {t for t in request.args.get('events', '').split(',') if t}
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if not _slots.acquire(blocking=False):
+        return jsonify({
+            'success': False,
+            'error': 'Too many open event streams, retry shortly'
+        }), 503, {'Retry-After': '5'}
+    try:
+        subscriber = broker.subscribe(last_event_id)
+    except Exception:
+        _slots.release()
+        raise
+    
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = subscriber.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if types and event['type'] not in types:
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+        finally:
+            broker.unsubscribe(subscriber)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(_slots.release)
+    return response
+
+@stream_bp.route('/stats', methods=['GET'])
+def stream_stats():
+    """Get push channel counters"""
+    try:
+        return jsonify({
+            'success': True,
+            'stream': broker.stats()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
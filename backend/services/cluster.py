@@ -0,0 +1,151 @@
+"""
+Cluster
+Keeps per-worker in-memory state in step across gunicorn workers via Redis pub/sub
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from storage.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'flowmind:cluster'
+
+
+class ClusterBus:
+    """
+    Relays state changes (ingested points, indexed documents, trigger edits, ...) from the
+    worker that handled them to every other worker.
+
+    The handling worker applies a change locally and broadcast()s it; one listener thread
+    per worker passes each message from another worker to the handler registered for its
+    kind. Pub/sub does not queue messages for a disconnected subscriber, so after the
+    listener loses Redis it runs the resync handlers, which drop state that may have missed
+    updates so it is reloaded from MongoDB on next use. Without Redis there is no other
+    worker to reach and broadcast() is a no-op.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._resync = []
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_pid = None
+        self.sent = 0
+        self.received = 0
+        self.failures = 0
+
+    @staticmethod
+    def origin():
+        """Identifier of this worker process"""
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def on(self, kind, handler):
+        """
+        Register the handler applying another worker's messages of a kind
+
+        Args:
+            kind: Message kind
+            handler: Callable taking the message payload
+        """
+        self._handlers[kind] = handler
+
+    def on_resync(self, handler):
+        """Register a callable run after messages may have been missed"""
+        self._resync.append(handler)
+
+    def start(self):
+        """Start this worker's listener thread when Redis is available (idempotent)"""
+        client = get_redis()
+        if client is None:
+            return
+        with self._lock:
+            if self._listener_pid != os.getpid():
+                self._listener = threading.Thread(
+                    target=self._listen, args=(client,), name='cluster-listener', daemon=True
+                )
+                self._listener.start()
+                self._listener_pid = os.getpid()
+
+    def broadcast(self, kind, payload):
+        """
+        Send a state change to every other worker
+
+        Args:
+            kind: Message kind
+            payload: JSON-serializable payload
+        """
+        client = get_redis()
+        if client is None:
+            return
+        client.publish(CHANNEL, json.dumps(
+            {'origin': self.origin(), 'kind': kind, 'payload': payload}, default=str
+        ))
+        self.sent += 1
+
+    def _listen(self, client):
+        lost = False
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                if lost:
+                    self._run_resync()
+                for message in pubsub.listen():
+                    self._dispatch(json.loads(message['data']))
+            except Exception as e:
+                logger.warning('Cluster listener lost Redis (%s), resubscribing', e)
+                lost = True
+                time.sleep(1)
+
+    def _dispatch(self, message):
+        if message.get('origin') == self.origin():
+            return
+        handler = self._handlers.get(message.get('kind'))
+        if handler is None:
+            return
+        self.received += 1
+        try:
+            handler(message['payload'])
+        except Exception as e:
+            self.failures += 1
+            logger.warning('Applying %s from %s failed: %s', message.get('kind'), message.get('origin'), e)
+
+    def _run_resync(self):
+        for handler in self._resync:
+            try:
+                handler()
+            except Exception as e:
+                logger.warning('Cluster resync handler failed: %s', e)
+
+    def stats(self):
+        """Messages sent, received and failed to apply by this worker"""
+        return {
+            'origin': self.origin(),
+            'listening': self._listener_pid == os.getpid(),
+            'sent': self.sent,
+            'received': self.received,
+            'failures': self.failures
+        }
+
+
+bus = ClusterBus()
+
+
+def broadcast(kind, payload):
+    """
+    Send a state change to every other worker; failures are logged and never raised
+
+    Args:
+        kind: Message kind
+        payload: JSON-serializable payload
+    """
+    try:
+        bus.broadcast(kind, payload)
+    except Exception as e:
+        logger.warning('Dropping %s broadcast: %s', kind, e)
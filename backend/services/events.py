@@ -0,0 +1,147 @@
+"""
+Events
+Process-wide publish/subscribe for dashboard push updates, fanned out across workers via Redis
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from storage.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'flowmind:events'
+
+# Recent events kept per process so reconnecting clients can catch up via Last-Event-ID
+REPLAY_SIZE = 200
+
+# Events buffered per subscriber before the slowest ones start losing updates
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class EventBroker:
+    """
+    Fans published events out to every subscriber queue in this process.
+
+    With Redis, publish() goes to a pub/sub channel and one listener thread per process
+    relays whatever arrives (from any worker) to the local queues, so each worker holds a
+    single Redis subscription however many browsers are connected. Without Redis, events
+    are delivered locally only.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._recent = deque(maxlen=REPLAY_SIZE)
+        self._lock = threading.Lock()
+        self._listener = None
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, event_type, data):
+        """
+        Publish an event to every connected client
+
+        Args:
+            event_type: Event name (metrics, insights, automation, ...)
+            data: JSON-serializable payload
+
+        Returns:
+            The event dictionary
+        """
+        event = {'id': str(time.time_ns()), 'type': event_type, 'data': data}
+        self.published += 1
+        client = get_redis()
+        if client is not None:
+            try:
+                client.publish(CHANNEL, json.dumps(event, default=str))
+                return event
+            except Exception as e:
+                logger.warning('Event publish via Redis failed (%s), delivering locally', e)
+        self._deliver(event)
+        return event
+
+    def _deliver(self, event):
+        with self._lock:
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+
+    def _listen(self, client):
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                for message in pubsub.listen():
+                    self._deliver(json.loads(message['data']))
+            except Exception as e:
+                logger.warning('Event listener lost Redis (%s), resubscribing', e)
+                time.sleep(1)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register a subscriber
+
+        Args:
+            last_event_id: Id of the last event the client saw; newer buffered events are replayed
+
+        Returns:
+            Queue receiving event dictionaries
+        """
+        client = get_redis()
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if client is not None and self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, args=(client,), name='event-listener', daemon=True
+                )
+                self._listener.start()
+            if last_event_id:
+                for event in self._recent:
+                    if event['id'] > last_event_id and not subscriber.full():
+                        subscriber.put_nowait(event)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber queue"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        """
+        Get broker counters
+
+        Returns:
+            Dictionary of subscriber, published and dropped counts
+        """
+        return {
+            'subscribers': len(self._subscribers),
+            'published': self.published,
+            'dropped': self.dropped,
+            'backend': 'redis' if get_redis() is not None else 'memory'
+        }
+
+
+broker = EventBroker()
+
+
+def publish_event(event_type, data):
+    """
+    Publish a dashboard event; failures are logged and never raised to the caller
+
+    Args:
+        event_type: Event name
+        data: JSON-serializable payload
+    """
+    try:
+        broker.publish(event_type, data)
+    except Exception as e:
+        logger.warning('Dropping %s event: %s', event_type, e)
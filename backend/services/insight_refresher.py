@@ -0,0 +1,228 @@
+"""
+Insight Refresher
+Background thread that materializes insights into ai_insights for accounts whose data changed
+"""
+
+import logging
+import threading
+import time
+
+from ai.insights import refresh_insights
+from config import Config
+from services.cluster import bus
+from services.events import publish_event
+from services.response_cache import invalidate_responses
+from storage.insights import save_generated_insights
+from storage.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Redis key naming the worker that runs refreshes for the whole cluster
+LEADER_KEY = 'flowmind:insights:leader'
+
+# Seconds the leader's hold lasts without renewal; another worker takes over after that
+LEADER_TTL = 30
+
+# Renews the hold when this worker has it, otherwise takes it if nobody does
+ELECT_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) and 1 or 0
+"""
+
+
+class InsightRefresher:
+    """
+    Keeps each account's materialized insights current without recomputing on reads.
+
+    Syncs mark the metrics they touched (and whether new content arrived) as dirty; every
+    interval the refresher takes the dirty sets, recomputes only those accounts and
+    metrics, and writes one new generation of insights per account. Accounts without
+    changes are still refreshed once their insights are max_age old, because posting
+    windows and recent anomalies depend on the clock as well as the data.
+
+    Every worker runs the thread, but only the one holding the Redis leader key refreshes;
+    the others drop their dirty sets each round (the leader is marked dirty by the same
+    syncs through the cluster bus) and only remember which accounts exist. A worker that
+    becomes leader therefore refreshes every account it knows of in full once. Without
+    Redis each worker is its own leader.
+    """
+
+    def __init__(self, interval=60, max_age=3600):
+        self.interval = interval
+        self.max_age = max_age
+        self._dirty = {}  # account -> set of metrics, None for all
+        self._topics = set()
+        self._refreshed = {}  # account -> epoch seconds of its last refresh
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.leader = False
+        self.refreshes = 0
+        self.metrics_recomputed = 0
+        self.failures = 0
+
+    def start(self):
+        """Start the refresher thread (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='insight-refresher', daemon=True)
+                self._thread.start()
+
+    def mark_dirty(self, account, metrics=None, topics=False):
+        """
+        Record that an account's data changed
+
+        Args:
+            account: Account identifier
+            metrics: Iterable of changed metric names, None when everything may have changed
+            topics: Whether new posts, comments or pages were indexed
+        """
+        with self._lock:
+            if metrics is None:
+                self._dirty[account] = None
+            elif self._dirty.get(account, ()) is not None:
+                self._dirty.setdefault(account, set()).update(metrics)
+            if topics:
+                self._topics.add(account)
+
+    def refreshed(self, account):
+        """True once this process has materialized insights for the account"""
+        return account in self._refreshed
+
+    def refresh(self, account, metrics=None, topics=True):
+        """
+        Recompute and materialize one account's insights now
+
+        Args:
+            account: Account identifier
+            metrics: Changed metrics, None for all
+            topics: Whether to recompute topic candidates
+
+        Returns:
+            The materialized insights
+        """
+        insights = refresh_insights(account, metrics, topics)
+        save_generated_insights(account, insights)
+        with self._lock:
+            self._refreshed[account] = time.time()
+            self.refreshes += 1
+            self.metrics_recomputed += 0 if metrics is None else len(metrics)
+        invalidate_responses('/api/ai/insights')
+        publish_event('insights', {'account': account, 'insights': insights})
+        return insights
+
+    def refresh_due(self, now=None):
+        """
+        Refresh every dirty account, plus accounts whose insights are max_age old
+
+        Returns:
+            Number of accounts refreshed
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            topics, self._topics = self._topics, set()
+            for account, refreshed_at in self._refreshed.items():
+                if now - refreshed_at >= self.max_age:
+                    dirty.setdefault(account, set())
+            for account in topics:
+                dirty.setdefault(account, set())
+
+        for account, metrics in dirty.items():
+            try:
+                self.refresh(account, metrics, account in topics)
+            except Exception as e:
+                self.failures += 1
+                logger.warning('Insight refresh failed for %s: %s', account, e)
+                self.mark_dirty(account, metrics, account in topics)
+        return len(dirty)
+
+    def elect(self):
+        """
+        Take or renew cluster-wide leadership of refreshes
+
+        Returns:
+            True if this worker is the leader
+        """
+        client = get_redis()
+        if client is None:
+            leader = True
+        else:
+            try:
+                leader = bool(client.register_script(ELECT_SCRIPT)(
+                    keys=[LEADER_KEY], args=[bus.origin(), int(LEADER_TTL * 1000)]
+                ))
+            except Exception as e:
+                logger.warning('Insight refresher election failed, keeping current role: %s', e)
+                leader = self.leader
+
+        if leader and not self.leader:
+            logger.info('Insight refresher leader is now %s', bus.origin())
+            with self._lock:
+                for account in self._refreshed:
+                    self._dirty[account] = None
+                    self._topics.add(account)
+        self.leader = leader
+        return leader
+
+    def _follow(self):
+        now = time.time()
+        with self._lock:
+            for account in set(self._dirty) | self._topics:
+                self._refreshed.setdefault(account, now)
+            self._dirty, self._topics = {}, set()
+
+    def _run(self):
+        refreshed_at = time.time()
+        while True:
+            self._wakeup.wait(min(self.interval, LEADER_TTL / 3))
+            self._wakeup.clear()
+            try:
+                if not self.elect():
+                    self._follow()
+                elif time.time() - refreshed_at >= self.interval:
+                    refreshed_at = time.time()
+                    self.refresh_due()
+            except Exception as e:
+                logger.warning('Insight refresher failed: %s', e)
+
+    def stats(self):
+        """Pending dirty accounts and refresh counters"""
+        with self._lock:
+            return {
+                'leader': self.leader,
+                'accounts': len(self._refreshed),
+                'dirty_accounts': len(self._dirty),
+                'refreshes': self.refreshes,
+                'metrics_recomputed': self.metrics_recomputed,
+                'failures': self.failures,
+                'interval': self.interval,
+                'max_age': self.max_age
+            }
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_insight_refresher():
+    """
+    Get the process-wide insight refresher with its thread running (app.py starts it at
+    startup)
+
+    Returns:
+        InsightRefresher instance
+    """
+    global _refresher
+    if _refresher is None:
+        with _refresher_lock:
+            if _refresher is None:
+                refresher = InsightRefresher(
+                    interval=Config.INSIGHT_REFRESH_INTERVAL,
+                    max_age=Config.INSIGHT_MAX_AGE
+                )
+                refresher.start()
+                _refresher = refresher
+    return _refresher
@@ -0,0 +1,244 @@
+"""
+Job Service
+Runs expensive operations in the background and tracks them by job id
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import Config
+from storage.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('succeeded', 'failed')
+
+# Redis key prefix for job records
+KEY_PREFIX = 'flowmind:job:'
+
+# Attempts at recording a job's terminal status, with a doubling delay from SAVE_RETRY_DELAY
+SAVE_ATTEMPTS = 3
+SAVE_RETRY_DELAY = 0.5  # seconds
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already queued or running"""
+
+
+class MemoryJobBackend:
+    """Process-local job records; used for tests and when Redis is unavailable"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._jobs = {}
+        self._changed = threading.Condition()
+
+    def save(self, job):
+        with self._changed:
+            self._jobs[job['id']] = (time.monotonic() + self.ttl, dict(job))
+            self._changed.notify_all()
+
+    def load(self, job_id):
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return dict(entry[1])
+
+    def wait(self, job_id, timeout):
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self.load(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job['status'] in TERMINAL_STATUSES or remaining <= 0:
+                    return job
+                self._changed.wait(remaining)
+
+    def purge(self):
+        now = time.monotonic()
+        with self._changed:
+            for job_id in [k for k, (expires_at, _) in self._jobs.items() if expires_at < now]:
+                del self._jobs[job_id]
+
+
+class RedisJobBackend:
+    """Job records stored as JSON strings with a TTL, shared by every gunicorn worker"""
+
+    POLL_INTERVAL = 0.1
+    MAX_POLL_INTERVAL = 0.5
+
+    def __init__(self, client, ttl):
+        self.client = client
+        self.ttl = ttl
+
+    def save(self, job):
+        self.client.set(KEY_PREFIX + job['id'], json.dumps(job), ex=self.ttl)
+
+    def load(self, job_id):
+        raw = self.client.get(KEY_PREFIX + job_id)
+        return json.loads(raw) if raw else None
+
+    def wait(self, job_id, timeout):
+        deadline = time.monotonic() + timeout
+        interval = self.POLL_INTERVAL
+        while True:
+            job = self.load(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in TERMINAL_STATUSES or remaining <= 0:
+                return job
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.MAX_POLL_INTERVAL)
+
+    def purge(self):
+        pass  # Redis expires keys itself
+
+
+class JobManager:
+    """
+    Submits callables to a bounded thread pool and records their progress.
+
+    The callables may themselves hand CPU-bound work to the AI process pool; the thread
+    here only waits, so a handful of threads can track many jobs.
+    """
+
+    def __init__(self, backend, workers=4, max_queued=64):
+        self.backend = backend
+        self.max_queued = max_queued
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._slots = threading.BoundedSemaphore(max_queued)
+
+    def submit(self, job_type, fn, *args, **kwargs):
+        """
+        Start a background job
+
+        Args:
+            job_type: Short label such as 'predict' or 'sync'
+            fn: Callable returning a JSON-serializable result
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            Job record with status 'queued'
+
+        Raises:
+            JobQueueFull: If max_queued jobs are already pending
+        """
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull(f'Job queue is full ({self.max_queued} jobs pending)')
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'type': job_type,
+            'status': 'queued',
+            'created_at': datetime.utcnow().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+        try:
+            self.backend.purge()
+            self.backend.save(job)
+            self._pool.submit(self._run, job, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            job = dict(job, status='running', started_at=datetime.utcnow().isoformat())
+            try:
+                self.backend.save(job)
+            except Exception as e:
+                logger.warning('Could not mark job %s running: %s', job['id'], e)
+            try:
+                job.update(status='succeeded', result=fn(*args, **kwargs))
+            except Exception as e:
+                job.update(status='failed', error=str(e))
+            job['finished_at'] = datetime.utcnow().isoformat()
+            self._finish(job)
+        finally:
+            self._slots.release()
+
+    def _finish(self, job):
+        """
+        Record a job's terminal status so waiting clients see it finish
+
+        A result the backend cannot store (not JSON-serializable, or Redis failing) is
+        replaced by a failed record carrying the storage error, retried with backoff.
+        """
+        try:
+            self.backend.save(job)
+            return
+        except Exception as e:
+            logger.warning('Could not store the result of job %s: %s', job['id'], e)
+            job = dict(job, status='failed', result=None, error=f'Could not store job result: {e}')
+        for attempt in range(SAVE_ATTEMPTS):
+            try:
+                self.backend.save(job)
+                return
+            except Exception as e:
+                logger.warning('Could not record job %s as failed (attempt %d): %s', job['id'], attempt + 1, e)
+                time.sleep(SAVE_RETRY_DELAY * 2 ** attempt)
+
+    def get(self, job_id, wait=0):
+        """
+        Get a job record, optionally long-polling until it finishes
+
+        Args:
+            job_id: Job identifier
+            wait: Seconds to wait for a terminal status (0 returns immediately)
+
+        Returns:
+            Job record or None if unknown/expired
+        """
+        if wait > 0:
+            return self.backend.wait(job_id, wait)
+        return self.backend.load(job_id)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    Get the process-wide job manager, backed by Redis when available
+
+    Returns:
+        JobManager instance
+    """
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                client = get_redis()
+                if client is not None:
+                    backend = RedisJobBackend(client, Config.JOB_RESULT_TTL)
+                else:
+                    backend = MemoryJobBackend(Config.JOB_RESULT_TTL)
+                _manager = JobManager(backend, Config.JOB_WORKERS, Config.JOB_MAX_QUEUED)
+    return _manager
+
+
+def job_handle(job):
+    """
+    Summarise a job record for a 202 response
+
+    Args:
+        job: Job record
+
+    Returns:
+        Dictionary with id, status and polling URL
+    """
+    return {
+        'id': job['id'],
+        'type': job['type'],
+        'status': job['status'],
+        'url': f"/api/jobs/{job['id']}"
+    }
@@ -0,0 +1,157 @@
+"""
+Response Cache
+Shared HTTP response cache for polled read endpoints, with ETag/Last-Modified revalidation
+"""
+
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, make_response, request
+
+from config import Config
+from storage.redis_client import get_redis
+from storage.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'flowmind:http:'
+
+# In-process L1 in front of Redis. Its TTL is kept short so an entry invalidated in
+# another worker is served stale for at most a couple of seconds; without Redis it is
+# the only tier and keeps entries for the route's full TTL.
+_local = TTLCache(Config.RESPONSE_CACHE_L1_SIZE, Config.RESPONSE_CACHE_L1_TTL)
+
+
+def cache_key():
+    """
+    Build the cache key for the current request: path plus sorted query arguments
+
+    Returns:
+        Cache key string
+    """
+    args = sorted(request.args.items(multi=True))
+    return f"{request.path}?{urlencode(args)}" if args else request.path
+
+
+def _lookup(key):
+    entry = _local.get(key)
+    if entry is not None:
+        return entry
+
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(KEY_PREFIX + key)
+    except Exception as e:
+        logger.warning('Response cache read failed: %s', e)
+        return None
+    if raw is None:
+        return None
+    entry = json.loads(raw)
+    remaining = entry['expires'] - time.time()
+    if remaining <= 0:
+        return None
+    _local.put(key, entry, min(remaining, _local.ttl))
+    return entry
+
+
+def _store(key, response, ttl):
+    body = response.get_data(as_text=True)
+    now = time.time()
+    entry = {
+        'body': body,
+        'status': response.status_code,
+        'mimetype': response.mimetype,
+        'etag': hashlib.sha1(body.encode('utf-8')).hexdigest(),
+        'last_modified': int(now),
+        'expires': now + ttl
+    }
+    client = get_redis()
+    _local.put(key, entry, ttl if client is None else min(ttl, _local.ttl))
+    if client is not None:
+        try:
+            client.set(KEY_PREFIX + key, json.dumps(entry), ex=ttl)
+        except Exception as e:
+            logger.warning('Response cache write failed: %s', e)
+    return entry
+
+
+def _respond(entry, state):
+    response = Response(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+    response.set_etag(entry['etag'])
+    response.last_modified = datetime.fromtimestamp(entry['last_modified'], timezone.utc)
+    response.cache_control.no_cache = True  # Clients revalidate every poll and get 304s
+    response.headers['X-Cache'] = state
+    return response.make_conditional(request)
+
+
+def cached_response(ttl):
+    """
+    Cache a GET view's successful responses for `ttl` seconds
+
+    Entries are keyed by path and query arguments and shared between workers through
+    Redis, with an in-process L1 in front. Every response carries an ETag and
+    Last-Modified so a client that already holds the current body gets an empty 304.
+
+    Args:
+        ttl: Seconds a generated response may be served
+
+    Returns:
+        View decorator
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or not Config.RESPONSE_CACHE_ENABLED:
+                return view(*args, **kwargs)
+
+            key = cache_key()
+            entry = _lookup(key)
+            state = 'HIT'
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = _store(key, response, ttl)
+                state = 'MISS'
+            return _respond(entry, state)
+        return wrapper
+    return decorator
+
+
+def invalidate_responses(prefix):
+    """
+    Drop cached responses whose path starts with a prefix (e.g. after a sync)
+
+    Args:
+        prefix: Request path prefix such as '/api/integrations/'
+
+    Returns:
+        Number of entries dropped
+    """
+    dropped = _local.invalidate(lambda key: key.startswith(prefix))
+    client = get_redis()
+    if client is not None:
+        try:
+            keys = list(client.scan_iter(match=f"{KEY_PREFIX}{prefix}*", count=500))
+            if keys:
+                dropped += client.delete(*keys)
+        except Exception as e:
+            logger.warning('Response cache invalidation failed: %s', e)
+    return dropped
+
+
+def get_response_cache_stats():
+    """
+    Get L1 response cache counters
+
+    Returns:
+        Dictionary as returned by TTLCache.stats()
+    """
+    return _local.stats()
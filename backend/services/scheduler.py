@@ -0,0 +1,603 @@
+"""
+Post Scheduler
+Holds scheduled posts ordered by due time and dispatches due ones in batches to the connectors
+"""
+
+import heapq
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    from pymongo import ReturnDocument
+except ImportError:  # Optional at runtime: without MongoDB posts live in this process only
+    ReturnDocument = None
+
+from config import Config
+from services.cluster import bus
+from storage.db import get_db, get_writer
+from storage.redis_client import get_redis
+from storage.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Redis keys: sorted set of post ids scored by due time, sorted set of claimed ids scored
+# by claim time, and a hash of post bodies
+QUEUE_KEY = 'flowmind:schedule:queue'
+PROCESSING_KEY = 'flowmind:schedule:processing'
+POSTS_KEY = 'flowmind:schedule:posts'
+
+# Seconds a claimed post may go without being published before it is queued again (the
+# worker holding it is assumed dead); the claim is refreshed when its batch starts
+PROCESSING_TIMEOUT = 600
+
+# Seconds a worker's hold on pending posts in MongoDB lasts without renewal (memory
+# backend only); posts of a worker that stops renewing are adopted by another one
+LEASE_TTL = 60
+
+# Moves due ids to the processing set in one step, so a post is never in neither
+CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('ZADD', KEYS[2], ARGV[3], id)
+end
+return ids
+"""
+
+# Moves ids claimed before ARGV[1] back to the queue when their body still exists
+REQUEUE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[2], id)
+    if redis.call('HEXISTS', KEYS[3], id) == 1 then
+        redis.call('ZADD', KEYS[1], ARGV[2], id)
+    end
+end
+return #ids
+"""
+
+# Publish attempts per post; failed attempts are rescheduled with backoff
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 60  # seconds, doubled per attempt
+
+# Dispatch lateness samples kept for percentiles
+JITTER_WINDOW = 1000
+
+# Finished posts kept in memory for status lookups
+FINISHED_CACHE_SIZE = 10000
+FINISHED_CACHE_TTL = 24 * 3600  # seconds
+
+
+class MemoryScheduleBackend:
+    """
+    Binary heap of (due, post_id) with a dict of post bodies.
+
+    Schedule is a heap push, O(log n). Cancel drops the body in O(1) and leaves a
+    tombstone in the heap that is skipped when popped; the heap is rebuilt once
+    tombstones outnumber live entries, so memory stays proportional to pending posts.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._posts = {}
+        self._lock = threading.Lock()
+
+    def add(self, post):
+        with self._lock:
+            self._posts[post['id']] = post
+            heapq.heappush(self._heap, (post['due'], post['id']))
+
+    def cancel(self, post_id):
+        with self._lock:
+            post = self._posts.pop(post_id, None)
+            if post is not None and len(self._heap) > 2 * len(self._posts) + 64:
+                self._heap = [(due, pid) for due, pid in self._heap if pid in self._posts]
+                heapq.heapify(self._heap)
+            return post
+
+    def get(self, post_id):
+        return self._posts.get(post_id)
+
+    def next_due(self):
+        with self._lock:
+            while self._heap and self._heap[0][1] not in self._posts:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def claim_due(self, now, limit):
+        """Remove and return up to `limit` posts due at or before now, earliest first"""
+        claimed = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(claimed) < limit:
+                _, post_id = heapq.heappop(self._heap)
+                post = self._posts.pop(post_id, None)
+                if post is not None:
+                    claimed.append(post)
+        return claimed
+
+    def touch(self, posts):
+        pass
+
+    def finish(self, posts):
+        pass
+
+    def requeue_stale(self, now):
+        return 0
+
+    def __len__(self):
+        return len(self._posts)
+
+
+class RedisScheduleBackend:
+    """
+    Sorted set scored by due time plus a hash of post bodies, shared by every worker.
+
+    ZADD and ZREM are O(log n). Each worker's dispatcher claims due ids with a script
+    that moves them from the queue to a processing set, so a post is dispatched once
+    however many workers poll. The body is deleted only after the publish outcome is
+    recorded; ids left in the processing set by a worker that died are queued again
+    after PROCESSING_TIMEOUT. Redis persistence (AOF/RDB) covers crash recovery.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._claim = client.register_script(CLAIM_SCRIPT)
+        self._requeue = client.register_script(REQUEUE_SCRIPT)
+
+    def add(self, post):
+        pipe = self.client.pipeline()
+        pipe.hset(POSTS_KEY, post['id'], json.dumps(post))
+        pipe.zadd(QUEUE_KEY, {post['id']: post['due']})
+        pipe.execute()
+
+    def cancel(self, post_id):
+        if not self.client.zrem(QUEUE_KEY, post_id):
+            return None
+        raw = self.client.hget(POSTS_KEY, post_id)
+        self.client.hdel(POSTS_KEY, post_id)
+        return json.loads(raw) if raw else None
+
+    def get(self, post_id):
+        raw = self.client.hget(POSTS_KEY, post_id)
+        return json.loads(raw) if raw else None
+
+    def next_due(self):
+        head = self.client.zrange(QUEUE_KEY, 0, 0, withscores=True)
+        return head[0][1] if head else None
+
+    def claim_due(self, now, limit):
+        ids = self._claim(keys=[QUEUE_KEY, PROCESSING_KEY], args=[repr(now), limit, repr(time.time())])
+        if not ids:
+            return []
+        bodies = self.client.hmget(POSTS_KEY, ids)
+        missing = [post_id for post_id, raw in zip(ids, bodies) if not raw]
+        if missing:
+            self.client.zrem(PROCESSING_KEY, *missing)
+        return [json.loads(raw) for raw in bodies if raw]
+
+    def touch(self, posts):
+        """Refresh the claim on posts whose publish is starting"""
+        self.client.zadd(PROCESSING_KEY, {post['id']: time.time() for post in posts}, xx=True)
+
+    def finish(self, posts):
+        """Release claimed posts once their outcome is recorded (pending ones were re-added)"""
+        pipe = self.client.pipeline()
+        pipe.zrem(PROCESSING_KEY, *[post['id'] for post in posts])
+        done = [post['id'] for post in posts if post['status'] != 'pending']
+        if done:
+            pipe.hdel(POSTS_KEY, *done)
+        pipe.execute()
+
+    def requeue_stale(self, now):
+        """Queue posts claimed more than PROCESSING_TIMEOUT ago again; returns how many"""
+        return self._requeue(keys=[QUEUE_KEY, PROCESSING_KEY, POSTS_KEY],
+                             args=[repr(now - PROCESSING_TIMEOUT), repr(now)])
+
+    def __len__(self):
+        return self.client.zcard(QUEUE_KEY)
+
+
+class PostScheduler:
+    """
+    Schedules posts and runs a dispatcher thread that publishes them when due.
+
+    The dispatcher sleeps until the earliest due time (capped at poll_interval so posts
+    scheduled by other workers are noticed), claims up to batch_size due posts, groups
+    them by (platform, account) and hands each group to the connector's publish_batch
+    on a small pool. Lateness against the due time is tracked as dispatch jitter.
+
+    With the memory backend and MongoDB, each worker holds a renewable lease on the
+    pending posts it queued; recover() claims unleased or expired posts one at a time
+    with find_one_and_update, so a post is queued by exactly one live worker. A cancel
+    marks the post cancelled in MongoDB from whichever worker receives it; the owner
+    re-checks before publishing and drops cancelled posts from its queue on each lease
+    renewal.
+    """
+
+    def __init__(self, backend, collection=None, batch_size=500, poll_interval=0.25, workers=8):
+        self.backend = backend
+        self._collection = collection
+        self._leased = collection is not None and isinstance(backend, MemoryScheduleBackend)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='publish')
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._jitter = deque(maxlen=JITTER_WINDOW)
+        self._finished = TTLCache(FINISHED_CACHE_SIZE, FINISHED_CACHE_TTL)
+        self._lock = threading.Lock()
+        self.scheduled = 0
+        self.dispatched = 0
+        self.published = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the dispatcher thread (idempotent)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='post-dispatcher', daemon=True)
+                self._thread.start()
+
+    def schedule(self, platform, content, due, account='default', media_url=None, source='manual'):
+        """
+        Schedule a post
+
+        Args:
+            platform: Connector platform name
+            content: Post text
+            due: Epoch seconds to publish at (times in the past mean now)
+            account: Account identifier
+            media_url: Optional image URL (required by some platforms)
+            source: What scheduled it ('manual', 'best_time', ...)
+
+        Returns:
+            Post dictionary
+
+        Raises:
+            Exception: If the post could not be recorded in MongoDB (it is then not queued)
+        """
+        post = {
+            'id': uuid.uuid4().hex,
+            'platform': platform,
+            'account': account,
+            'content': content,
+            'media_url': media_url,
+            'due': max(float(due), time.time()),
+            'source': source,
+            'attempts': 0,
+            'status': 'pending',
+            'created_at': datetime.utcnow().isoformat()
+        }
+        # Written to MongoDB before it is queued, so an accepted post survives a restart
+        self._persist(post, durable=True)
+        self.backend.add(post)
+        self.scheduled += 1
+        self._wakeup.set()
+        return post
+
+    def cancel(self, post_id):
+        """
+        Cancel a pending post
+
+        Args:
+            post_id: Post identifier
+
+        Returns:
+            The cancelled post, or None if it is unknown or already dispatched
+        """
+        if self._leased:
+            return self._cancel_leased(post_id)
+        post = self.backend.cancel(post_id)
+        if post is not None:
+            post['status'] = 'cancelled'
+            self._finished.put(post_id, post)
+            self._persist(post)
+        return post
+
+    def _cancel_leased(self, post_id):
+        """Cancel a post held in any worker's memory by marking it in MongoDB"""
+        # Retries re-queued through the buffered writer must land before the status check
+        get_writer().flush(self._collection.name)
+        post = self._collection.find_one_and_update(
+            {'id': post_id, 'status': 'pending'},
+            {'$set': {'status': 'cancelled'}},
+            projection={'_id': 0, 'owner': 0, 'lease_until': 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if post is not None:
+            # Another worker's copy is dropped by its next _drop_cancelled()
+            self.backend.cancel(post_id)
+            self._finished.put(post_id, post)
+        return post
+
+    def _cancelled_ids(self, posts):
+        """Ids of posts cancelled in MongoDB since this worker queued them"""
+        if not self._leased:
+            return set()
+        try:
+            return {doc['id'] for doc in self._collection.find(
+                {'id': {'$in': [post['id'] for post in posts]}, 'status': 'cancelled'}, {'_id': 0, 'id': 1}
+            )}
+        except Exception as e:
+            logger.warning('Could not check %d posts for cancellation: %s', len(posts), e)
+            return set()
+
+    def _drop_cancelled(self):
+        """Remove posts other workers cancelled from this worker's queue"""
+        ids = [doc['id'] for doc in self._collection.find(
+            {'owner': bus.origin(), 'status': 'cancelled'}, {'_id': 0, 'id': 1}
+        )]
+        for post_id in ids:
+            self.backend.cancel(post_id)
+        if ids:
+            self._collection.update_many({'id': {'$in': ids}}, {'$unset': {'owner': '', 'lease_until': ''}})
+
+    def get(self, post_id):
+        """Get a pending or recently finished post, falling back to MongoDB"""
+        post = self.backend.get(post_id) or self._finished.get(post_id)
+        if post is None and self._collection is not None:
+            get_writer().flush(self._collection.name)
+            try:
+                post = self._collection.find_one({'id': post_id}, {'_id': 0, 'owner': 0, 'lease_until': 0})
+            except Exception as e:
+                logger.warning('Could not load post %s: %s', post_id, e)
+        return post
+
+    def _run(self):
+        maintained = time.time()
+        while True:
+            try:
+                if time.time() - maintained >= LEASE_TTL / 3:
+                    maintained = time.time()
+                    self._maintain(maintained)
+                next_due = self.backend.next_due()
+                wait = self.poll_interval if next_due is None else min(
+                    max(next_due - time.time(), 0.0), self.poll_interval
+                )
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    self._wakeup.clear()
+                self.dispatch_due()
+            except Exception as e:
+                logger.warning('Scheduler dispatch failed: %s', e)
+                time.sleep(self.poll_interval)
+
+    def dispatch_due(self, now=None):
+        """
+        Claim every due post and publish them in per-platform batches
+
+        Returns:
+            Number of posts dispatched
+        """
+        total = 0
+        while True:
+            now = time.time() if now is None else now
+            posts = self.backend.claim_due(now, self.batch_size)
+            if not posts:
+                return total
+            groups = {}
+            for post in posts:
+                self._jitter.append(max(time.time() - post['due'], 0.0))
+                groups.setdefault((post['platform'], post['account']), []).append(post)
+            for (platform, account), batch in groups.items():
+                self._pool.submit(self._publish, platform, account, batch)
+            total += len(posts)
+            self.dispatched += len(posts)
+            now = None
+
+    def _publish(self, platform, account, posts):
+        from ai.keywords import index_documents
+        from connectors.registry import default_accounts, get_connector
+        from services.triggers import get_trigger_engine
+        from storage.automation_logs import record_automation_log
+
+        cancelled = self._cancelled_ids(posts)
+        if cancelled:
+            posts = [post for post in posts if post['id'] not in cancelled]
+            if not posts:
+                return
+
+        try:
+            self.backend.touch(posts)
+        except Exception as e:
+            logger.warning('Could not refresh claim on %d posts: %s', len(posts), e)
+
+        # Missing configuration fails the batch outright; publish errors are retried
+        retry = False
+        try:
+            connector = get_connector(platform)
+            ref = next((a.get(platform) for a in default_accounts() if a['id'] == account), None)
+            if not connector.configured or not ref:
+                results = [(post, None, f'{platform} is not configured') for post in posts]
+            else:
+                retry = True
+                results = connector.publish_batch(ref, posts)
+        except Exception as e:
+            results = [(post, None, str(e)) for post in posts]
+
+        for post, platform_id, error in results:
+            post['attempts'] += 1
+            if error is None:
+                post.update(status='published', platform_id=platform_id,
+                            published_at=datetime.utcnow().isoformat())
+                self.published += 1
+                if post['content']:
+                    index_documents(account, [{
+                        'id': f"{platform}:{platform_id or post['id']}",
+                        'text': post['content'], 'kind': 'post', 'timestamp': int(time.time())
+                    }])
+            elif retry and post['attempts'] < MAX_ATTEMPTS:
+                post.update(status='pending', error=error,
+                            due=time.time() + RETRY_DELAY * 2 ** (post['attempts'] - 1))
+                if self._cancelled_ids([post]):
+                    post['status'] = 'cancelled'
+                else:
+                    self.backend.add(post)
+            else:
+                post.update(status='failed', error=error)
+                self.failed += 1
+            self._persist(post)
+            if post['status'] != 'pending':
+                self._finished.put(post['id'], post)
+            if post['status'] in ('published', 'failed'):
+                record_automation_log(
+                    f'Auto-post to {platform}', 'success' if error is None else 'failed',
+                    'Published scheduled post' if error is None else error,
+                    post_id=post['id'], account=account
+                )
+        try:
+            self.backend.finish(posts)
+        except Exception as e:
+            logger.warning('Could not release %d published posts: %s', len(posts), e)
+
+        if any(post['source'] == 'best_time' for post in posts):
+            get_trigger_engine().fire_event(account, 'best_time_reached')
+
+    def _persist(self, post, durable=False):
+        """Record a post in MongoDB; durable writes skip the buffered writer and raise on failure"""
+        if self._collection is None:
+            return
+        fields = dict(post)
+        if self._leased and post['status'] == 'pending':
+            fields.update(owner=bus.origin(), lease_until=time.time() + LEASE_TTL)
+        if durable:
+            self._collection.update_one({'id': post['id']}, {'$set': fields}, upsert=True)
+            return
+        writer = get_writer()
+        if writer is not None:
+            writer.upsert(self._collection.name, {'id': post['id']}, {'$set': fields})
+
+    def _maintain(self, now):
+        try:
+            requeued = self.backend.requeue_stale(now)
+            if requeued:
+                logger.warning('Re-queued %d posts claimed by a worker that did not finish them', requeued)
+        except Exception as e:
+            logger.warning('Could not re-queue stale posts: %s', e)
+        if self._leased:
+            try:
+                self._collection.update_many(
+                    {'owner': bus.origin(), 'status': 'pending'},
+                    {'$set': {'lease_until': now + LEASE_TTL}}
+                )
+            except Exception as e:
+                logger.warning('Could not renew scheduled post leases: %s', e)
+            try:
+                self._drop_cancelled()
+            except Exception as e:
+                logger.warning('Could not drop cancelled posts: %s', e)
+            self.recover()
+
+    def recover(self):
+        """
+        Queue pending posts recorded in MongoDB that no live worker holds (only needed
+        without Redis, whose own persistence already holds the queue)
+
+        Each post is claimed with find_one_and_update, so when every worker recovers at
+        startup a post is still queued by one of them. Posts of a worker that stops
+        renewing its lease become claimable LEASE_TTL seconds later.
+
+        Returns:
+            Number of posts recovered
+        """
+        if not self._leased:
+            return 0
+        recovered = 0
+        try:
+            while True:
+                now = time.time()
+                post = self._collection.find_one_and_update(
+                    {'status': 'pending', '$or': [
+                        {'lease_until': {'$exists': False}}, {'lease_until': {'$lt': now}}
+                    ]},
+                    {'$set': {'owner': bus.origin(), 'lease_until': now + LEASE_TTL}},
+                    projection={'_id': 0, 'owner': 0, 'lease_until': 0}
+                )
+                if post is None:
+                    break
+                self.backend.add(post)
+                recovered += 1
+        except Exception as e:
+            logger.warning('Could not recover scheduled posts: %s', e)
+        if recovered:
+            self._wakeup.set()
+        return recovered
+
+    def stats(self):
+        """
+        Get queue size, counters and dispatch jitter percentiles
+
+        Returns:
+            Dictionary of scheduler statistics
+        """
+        jitter = sorted(self._jitter)
+        n = len(jitter)
+        return {
+            'pending': len(self.backend),
+            'scheduled': self.scheduled,
+            'dispatched': self.dispatched,
+            'published': self.published,
+            'failed': self.failed,
+            'jitter_p50_s': round(jitter[n // 2], 3) if n else None,
+            'jitter_p99_s': round(jitter[min(n - 1, int(n * 0.99))], 3) if n else None,
+            'jitter_max_s': round(jitter[-1], 3) if n else None,
+            'backend': 'redis' if isinstance(self.backend, RedisScheduleBackend) else 'memory'
+        }
+
+
+def next_best_time(platform, account='default', now=None):
+    """
+    Start of the next occurrence of the top predicted posting slot (day of week and hour)
+
+    Args:
+        platform: Platform to predict for
+        account: Account identifier
+        now: Epoch seconds to search from (defaults to now)
+
+    Returns:
+        Epoch seconds to publish at; now itself when the best slot is under way
+    """
+    from ai.predictor import WEEKDAYS, predict_best_posting_time
+
+    now = time.time() if now is None else now
+    best = predict_best_posting_time(platform, account)['recommended_times'][0]
+    target = WEEKDAYS.index(best['day']) * 24 + int(best['time'][:2])
+    current = (int(now) // 3600 + 72) % 168  # Hour of week, Monday 00:00 UTC first
+    return max(now - now % 3600 + (target - current) % 168 * 3600, now)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Get the process-wide scheduler with its dispatcher running (app.py starts it at startup)
+
+    Returns:
+        PostScheduler instance
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                client = get_redis()
+                backend = RedisScheduleBackend(client) if client is not None else MemoryScheduleBackend()
+                db = get_db()
+                scheduler = PostScheduler(
+                    backend,
+                    db.scheduled_posts if db is not None else None,
+                    batch_size=Config.SCHEDULER_BATCH_SIZE,
+                    poll_interval=Config.SCHEDULER_POLL_INTERVAL,
+                    workers=Config.SCHEDULER_DISPATCH_WORKERS
+                )
+                scheduler.recover()
+                scheduler.start()
+                _scheduler = scheduler
+    return _scheduler
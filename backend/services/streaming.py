@@ -0,0 +1,52 @@
+"""
+Streaming
+Newline-delimited JSON responses fed by generators
+"""
+
+import json
+
+from flask import Response, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson(args):
+    """
+    Check whether a request asked for a streamed NDJSON body
+
+    Args:
+        args: Request query arguments
+
+    Returns:
+        True for ?format=ndjson
+    """
+    return args.get('format', 'json').lower() == 'ndjson'
+
+
+def ndjson_response(rows, chunk_size=500):
+    """
+    Stream rows as one JSON document per line
+
+    Lines are joined into chunks of chunk_size rows so each write to the socket carries a
+    useful amount of data, while memory stays bounded by one chunk whatever the row count.
+
+    Args:
+        rows: Iterable of JSON-serializable dictionaries (typically a generator)
+        chunk_size: Rows per written chunk
+
+    Returns:
+        Flask streaming Response
+    """
+    def generate():
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(row, separators=(',', ':')))
+            if len(lines) >= chunk_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks straight through
+    return response
@@ -0,0 +1,585 @@
+"""
+Trigger Engine
+Compiles automation trigger conditions into predicates indexed by the metric they watch
+"""
+
+import bisect
+import logging
+import operator
+import re
+import threading
+import time
+from datetime import datetime
+
+try:
+    from pymongo import ReturnDocument
+    from pymongo.errors import DuplicateKeyError
+except ImportError:  # Optional at runtime: without MongoDB triggers live in this process only
+    ReturnDocument = DuplicateKeyError = None
+
+from services.cluster import broadcast, bus
+from storage.db import get_db, get_writer
+from storage.metric_store import to_epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+# Any account: triggers stored under this key are evaluated for every account
+ALL_ACCOUNTS = '*'
+
+# Seconds a trigger stays quiet after firing unless it sets its own cooldown
+DEFAULT_COOLDOWN = 3600
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+
+# Condition names that differ from stored metric names
+METRIC_ALIASES = {
+    'engagement_rate': 'engagement',
+    'rank': 'search_position',
+    'position': 'search_position'
+}
+
+# Derived quantities: name -> (metric, function of (previous, current)). A rank "drop" is
+# the position number going up.
+DERIVED = {
+    'rank_drop': ('search_position', lambda previous, current: current - previous),
+    'rank_rise': ('search_position', lambda previous, current: previous - current)
+}
+
+# Conditions that are not metric comparisons but named events raised by other services
+EVENT_CONDITIONS = {
+    'best time reached': 'best_time_reached'
+}
+
+CLAUSE_PATTERN = re.compile(
+    r'^\s*(?P<name>[a-z][a-z0-9_]*)\s*(?P<op><=|>=|==|!=|<|>)\s*'
+    r'(?P<value>-?\d+(?:\.\d+)?)\s*(?P<unit>%|[a-z ]*)\s*$'
+)
+
+
+class Clause:
+    """One compiled `<quantity> <op> <threshold>` comparison"""
+
+    __slots__ = ('metric', 'op', 'threshold', 'derive', 'compare')
+
+    def __init__(self, metric, op, threshold, derive=None):
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        self.derive = derive
+        self.compare = OPERATORS[op]
+
+    def quantity(self, previous, current):
+        """The value compared against the threshold, or None when it cannot be known yet"""
+        if current is None:
+            return None
+        if self.derive is None:
+            return current
+        return None if previous is None else self.derive(previous, current)
+
+    def test(self, previous, current):
+        value = self.quantity(previous, current)
+        return value is not None and self.compare(value, self.threshold)
+
+
+def compile_condition(condition):
+    """
+    Compile a condition such as 'engagement_rate < 3%' or 'rank_drop > 5 positions'
+
+    Clauses may be joined with 'and'; the trigger is indexed by its first clause and the
+    rest are checked only when that one matches. Units ('%', 'positions', ...) are
+    descriptive and do not scale the threshold.
+
+    Args:
+        condition: Condition string
+
+    Returns:
+        List of Clause objects
+
+    Raises:
+        ValueError: If the condition cannot be parsed
+    """
+    clauses = []
+    for part in re.split(r'\s+and\s+', condition.strip().lower()):
+        match = CLAUSE_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"Cannot parse trigger condition: {condition!r}")
+        name = match.group('name')
+        if name in DERIVED:
+            metric, derive = DERIVED[name]
+        else:
+            metric, derive = METRIC_ALIASES.get(name, name), None
+        clauses.append(Clause(metric, match.group('op'), float(match.group('value')), derive))
+    return clauses
+
+
+class ThresholdIndex:
+    """
+    Thresholds for one (account, quantity, operator) kept sorted, so the triggers a value
+    satisfies form a contiguous run found by bisection: O(log n + matches) per point.
+    """
+
+    def __init__(self, op):
+        self.op = op
+        self.thresholds = []
+        self.trigger_ids = []
+
+    def add(self, threshold, trigger_id):
+        i = bisect.bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.trigger_ids.insert(i, trigger_id)
+
+    def remove(self, threshold, trigger_id):
+        i = bisect.bisect_left(self.thresholds, threshold)
+        while i < len(self.thresholds) and self.thresholds[i] == threshold:
+            if self.trigger_ids[i] == trigger_id:
+                del self.thresholds[i]
+                del self.trigger_ids[i]
+                return
+            i += 1
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    def matching(self, value):
+        """Ids of triggers whose `value <op> threshold` holds"""
+        thresholds = self.thresholds
+        if self.op == '<':
+            return self.trigger_ids[bisect.bisect_right(thresholds, value):]
+        if self.op == '<=':
+            return self.trigger_ids[bisect.bisect_left(thresholds, value):]
+        if self.op == '>':
+            return self.trigger_ids[:bisect.bisect_left(thresholds, value)]
+        if self.op == '>=':
+            return self.trigger_ids[:bisect.bisect_right(thresholds, value)]
+        lo = bisect.bisect_left(thresholds, value)
+        hi = bisect.bisect_right(thresholds, value)
+        if self.op == '==':
+            return self.trigger_ids[lo:hi]
+        return self.trigger_ids[:lo] + self.trigger_ids[hi:]
+
+
+# Trigger actions of the form 'workflow:<id>' start that workflow instead of logging
+WORKFLOW_ACTION_PREFIX = 'workflow:'
+
+# Built-in triggers registered when no persisted triggers exist
+DEFAULT_TRIGGERS = [
+    {
+        'name': 'Low Engagement Alert',
+        'condition': 'engagement_rate < 3%',
+        'action': 'Send notification'
+    },
+    {
+        'name': 'Auto-Post Scheduler',
+        'condition': 'Best time reached',
+        'action': 'Post to social media'
+    },
+    {
+        'name': 'SEO Rank Drop Alert',
+        'condition': 'rank_drop > 5 positions',
+        'action': 'Notify team + suggest fixes'
+    }
+]
+
+
+class TriggerEngine:
+    """
+    Holds every trigger, compiled once, and evaluates incoming metric points.
+
+    Triggers are indexed by (account, metric) and then by (derivation, operator), each a
+    ThresholdIndex. A point therefore only touches triggers on its own metric and account
+    (plus account-wide '*' triggers) and, within those, only the ones it satisfies.
+
+    Every worker holds its own engine. Ids come from a MongoDB counter, creates and deletes
+    are written to MongoDB before they return, and every change (including firings, for
+    cooldowns) is broadcast so the other workers' indexes stay in step.
+    """
+
+    def __init__(self, collection=None):
+        self._collection = collection
+        self._lock = threading.RLock()
+        self._triggers = {}
+        self._compiled = {}
+        self._index = {}
+        self._events = {}
+        self._last_values = {}
+        self._next_id = 1
+        self.evaluated = 0
+        self.fired = 0
+
+    def _indexes_for(self, account, metric):
+        return self._index.setdefault((account, metric), {})
+
+    def add(self, name, condition, action, account=ALL_ACCOUNTS, cooldown=DEFAULT_COOLDOWN,
+            status='active', trigger_id=None, last_triggered=None, persist=True):
+        """
+        Compile and register a trigger
+
+        Args:
+            name: Display name
+            condition: Condition string (see compile_condition)
+            action: Action description or workflow reference run when it fires
+            account: Account the trigger watches, '*' for all
+            cooldown: Minimum seconds between firings
+            status: 'active' or 'paused'
+            trigger_id: Existing id when loading persisted triggers
+            last_triggered: Datetime of the last firing
+            persist: Write the trigger to MongoDB and announce it to other workers
+
+        Returns:
+            Trigger dictionary
+
+        Raises:
+            ValueError: If the condition does not compile
+        """
+        event = EVENT_CONDITIONS.get(condition.strip().lower())
+        clauses = None if event else compile_condition(condition)
+        if trigger_id is None:
+            trigger_id = self._allocate_id()
+        with self._lock:
+            self._next_id = max(self._next_id, trigger_id + 1)
+            trigger = {
+                'id': trigger_id,
+                'name': name,
+                'condition': condition,
+                'action': action,
+                'account': account,
+                'cooldown': cooldown,
+                'status': status,
+                'last_triggered': last_triggered
+            }
+            self._triggers[trigger_id] = trigger
+            self._compiled[trigger_id] = clauses
+            if event:
+                self._events.setdefault((account, event), []).append(trigger_id)
+            else:
+                first = clauses[0]
+                indexes = self._indexes_for(account, first.metric)
+                index = indexes.setdefault((first.derive, first.op), ThresholdIndex(first.op))
+                index.add(first.threshold, trigger_id)
+
+        if persist:
+            self._insert(trigger)
+            broadcast('trigger', {'op': 'add', 'trigger': trigger})
+        return dict(trigger)
+
+    def _allocate_id(self):
+        """Next trigger id, from a counter shared by every worker when MongoDB is available"""
+        if self._collection is not None:
+            counter = self._collection.database.counters.find_one_and_update(
+                {'_id': 'triggers'}, {'$inc': {'seq': 1}}, upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return counter['seq']
+        with self._lock:
+            trigger_id = self._next_id
+            self._next_id += 1
+            return trigger_id
+
+    def remove(self, trigger_id, persist=True):
+        """
+        Unregister a trigger
+
+        Args:
+            trigger_id: Trigger id
+            persist: Delete the trigger from MongoDB and announce it to other workers
+
+        Returns:
+            True if it existed
+
+        Raises:
+            pymongo.errors.PyMongoError: If the delete cannot be written (the trigger stays
+                registered)
+        """
+        if persist and self._collection is not None:
+            with self._lock:
+                known = trigger_id in self._triggers
+            if known:
+                self._collection.delete_one({'id': trigger_id})
+
+        with self._lock:
+            trigger = self._triggers.pop(trigger_id, None)
+            if trigger is None:
+                return False
+            clauses = self._compiled.pop(trigger_id)
+            if clauses is None:
+                event = EVENT_CONDITIONS[trigger['condition'].strip().lower()]
+                self._events[(trigger['account'], event)].remove(trigger_id)
+            else:
+                first = clauses[0]
+                indexes = self._index.get((trigger['account'], first.metric), {})
+                index = indexes.get((first.derive, first.op))
+                if index is not None:
+                    index.remove(first.threshold, trigger_id)
+                    if not index:
+                        del indexes[(first.derive, first.op)]
+
+        if persist:
+            broadcast('trigger', {'op': 'remove', 'id': trigger_id})
+        return True
+
+    def list(self, account=None):
+        """
+        List triggers
+
+        Args:
+            account: Only this account's triggers (plus account-wide ones)
+
+        Returns:
+            List of trigger dictionaries ordered by id
+        """
+        with self._lock:
+            triggers = [dict(t) for _, t in sorted(self._triggers.items())]
+        if account is not None:
+            triggers = [t for t in triggers if t['account'] in (account, ALL_ACCOUNTS)]
+        return triggers
+
+    def evaluate(self, account, metric, value, now=None):
+        """
+        Evaluate one incoming metric value
+
+        Args:
+            account: Account the value belongs to
+            metric: Metric name
+            value: New value
+            now: Evaluation time in epoch seconds (default: current time)
+
+        Returns:
+            List of triggers that fired
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            previous = self._last_values.get((account, metric), (None, None))[1]
+            self._last_values[(account, metric)] = (previous, value)
+            candidates = []
+            for scope in (account, ALL_ACCOUNTS):
+                for (derive, _), index in self._index.get((scope, metric), {}).items():
+                    quantity = value if derive is None else (
+                        None if previous is None else derive(previous, value)
+                    )
+                    if quantity is not None:
+                        candidates.extend(index.matching(quantity))
+
+            self.evaluated += 1
+            return self._fire(account, candidates, now, value)
+
+    def fire_event(self, account, event, now=None):
+        """
+        Fire the triggers waiting on a named event (see EVENT_CONDITIONS)
+
+        Args:
+            account: Account the event belongs to
+            event: Event name, e.g. 'best_time_reached'
+            now: Event time in epoch seconds (default: current time)
+
+        Returns:
+            List of triggers that fired
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            candidates = self._events.get((account, event), []) + self._events.get((ALL_ACCOUNTS, event), [])
+            return self._fire(account, candidates, now, None)
+
+    def _fire(self, account, candidates, now, value):
+        """Apply status, cooldown and secondary clauses to candidate ids (lock held)"""
+        fired = []
+        for trigger_id in candidates:
+            trigger = self._triggers[trigger_id]
+            if trigger['status'] != 'active':
+                continue
+            last = trigger['last_triggered']
+            if last is not None and now - to_epoch_seconds(last) < trigger['cooldown']:
+                continue
+            rest = (self._compiled[trigger_id] or [])[1:]
+            if not all(clause.test(*self._last_values.get((account, clause.metric), (None, None)))
+                       for clause in rest):
+                continue
+            trigger['last_triggered'] = datetime.utcfromtimestamp(now)
+            self._record_firing(trigger, now)
+            fired.append(dict(trigger, fired_account=account, value=value))
+        self.fired += len(fired)
+        return fired
+
+    def evaluate_points(self, account, points):
+        """
+        Evaluate a batch of (epoch_seconds, metric, value) points in time order
+
+        Args:
+            account: Account the points belong to
+            points: Iterable of points, e.g. from a connector sync
+
+        Returns:
+            List of triggers that fired
+        """
+        fired = []
+        for _, metric, value in sorted(points, key=lambda p: p[0]):
+            if value is None or value != value:
+                continue
+            fired.extend(self.evaluate(account, metric, value))
+        return fired
+
+    def stats(self):
+        """
+        Get engine counters
+
+        Returns:
+            Dictionary of trigger, index, evaluation and firing counts
+        """
+        with self._lock:
+            return {
+                'triggers': len(self._triggers),
+                'indexed_metrics': len(self._index),
+                'evaluated': self.evaluated,
+                'fired': self.fired
+            }
+
+    def _insert(self, trigger):
+        """Write a new trigger to MongoDB (a no-op when another worker already seeded it)"""
+        if self._collection is None:
+            return
+        try:
+            self._collection.update_one({'id': trigger['id']}, {'$setOnInsert': dict(trigger)}, upsert=True)
+        except DuplicateKeyError:
+            pass
+
+    def _record_firing(self, trigger, now):
+        """
+        Queue a firing time update on the buffered writer, so firing never waits on MongoDB,
+        and share it so other workers honour the cooldown. The update never upserts, so a
+        firing that races a delete cannot bring the trigger back.
+        """
+        writer = get_writer() if self._collection is not None else None
+        if writer is not None:
+            writer.update(self._collection.name, {'id': trigger['id']},
+                          {'$set': {'last_triggered': trigger['last_triggered']}})
+        broadcast('trigger', {'op': 'fired', 'id': trigger['id'], 'at': now})
+
+    def apply_remote(self, change):
+        """
+        Apply a trigger change broadcast by another worker
+
+        Args:
+            change: {'op': 'add', 'trigger'}, {'op': 'remove', 'id'} or {'op': 'fired', 'id', 'at'}
+        """
+        op = change['op']
+        if op == 'add':
+            trigger = change['trigger']
+            with self._lock:
+                if trigger['id'] in self._triggers:
+                    return
+            self.add(
+                trigger['name'], trigger['condition'], trigger['action'],
+                account=trigger['account'], cooldown=trigger['cooldown'], status=trigger['status'],
+                trigger_id=trigger['id'], persist=False
+            )
+        elif op == 'remove':
+            self.remove(change['id'], persist=False)
+        elif op == 'fired':
+            with self._lock:
+                trigger = self._triggers.get(change['id'])
+                if trigger is not None:
+                    trigger['last_triggered'] = datetime.utcfromtimestamp(change['at'])
+
+    def load(self):
+        """
+        Load persisted triggers, seeding the defaults when there are none
+
+        Returns:
+            Number of triggers registered
+        """
+        stored = []
+        if self._collection is not None:
+            try:
+                stored = list(self._collection.find({}, {'_id': 0}))
+            except Exception as e:
+                logger.warning('Could not load triggers: %s', e)
+
+        for trigger in stored:
+            try:
+                self.add(
+                    trigger['name'], trigger['condition'], trigger['action'],
+                    account=trigger.get('account', ALL_ACCOUNTS),
+                    cooldown=trigger.get('cooldown', DEFAULT_COOLDOWN),
+                    status=trigger.get('status', 'active'),
+                    trigger_id=trigger['id'],
+                    last_triggered=trigger.get('last_triggered'),
+                    persist=False
+                )
+            except ValueError as e:
+                logger.warning('Skipping trigger %s: %s', trigger.get('id'), e)
+
+        if not stored:
+            # Fixed ids, so workers seeding at the same time write the same documents
+            for trigger_id, trigger in enumerate(DEFAULT_TRIGGERS, 1):
+                self.add(trigger_id=trigger_id, **trigger)
+        if self._collection is not None:
+            # New ids must start above every existing one
+            self._collection.database.counters.update_one(
+                {'_id': 'triggers'}, {'$max': {'seq': max(self._triggers, default=0)}}, upsert=True
+            )
+        return len(self._triggers)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_trigger_engine():
+    """
+    Get the process-wide trigger engine, loaded from MongoDB when available
+
+    Returns:
+        TriggerEngine instance
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                db = get_db()
+                engine = TriggerEngine(db.triggers if db is not None else None)
+                engine.load()
+                _engine = engine
+    return _engine
+
+
+def _apply_trigger_change(change):
+    """Mirror another worker's trigger change, if this worker has loaded its engine"""
+    if _engine is not None:
+        _engine.apply_remote(change)
+
+
+bus.on('trigger', _apply_trigger_change)
+
+
+def run_triggers(account, points):
+    """
+    Evaluate synced points and log an automation entry for every trigger that fires
+
+    Args:
+        account: Account identifier
+        points: List of (epoch_seconds, metric, value)
+
+    Returns:
+        List of fired triggers
+    """
+    from storage.automation_logs import record_automation_log
+    from services.workflows import start_workflow_for_trigger
+
+    fired = get_trigger_engine().evaluate_points(account, points)
+    for trigger in fired:
+        if trigger['action'].startswith(WORKFLOW_ACTION_PREFIX):
+            start_workflow_for_trigger(trigger, account)
+            continue
+        record_automation_log(
+            trigger['action'], 'success',
+            f"{trigger['name']} fired: {trigger['condition']} (value {trigger['value']:g})"
+            if trigger['value'] is not None else f"{trigger['name']} fired: {trigger['condition']}",
+            trigger_id=trigger['id'], account=account
+        )
+    return fired
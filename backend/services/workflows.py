@@ -0,0 +1,587 @@
+"""
+Workflow Service
+Persisted workflow definitions executed as DAGs of action steps on a shared worker pool
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    from pymongo.errors import DuplicateKeyError
+except ImportError:  # Optional at runtime: without MongoDB idempotency keys are per process
+    DuplicateKeyError = None
+
+from config import Config
+from services.events import publish_event
+from storage.automation_logs import record_automation_log
+from storage.db import get_db, get_writer
+
+logger = logging.getLogger(__name__)
+
+# Runs kept in-process for status reads (older ones are only in MongoDB)
+MAX_RUNS_IN_MEMORY = 10000
+
+# Step durations kept per action for latency percentiles
+LATENCY_WINDOW = 1000
+
+# Seconds before the first retry of a failed step; doubles per attempt
+RETRY_BACKOFF = 0.5
+
+# Action name -> callable(params, context) returning a JSON-serializable result
+ACTIONS = {}
+
+
+def register_action(name):
+    """
+    Register a workflow action handler
+
+    Handlers receive the step params and a context dict holding account, run_id,
+    step_id, idempotency_key and the results of the steps it depends on. A step may be
+    retried, so handlers with external side effects should dedupe on idempotency_key.
+
+    Args:
+        name: Action name used in workflow steps
+
+    Returns:
+        Decorator
+    """
+    def decorator(fn):
+        ACTIONS[name] = fn
+        return fn
+    return decorator
+
+
+@register_action('notify_team')
+@register_action('send_notification')
+def notify(params, context):
+    message = params.get('message', f"Workflow step {context['step_id']} completed")
+    publish_event('notification', {'account': context['account'], 'message': message})
+    return {'notified': True, 'message': message}
+
+
+@register_action('sync_platform')
+def sync_platform(params, context):
+    from connectors.registry import default_accounts
+    from connectors.sync import sync_accounts
+
+    accounts = [a for a in default_accounts() if a['id'] == context['account']] or None
+    platform = params.get('platform')
+    summary = sync_accounts(accounts, [platform] if platform else None)
+    return {'duration': summary.get('duration')}
+
+
+def default_action(action):
+    """Handler for actions without a registered implementation: succeed and describe"""
+    def run(params, context):
+        return {'details': f'Successfully executed {action}'}
+    return run
+
+
+def build_steps(data):
+    """
+    Normalize a workflow request into steps and check they form a DAG
+
+    `steps` is a list of {id, action, params, depends_on, retries}; a plain `actions`
+    list of names becomes a chain where each step depends on the one before.
+
+    Args:
+        data: Workflow request body
+
+    Returns:
+        List of step dictionaries in a valid execution (topological) order
+
+    Raises:
+        ValueError: On missing actions, duplicate or unknown step ids, or cycles
+    """
+    raw = data.get('steps')
+    if raw is None:
+        raw = [
+            {'id': f'step{i + 1}', 'action': action, 'depends_on': [f'step{i}'] if i else []}
+            for i, action in enumerate(data.get('actions', []))
+        ]
+    if not raw:
+        raise ValueError('A workflow needs at least one step')
+
+    steps = {}
+    for i, step in enumerate(raw):
+        if not isinstance(step, dict) or not step.get('action'):
+            raise ValueError(f'Step {i + 1} has no action')
+        step_id = str(step.get('id') or f'step{i + 1}')
+        if step_id in steps:
+            raise ValueError(f'Duplicate step id: {step_id}')
+        steps[step_id] = {
+            'id': step_id,
+            'action': step['action'],
+            'params': step.get('params', {}),
+            'depends_on': [str(d) for d in step.get('depends_on', [])],
+            'retries': int(step.get('retries', 2))
+        }
+
+    # Kahn's algorithm: also yields the order steps are listed in
+    indegree = {step_id: 0 for step_id in steps}
+    dependents = {step_id: [] for step_id in steps}
+    for step in steps.values():
+        for dependency in step['depends_on']:
+            if dependency not in steps:
+                raise ValueError(f"Step {step['id']} depends on unknown step {dependency}")
+            indegree[step['id']] += 1
+            dependents[dependency].append(step['id'])
+    ready = deque(step_id for step_id, degree in indegree.items() if degree == 0)
+    order = []
+    while ready:
+        step_id = ready.popleft()
+        order.append(steps[step_id])
+        for dependent in dependents[step_id]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                ready.append(dependent)
+    if len(order) != len(steps):
+        raise ValueError('Workflow steps contain a dependency cycle')
+    return order
+
+
+class WorkflowEngine:
+    """
+    Stores workflow definitions and executes runs.
+
+    A run never occupies a thread while it waits: each step is a pool task, and when it
+    finishes the steps whose dependencies are now all done are submitted, so independent
+    branches run concurrently and thousands of runs share one fixed-size pool. Failed
+    steps are retried with exponential backoff from a timer rather than a sleeping
+    worker, and a step still running after WORKFLOW_ACTION_TIMEOUT is failed by a
+    watchdog timer. Runs are identified by an idempotency key, claimed in MongoDB under a
+    unique index, so re-submitting the same key to any worker returns the existing run
+    instead of executing its actions again.
+    """
+
+    def __init__(self, workflows=None, runs=None, workers=16, step_timeout=30):
+        self._workflows_collection = workflows
+        self._runs_collection = runs
+        self._step_timeout = step_timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='workflow')
+        self._lock = threading.Lock()
+        self._workflows = {}
+        self._runs = OrderedDict()
+        self._by_key = {}
+        self._latencies = {}
+        self.started = 0
+        self.finished = 0
+
+    def load(self):
+        """Load persisted workflow definitions"""
+        if self._workflows_collection is None:
+            return 0
+        try:
+            for workflow in self._workflows_collection.find({}, {'_id': 0}):
+                self._workflows[workflow['id']] = workflow
+        except Exception as e:
+            logger.warning('Could not load workflows: %s', e)
+        return len(self._workflows)
+
+    def create(self, data):
+        """
+        Validate and persist a workflow definition
+
+        Args:
+            data: Request body with name, trigger and steps (or actions)
+
+        Returns:
+            Workflow dictionary
+
+        Raises:
+            ValueError: If the steps are not a valid DAG
+        """
+        workflow = {
+            'id': uuid.uuid4().hex[:12],
+            'name': data.get('name') or 'Untitled workflow',
+            'trigger': data.get('trigger'),
+            'account': data.get('account', 'default'),
+            'steps': build_steps(data),
+            'status': 'active',
+            'created_at': datetime.utcnow().isoformat()
+        }
+        workflow['actions'] = [step['action'] for step in workflow['steps']]
+        with self._lock:
+            self._workflows[workflow['id']] = workflow
+        if self._workflows_collection is not None:
+            try:
+                self._workflows_collection.insert_one(dict(workflow))
+            except Exception as e:
+                logger.warning('Could not persist workflow %s: %s', workflow['id'], e)
+        return workflow
+
+    def get(self, workflow_id):
+        """Get a workflow definition, checking MongoDB for ones created by other workers"""
+        workflow = self._workflows.get(workflow_id)
+        if workflow is None and self._workflows_collection is not None:
+            try:
+                workflow = self._workflows_collection.find_one({'id': workflow_id}, {'_id': 0})
+            except Exception as e:
+                logger.warning('Could not load workflow %s: %s', workflow_id, e)
+            if workflow is not None:
+                self._workflows[workflow_id] = workflow
+        return workflow
+
+    def list(self):
+        """List workflow definitions, newest first, including ones created by other workers"""
+        if self._workflows_collection is not None:
+            try:
+                workflows = list(self._workflows_collection.find({}, {'_id': 0}).sort('created_at', -1))
+            except Exception as e:
+                logger.warning('Could not list workflows: %s', e)
+            else:
+                with self._lock:
+                    self._workflows.update((workflow['id'], workflow) for workflow in workflows)
+                return workflows
+        return sorted(self._workflows.values(), key=lambda w: w['created_at'], reverse=True)
+
+    def start(self, workflow, idempotency_key=None, account=None):
+        """
+        Start a run of a workflow
+
+        Args:
+            workflow: Workflow dictionary
+            idempotency_key: Client key; a repeated key returns the original run
+            account: Account the actions act for (defaults to the workflow's)
+
+        Returns:
+            Run dictionary
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        with self._lock:
+            existing = self._by_key.get((workflow['id'], key))
+        if existing is not None:
+            return self._snapshot(existing)
+
+        run = {
+            'id': uuid.uuid4().hex,
+            'workflow_id': workflow['id'],
+            'workflow': workflow['name'],
+            'account': account or workflow.get('account', 'default'),
+            'idempotency_key': key,
+            'status': 'running',
+            'created_at': datetime.utcnow().isoformat(),
+            'finished_at': None,
+            'steps': {
+                step['id']: {'action': step['action'], 'status': 'pending', 'attempts': 0,
+                             'duration_ms': None, 'result': None, 'error': None}
+                for step in workflow['steps']
+            }
+        }
+        run['_definition'] = {step['id']: step for step in workflow['steps']}
+        run['_waiting'] = {step['id']: len(step['depends_on']) for step in workflow['steps']}
+        run['_dependents'] = {step['id']: [] for step in workflow['steps']}
+        for step in workflow['steps']:
+            for dependency in step['depends_on']:
+                run['_dependents'][dependency].append(step['id'])
+        run['_done'] = threading.Event()
+        run['_settled'] = set()
+
+        claimed = self._claim(run)
+        if claimed is not None and claimed['id'] != run['id']:
+            return claimed
+
+        with self._lock:
+            existing = self._by_key.get((workflow['id'], key))
+            if existing is not None:
+                return self._snapshot(existing)
+
+            self._runs[run['id']] = run
+            self._by_key[(workflow['id'], key)] = run
+            while len(self._runs) > MAX_RUNS_IN_MEMORY:
+                _, old = self._runs.popitem(last=False)
+                self._by_key.pop((old['workflow_id'], old['idempotency_key']), None)
+            self.started += 1
+            ready = [step_id for step_id, waiting in run['_waiting'].items() if waiting == 0]
+
+        if claimed is None:
+            self._persist(run)
+        for step_id in ready:
+            self._submit(run, step_id)
+        return self._snapshot(run)
+
+    def _claim(self, run):
+        """
+        Insert a new run so its idempotency key is taken cluster-wide
+
+        Args:
+            run: Run dictionary
+
+        Returns:
+            The inserted run's snapshot, the run already holding the key, or None when
+            MongoDB is unavailable (the key is then only deduplicated in this process)
+        """
+        if self._runs_collection is None:
+            return None
+        snapshot = self._snapshot(run)
+        try:
+            self._runs_collection.insert_one(dict(snapshot))
+            return snapshot
+        except DuplicateKeyError:
+            existing = self._runs_collection.find_one(
+                {'workflow_id': run['workflow_id'], 'idempotency_key': run['idempotency_key']}, {'_id': 0}
+            )
+            if existing is not None:
+                return existing
+            logger.warning('Run key %s was claimed but not found', run['idempotency_key'])
+        except Exception as e:
+            logger.warning('Could not claim run key %s: %s', run['idempotency_key'], e)
+        return None
+
+    def _submit(self, run, step_id):
+        self._pool.submit(self._execute, run, step_id)
+
+    def _execute(self, run, step_id):
+        definition = run['_definition'][step_id]
+        state = run['steps'][step_id]
+        handler = ACTIONS.get(definition['action']) or default_action(definition['action'])
+        context = {
+            'account': run['account'],
+            'run_id': run['id'],
+            'step_id': step_id,
+            'idempotency_key': f"{run['id']}:{step_id}",
+            'inputs': {d: run['steps'][d]['result'] for d in definition['depends_on']}
+        }
+
+        state.update(status='running', attempts=state['attempts'] + 1)
+        attempt = state['attempts']
+        started = time.perf_counter()
+        watchdog = threading.Timer(self._step_timeout, self._timed_out, args=(run, step_id, attempt, started))
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            result = handler(definition['params'], context)
+        except Exception as e:
+            watchdog.cancel()
+            if not self._settle(run, step_id, attempt):
+                return
+            state.update(error=str(e), duration_ms=round((time.perf_counter() - started) * 1000, 3))
+            if state['attempts'] <= definition['retries']:
+                state['status'] = 'retrying'
+                delay = RETRY_BACKOFF * 2 ** (state['attempts'] - 1)
+                timer = threading.Timer(delay, self._submit, args=(run, step_id))
+                timer.daemon = True
+                timer.start()
+                return
+            state['status'] = 'failed'
+            self._step_finished(run, step_id, False)
+            return
+
+        watchdog.cancel()
+        if not self._settle(run, step_id, attempt):
+            return
+        duration = (time.perf_counter() - started) * 1000
+        state.update(status='succeeded', result=result, error=None, duration_ms=round(duration, 3))
+        with self._lock:
+            self._latencies.setdefault(definition['action'], deque(maxlen=LATENCY_WINDOW)).append(duration)
+        self._step_finished(run, step_id, True)
+
+    def _settle(self, run, step_id, attempt):
+        """Claim the outcome of a step attempt; False if the watchdog or handler already did"""
+        with self._lock:
+            if (step_id, attempt) in run['_settled']:
+                return False
+            run['_settled'].add((step_id, attempt))
+            return True
+
+    def _timed_out(self, run, step_id, attempt, started):
+        # The handler thread cannot be stopped; its late result is discarded by _settle.
+        # Timeouts are not retried so a hung action does not tie up more pool threads.
+        if not self._settle(run, step_id, attempt):
+            return
+        run['steps'][step_id].update(
+            status='failed', error=f'Timed out after {self._step_timeout:g}s',
+            duration_ms=round((time.perf_counter() - started) * 1000, 3)
+        )
+        self._step_finished(run, step_id, False)
+
+    def _step_finished(self, run, step_id, succeeded):
+        ready = []
+        with self._lock:
+            if succeeded:
+                for dependent in run['_dependents'][step_id]:
+                    run['_waiting'][dependent] -= 1
+                    if run['_waiting'][dependent] == 0:
+                        ready.append(dependent)
+            else:
+                # Everything downstream of a failed step is skipped
+                pending = list(run['_dependents'][step_id])
+                while pending:
+                    dependent = pending.pop()
+                    if run['steps'][dependent]['status'] == 'pending':
+                        run['steps'][dependent]['status'] = 'skipped'
+                        pending.extend(run['_dependents'][dependent])
+
+            statuses = [s['status'] for s in run['steps'].values()]
+            finished = not ready and all(s in ('succeeded', 'failed', 'skipped') for s in statuses)
+            if finished:
+                run['status'] = 'failed' if 'failed' in statuses else 'succeeded'
+                run['finished_at'] = datetime.utcnow().isoformat()
+                self.finished += 1
+
+        for dependent in ready:
+            self._submit(run, dependent)
+        if finished:
+            self._complete(run)
+
+    def _complete(self, run):
+        latency = sum(s['duration_ms'] or 0 for s in run['steps'].values())
+        failed = [step_id for step_id, s in run['steps'].items() if s['status'] == 'failed']
+        if run['workflow_id'].startswith('action:'):
+            step = run['steps']['action']
+            details = (step['result'] or {}).get('details', f"Executed {run['workflow']}") if not failed \
+                else f"{run['workflow']} failed: {step['error']}"
+        elif not failed:
+            details = f"Workflow '{run['workflow']}' completed {len(run['steps'])} steps in {latency:.1f} ms"
+        else:
+            details = f"Workflow '{run['workflow']}' failed at {', '.join(failed)}"
+        record_automation_log(
+            run['workflow'], 'success' if not failed else 'failed', details,
+            workflow_id=run['workflow_id'], run_id=run['id'], account=run['account'],
+            steps={step_id: {'status': s['status'], 'attempts': s['attempts'], 'duration_ms': s['duration_ms']}
+                   for step_id, s in run['steps'].items()}
+        )
+        self._persist(run)
+        run['_done'].set()
+
+    def _persist(self, run):
+        writer = get_writer() if self._runs_collection is not None else None
+        if writer is not None:
+            writer.upsert(self._runs_collection.name, {'id': run['id']}, {'$set': self._snapshot(run)})
+
+    @staticmethod
+    def _snapshot(run):
+        snapshot = {k: v for k, v in run.items() if not k.startswith('_')}
+        snapshot['steps'] = {step_id: dict(state) for step_id, state in run['steps'].items()}
+        return snapshot
+
+    def get_run(self, run_id, wait=0):
+        """
+        Get a run, optionally waiting for it to finish
+
+        Args:
+            run_id: Run identifier
+            wait: Seconds to wait for a terminal status
+
+        Returns:
+            Run dictionary or None
+        """
+        run = self._runs.get(run_id)
+        if run is not None:
+            if wait > 0:
+                run['_done'].wait(wait)
+            return self._snapshot(run)
+
+        if self._runs_collection is not None:
+            get_writer().flush(self._runs_collection.name)
+            try:
+                return self._runs_collection.find_one({'id': run_id}, {'_id': 0})
+            except Exception as e:
+                logger.warning('Could not load run %s: %s', run_id, e)
+        return None
+
+    def stats(self):
+        """
+        Get run counters and per-action step latency percentiles
+
+        Returns:
+            Dictionary of run counts and latency stats keyed by action
+        """
+        with self._lock:
+            samples = {action: sorted(durations) for action, durations in self._latencies.items()}
+            running = self.started - self.finished
+        latency = {}
+        for action, durations in samples.items():
+            n = len(durations)
+            latency[action] = {
+                'samples': n,
+                'p50_ms': round(durations[n // 2], 3),
+                'p95_ms': round(durations[min(n - 1, int(n * 0.95))], 3),
+                'max_ms': round(durations[-1], 3)
+            }
+        return {
+            'workflows': len(self._workflows),
+            'runs_started': self.started,
+            'runs_finished': self.finished,
+            'runs_active': running,
+            'step_latency': latency
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_workflow_engine():
+    """
+    Get the process-wide workflow engine, persisting to MongoDB when available
+
+    Returns:
+        WorkflowEngine instance
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                db = get_db()
+                engine = WorkflowEngine(
+                    db.workflows if db is not None else None,
+                    db.workflow_runs if db is not None else None,
+                    Config.WORKFLOW_WORKERS,
+                    Config.WORKFLOW_ACTION_TIMEOUT
+                )
+                engine.load()
+                _engine = engine
+    return _engine
+
+
+def run_action(action, params=None, account='default', retries=2):
+    """
+    Execute a single action as a one-step workflow run and wait for it
+
+    Args:
+        action: Action name
+        params: Action parameters
+        account: Account identifier
+        retries: Retry attempts on failure
+
+    Returns:
+        Finished run dictionary
+    """
+    engine = get_workflow_engine()
+    workflow = {
+        'id': f'action:{action}',
+        'name': action,
+        'account': account,
+        'steps': [{'id': 'action', 'action': action, 'params': params or {}, 'depends_on': [], 'retries': retries}]
+    }
+    run = engine.start(workflow, account=account)
+    return engine.get_run(run['id'], wait=Config.WORKFLOW_ACTION_TIMEOUT)
+
+
+def start_workflow_for_trigger(trigger, account):
+    """
+    Start the workflow a fired trigger points at ('workflow:<id>')
+
+    The run's idempotency key is derived from the trigger and its firing time, so a
+    trigger evaluated twice for the same firing starts one run.
+
+    Args:
+        trigger: Fired trigger dictionary
+        account: Account the trigger fired for
+
+    Returns:
+        Run dictionary, or None if the workflow does not exist
+    """
+    engine = get_workflow_engine()
+    workflow = engine.get(trigger['action'].split(':', 1)[1])
+    if workflow is None:
+        record_automation_log(trigger['action'], 'failed', f"{trigger['name']}: workflow not found")
+        return None
+    key = f"trigger:{trigger['id']}:{account}:{trigger['last_triggered'].isoformat()}"
+    return engine.start(workflow, idempotency_key=key, account=account)
@@ -0,0 +1,105 @@
+"""
+Automation Logs
+Append-only execution log written through the buffered MongoDB writer
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+
+from services.events import publish_event
+from storage.db import get_db, get_writer
+
+# Fields returned to API clients
+LOG_PROJECTION = {'_id': 0, 'timestamp': 1, 'action': 1, 'status': 1, 'details': 1}
+
+# Entries kept in-process for reads when MongoDB is unavailable
+RING_SIZE = 1000
+
+_ring = deque(maxlen=RING_SIZE)
+_ring_lock = threading.Lock()
+
+
+def record_automation_log(action, status, details='', **extra):
+    """
+    Record an automation execution
+
+    Args:
+        action: Action name
+        status: Outcome (success, failed, ...)
+        details: Human readable description
+        **extra: Additional fields stored with the entry (workflow_id, account, ...)
+
+    Returns:
+        The stored log entry
+    """
+    entry = {
+        'timestamp': datetime.utcnow().replace(microsecond=0),
+        'action': action,
+        'status': status,
+        'details': details
+    }
+    entry.update(extra)
+
+    with _ring_lock:
+        _ring.append(entry)
+
+    writer = get_writer()
+    if writer is not None:
+        writer.insert('automation_logs', dict(entry))
+    publish_event('automation', _serialize({key: entry[key] for key in LOG_PROJECTION if key != '_id'}))
+    return entry
+
+
+def iter_automation_logs(limit=None, batch_size=500):
+    """
+    Iterate automation log entries newest first without materializing them
+
+    Args:
+        limit: Maximum number of entries, None for all
+        batch_size: Documents fetched per MongoDB round trip
+
+    Yields:
+        Log dictionaries
+    """
+    db = get_db()
+    if db is not None:
+        get_writer().flush('automation_logs')
+        cursor = db.automation_logs.find({}, LOG_PROJECTION, batch_size=batch_size).sort('timestamp', -1)
+        if limit:
+            cursor = cursor.limit(limit)
+        for doc in cursor:
+            yield _serialize(doc)
+        return
+
+    # The ring is bounded, so a snapshot of it is cheap
+    for entry in recent_automation_logs(limit or RING_SIZE):
+        yield entry
+
+
+def recent_automation_logs(limit=50):
+    """
+    Get the most recent automation log entries, newest first
+
+    Args:
+        limit: Maximum number of entries
+
+    Returns:
+        List of log dictionaries
+    """
+    db = get_db()
+    if db is not None:
+        get_writer().flush('automation_logs')
+        cursor = db.automation_logs.find({}, LOG_PROJECTION).sort('timestamp', -1).limit(limit)
+        return [_serialize(doc) for doc in cursor]
+
+    with _ring_lock:
+        entries = list(_ring)[-limit:]
+    entries.reverse()
+    return [_serialize({key: entry.get(key) for key in LOG_PROJECTION if key != '_id'}) for entry in entries]
+
+
+def _serialize(entry):
+    """Render the stored datetime the way the API has always returned it"""
+    entry['timestamp'] = entry['timestamp'].isoformat() + 'Z'
+    return entry
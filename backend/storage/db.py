@@ -0,0 +1,330 @@
+"""
+Database
+One pooled MongoClient per worker process, buffered bulk writes and projected reads
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from config import Config, get_config
+
+try:
+    from pymongo import InsertOne, MongoClient, UpdateOne
+    from pymongo.errors import BulkWriteError
+except ImportError:  # Optional at runtime: callers fall back to in-process storage
+    MongoClient = None
+
+logger = logging.getLogger(__name__)
+
+# Fields returned when reading metric points back
+POINT_PROJECTION = {'_id': 0, 'timestamp': 1, 'metric': 1, 'value': 1}
+
+_db = None
+_db_pid = None
+_lock = threading.Lock()
+
+
+def get_db():
+    """
+    Get the MongoDB database for this worker process
+
+    The client (and its connection pool) is created and probed once per process, so
+    gunicorn workers forked from a preloaded master never share sockets. When pymongo is
+    missing or the server does not answer, None is returned and callers keep their
+    in-memory state.
+
+    Returns:
+        pymongo Database or None
+    """
+    global _db, _db_pid
+    pid = os.getpid()
+    if _db_pid == pid:
+        return _db
+
+    with _lock:
+        if _db_pid != pid:
+            _db = None
+            uri = get_config().MONGODB_URI
+            if MongoClient is not None and uri:
+                try:
+                    client = MongoClient(
+                        uri,
+                        maxPoolSize=Config.MONGODB_MAX_POOL_SIZE,
+                        serverSelectionTimeoutMS=1000,
+                        connect=False
+                    )
+                    client.admin.command('ping')
+                    _db = client.get_default_database('flowmind')
+                except Exception as e:
+                    logger.warning('MongoDB unavailable (%s), using in-memory storage', e)
+            _db_pid = pid
+    return _db
+
+
+class BufferedWriter:
+    """
+    Accumulates write operations per collection and flushes them as unordered bulk writes.
+
+    A buffer is flushed by the thread that fills it to batch_size, and a background thread
+    flushes whatever is pending every flush_interval seconds. Plain inserts go through
+    insert_many; upserts and mixed batches go through bulk_write. A failing batch is
+    logged and dropped so a database outage cannot grow memory without bound.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.queued = 0
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mongo-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning('Background flush failed: %s', e)
+
+    def _add(self, collection, operation):
+        with self._lock:
+            self._start()
+            buffer = self._buffers.setdefault(collection, [])
+            buffer.append(operation)
+            self.queued += 1
+            full = len(buffer) >= self.batch_size
+        if full:
+            self.flush(collection)
+
+    def insert(self, collection, document):
+        """Queue a document insert"""
+        self._add(collection, InsertOne(document))
+
+    def upsert(self, collection, selector, update):
+        """Queue an upsert of the document matching selector"""
+        self._add(collection, UpdateOne(selector, update, upsert=True))
+
+    def update(self, collection, selector, update):
+        """Queue an update of the document matching selector (a no-op if it was deleted)"""
+        self._add(collection, UpdateOne(selector, update))
+
+    def flush(self, collection=None):
+        """
+        Write pending operations now
+
+        Args:
+            collection: Only flush this collection (default: all)
+
+        Returns:
+            Number of operations written
+        """
+        with self._lock:
+            names = [collection] if collection else list(self._buffers)
+            batches = [(name, self._buffers.pop(name)) for name in names if self._buffers.get(name)]
+        if not batches:
+            return 0
+
+        db = get_db()
+        written = 0
+        with self._flush_lock:
+            for name, operations in batches:
+                if db is None:
+                    self.dropped += len(operations)
+                    continue
+                try:
+                    if all(isinstance(op, InsertOne) for op in operations):
+                        db[name].insert_many([op._doc for op in operations], ordered=False)
+                    else:
+                        db[name].bulk_write(operations, ordered=False)
+                    written += len(operations)
+                except BulkWriteError as e:
+                    # Unordered: everything except the reported errors was applied
+                    failed = len(e.details.get('writeErrors', []))
+                    written += len(operations) - failed
+                    self.dropped += failed
+                    logger.warning('Bulk write to %s had %d errors', name, failed)
+                except Exception as e:
+                    self.dropped += len(operations)
+                    logger.warning('Bulk write to %s failed (%s), dropped %d ops', name, e, len(operations))
+            self.written += written
+            self.flushes += 1
+        return written
+
+    def stats(self):
+        """
+        Get writer counters
+
+        Returns:
+            Dictionary of pending, queued, written, dropped and flush counts
+        """
+        with self._lock:
+            pending = sum(len(ops) for ops in self._buffers.values())
+        return {
+            'pending': pending,
+            'queued': self.queued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'flushes': self.flushes
+        }
+
+
+_writer = None
+_writer_pid = None
+
+
+def get_writer():
+    """
+    Get this process's buffered writer, or None when MongoDB is unavailable
+
+    Returns:
+        BufferedWriter or None
+    """
+    global _writer, _writer_pid
+    if get_db() is None:
+        return None
+    pid = os.getpid()
+    if _writer_pid != pid:
+        with _lock:
+            if _writer_pid != pid:
+                _writer = BufferedWriter(Config.MONGODB_WRITE_BATCH, Config.MONGODB_FLUSH_INTERVAL)
+                atexit.register(_writer.flush)
+                _writer_pid = pid
+    return _writer
+
+
+def _bulk_write(collection, operations):
+    """Apply operations as unordered bulk writes of MONGODB_WRITE_BATCH, raising on failure"""
+    db = get_db()
+    for start in range(0, len(operations), Config.MONGODB_WRITE_BATCH):
+        db[collection].bulk_write(operations[start:start + Config.MONGODB_WRITE_BATCH], ordered=False)
+
+
+def bulk_upsert_points(account, platform, category, points):
+    """
+    Upsert metric points into the analytics collection
+
+    Written synchronously in unordered bulk batches rather than through the buffered
+    writer, which drops failed batches: syncs advance their watermark afterwards, so the
+    points must be stored (or the sync fail) before this returns.
+
+    Args:
+        account: Account identifier
+        platform: Source platform
+        category: Analytics `type` (traffic, engagement, conversions, social)
+        points: List of (epoch_seconds, metric, value)
+
+    Returns:
+        Number of points written (0 without MongoDB)
+
+    Raises:
+        pymongo.errors.PyMongoError: If a batch fails
+    """
+    if get_db() is None:
+        return 0
+
+    _bulk_write('analytics', [
+        UpdateOne(
+            {'account': account, 'metric': metric, 'timestamp': datetime.utcfromtimestamp(ts)},
+            {'$set': {'value': value, 'type': category, 'platform': platform}},
+            upsert=True
+        )
+        for ts, metric, value in points
+    ])
+    return len(points)
+
+
+def find_metric_points(account, since=None):
+    """
+    Stream stored metric points for an account, oldest first
+
+    Args:
+        account: Account identifier
+        since: Optional datetime lower bound
+
+    Returns:
+        Iterator of (epoch_seconds, metric, value) tuples (empty without MongoDB)
+    """
+    db = get_db()
+    if db is None:
+        return iter(())
+
+    query = {'account': account, 'metric': {'$exists': True}}
+    if since is not None:
+        query['timestamp'] = {'$gte': since}
+    cursor = db.analytics.find(query, POINT_PROJECTION, batch_size=5000).sort('timestamp', 1)
+    epoch = datetime(1970, 1, 1)
+    return (
+        (int((doc['timestamp'] - epoch).total_seconds()), doc['metric'], doc['value'])
+        for doc in cursor
+    )
+
+
+def save_documents(account, documents):
+    """
+    Upsert text documents (posts, comments, page content) into the content collection
+
+    Written synchronously like bulk_upsert_points, since syncs advance their watermark
+    past these documents afterwards.
+
+    Args:
+        account: Account identifier
+        documents: List of dicts with 'id', 'text', 'kind' and 'timestamp' (epoch seconds)
+
+    Returns:
+        Number of documents written (0 without MongoDB)
+
+    Raises:
+        pymongo.errors.PyMongoError: If a batch fails
+    """
+    if get_db() is None:
+        return 0
+
+    _bulk_write('content', [
+        UpdateOne(
+            {'account': account, 'id': doc['id']},
+            {'$set': {
+                'text': doc['text'],
+                'kind': doc['kind'],
+                'timestamp': datetime.utcfromtimestamp(doc['timestamp'])
+            }},
+            upsert=True
+        )
+        for doc in documents
+    ])
+    return len(documents)
+
+
+def find_documents(account):
+    """
+    Stream stored text documents for an account, oldest first
+
+    Args:
+        account: Account identifier
+
+    Returns:
+        Iterator of document dicts shaped like save_documents input (empty without MongoDB)
+    """
+    db = get_db()
+    if db is None:
+        return iter(())
+
+    cursor = db.content.find({'account': account}, {'_id': 0, 'account': 0}, batch_size=5000).sort('timestamp', 1)
+    epoch = datetime(1970, 1, 1)
+    return (
+        dict(doc, timestamp=int((doc['timestamp'] - epoch).total_seconds()))
+        for doc in cursor
+    )
@@ -0,0 +1,168 @@
+"""
+Insight Store
+Alerts and materialized insights in the ai_insights collection
+"""
+
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+
+from services.events import publish_event
+from storage.db import get_db, get_writer
+
+# Fields returned to API clients
+INSIGHT_PROJECTION = {
+    '_id': 0, 'id': 1, 'type': 1, 'priority': 1, 'title': 1, 'description': 1, 'impact': 1,
+    'action': 1, 'category': 1, 'timestamp': 1
+}
+
+# Materialized insights also report whether the LLM or the template phrased them
+GENERATED_PROJECTION = dict(INSIGHT_PROJECTION, source=1)
+
+# Entries kept in-process for reads when MongoDB is unavailable
+RING_SIZE = 1000
+
+_ring = deque(maxlen=RING_SIZE)
+_ring_lock = threading.Lock()
+
+# Latest materialized insights per account, for reads when MongoDB is unavailable
+_generated = {}
+
+
+def record_insight(account, insight_type, priority, title, description, **extra):
+    """
+    Store an insight and push it to connected dashboards
+
+    Args:
+        account: Account identifier
+        insight_type: 'opportunity', 'alert', 'achievement' or 'recommendation'
+        priority: 'low', 'medium' or 'high'
+        title: Short headline
+        description: Human readable explanation
+        **extra: Additional fields (impact, action, category, metric, ...)
+
+    Returns:
+        The stored insight
+    """
+    entry = {
+        'id': uuid.uuid4().hex,
+        'account': account,
+        'timestamp': datetime.utcnow().replace(microsecond=0),
+        'type': insight_type,
+        'priority': priority,
+        'title': title,
+        'description': description
+    }
+    entry.update(extra)
+
+    with _ring_lock:
+        _ring.append(entry)
+
+    writer = get_writer()
+    if writer is not None:
+        writer.insert('ai_insights', dict(entry))
+    publish_event(insight_type, _serialize(_project(entry)))
+    return entry
+
+
+def recent_insights(account='default', limit=20, insight_type=None):
+    """
+    Get an account's most recent stored insights, newest first
+
+    Args:
+        account: Account identifier
+        limit: Maximum number of entries
+        insight_type: Optional type filter
+
+    Returns:
+        List of insight dictionaries
+    """
+    query = {'account': account}
+    if insight_type is not None:
+        query['type'] = insight_type
+
+    db = get_db()
+    if db is not None:
+        get_writer().flush('ai_insights')
+        cursor = db.ai_insights.find(query, INSIGHT_PROJECTION).sort('timestamp', -1).limit(limit)
+        return [_serialize(doc) for doc in cursor]
+
+    with _ring_lock:
+        entries = [entry for entry in reversed(_ring)
+                   if all(entry.get(key) == value for key, value in query.items())][:limit]
+    return [_serialize(_project(entry)) for entry in entries]
+
+
+def save_generated_insights(account, insights):
+    """
+    Replace an account's materialized insights with a new generation
+
+    The new generation is inserted before the previous one is deleted, so readers never
+    see an empty set; generated_insights() only returns the newest generation.
+
+    Args:
+        account: Account identifier
+        insights: Insight dicts from ai.insights, most significant first
+
+    Returns:
+        Generation timestamp
+    """
+    now = datetime.utcnow()
+    generation = now.replace(microsecond=now.microsecond // 1000 * 1000)  # MongoDB keeps milliseconds
+    docs = [dict(insight, account=account, generated=True, timestamp=generation) for insight in insights]
+    with _ring_lock:
+        _generated[account] = docs
+
+    db = get_db()
+    if db is not None:
+        # Written directly rather than through the buffered writer so the delete below
+        # cannot overtake the insert
+        if docs:
+            db.ai_insights.insert_many([dict(doc) for doc in docs], ordered=False)
+        db.ai_insights.delete_many({'account': account, 'generated': True, 'timestamp': {'$lt': generation}})
+    return generation
+
+
+def generated_insights(account='default', limit=5, priority=None):
+    """
+    Read an account's latest materialized insights
+
+    Served by the (account, generated, timestamp) index, or (account, generated, priority,
+    timestamp) when filtering by priority.
+
+    Args:
+        account: Account identifier
+        limit: Maximum number of insights
+        priority: Optional 'low', 'medium' or 'high' filter
+
+    Returns:
+        List of insight dictionaries in rank order
+    """
+    query = {'account': account, 'generated': True}
+    if priority is not None:
+        query['priority'] = priority
+
+    db = get_db()
+    if db is not None:
+        cursor = db.ai_insights.find(query, GENERATED_PROJECTION).sort([('timestamp', -1), ('id', 1)])
+        docs = list(cursor.limit(limit))
+    else:
+        with _ring_lock:
+            docs = _generated.get(account, [])
+        docs = [_project(doc, GENERATED_PROJECTION) for doc in docs
+                if priority is None or doc['priority'] == priority][:limit]
+
+    # A reader can land between a new generation's insert and the old one's delete
+    newest = docs[0]['timestamp'] if docs else None
+    return [_serialize(doc) for doc in docs if doc['timestamp'] == newest]
+
+
+def _project(entry, projection=INSIGHT_PROJECTION):
+    return {key: entry.get(key) for key in projection if key != '_id'}
+
+
+def _serialize(entry):
+    """Render the stored datetime as ISO 8601 UTC"""
+    entry['timestamp'] = entry['timestamp'].isoformat() + 'Z'
+    return entry
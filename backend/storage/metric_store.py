@@ -0,0 +1,543 @@
+"""
+Metric Store
+Columnar in-process time series storage backed by NumPy arrays
+"""
+
+import threading
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from config import Config
+from services.cluster import bus
+from storage.rollups import HourOfWeekProfile, Rollup, combine, finalize, raw_stats
+from storage.rollups import concat as concat_stats
+from storage.ttl_cache import TTLCache
+
+# Bucket widths in seconds for resampling
+INTERVALS = {
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400
+}
+
+# The Unix epoch fell on a Thursday; shifting by 3 days makes week buckets start on Monday
+WEEK_OFFSET = 3 * 86400
+
+# Default aggregation used when resampling each metric (anything not listed is summed)
+AGGREGATIONS = {
+    'engagement': 'mean',
+    'search_position': 'mean',
+    'youtube_subscribers': 'last',
+    'youtube_views': 'last',
+    'youtube_videos': 'last',
+    'twitter_followers': 'last',
+    'twitter_tweets': 'last',
+    'instagram_followers': 'last',
+    'instagram_posts': 'last'
+}
+
+# Demo series seeded into new accounts: hourly base level, daily swing, noise and growth per year
+DEMO_METRICS = {
+    'traffic': {'base': 125.0, 'swing': 0.45, 'noise': 0.15, 'growth': 0.30},
+    'engagement': {'base': 5.5, 'swing': 0.25, 'noise': 0.10, 'growth': 0.05},
+    'conversions': {'base': 7.5, 'swing': 0.50, 'noise': 0.30, 'growth': 0.20},
+    'social': {'base': 4200.0, 'swing': 0.40, 'noise': 0.12, 'growth': 0.25}
+}
+
+# Relative weekday lift applied to demo series (Monday first)
+DEMO_WEEKLY_PATTERN = np.array([0.95, 1.05, 1.15, 1.10, 0.95, 0.85, 0.90])
+
+
+class UnknownMetricError(ValueError):
+    """Raised when a read names a metric the store does not hold"""
+
+
+def to_epoch_seconds(value):
+    """
+    Convert datetimes, datetime64 values or numbers to integer epoch seconds
+
+    Args:
+        value: Scalar or array-like timestamp(s)
+
+    Returns:
+        int64 scalar or array of epoch seconds
+    """
+    if isinstance(value, datetime):
+        return int(value.timestamp()) if value.tzinfo else int(
+            (value - datetime(1970, 1, 1)).total_seconds()
+        )
+    arr = np.asarray(value)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype('datetime64[s]').astype(np.int64)
+    return arr.astype(np.int64)
+
+
+def bucket_start(timestamps, interval):
+    """
+    Align epoch seconds to the start of their resampling bucket
+
+    Args:
+        timestamps: int64 array of epoch seconds
+        interval: One of INTERVALS
+
+    Returns:
+        int64 array of bucket start times
+    """
+    step = INTERVALS[interval]
+    offset = WEEK_OFFSET if interval == 'week' else 0
+    return (timestamps + offset) // step * step - offset
+
+
+def format_timestamps(timestamps, interval='day'):
+    """
+    Format epoch seconds as ISO strings in one vectorized call
+
+    Args:
+        timestamps: int64 array of epoch seconds
+        interval: Resampling interval, controls output precision
+
+    Returns:
+        List of date strings
+    """
+    unit = 'm' if interval == 'hour' else 'D'
+    return np.datetime_as_string(
+        np.asarray(timestamps, dtype=np.int64).astype('datetime64[s]'), unit=unit
+    ).tolist()
+
+
+def to_json_list(values, decimals=2):
+    """
+    Round an array and convert it to a JSON-safe list (NaN becomes None)
+
+    Args:
+        values: Float array
+        decimals: Decimal places to keep
+
+    Returns:
+        Nested list of floats/None
+    """
+    values = np.round(values, decimals)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    out = values.astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+class MetricStore:
+    """
+    Append-mostly columnar store: one sorted timestamp column and one value column per metric.
+
+    Columns live in preallocated buffers that grow geometrically, so appends are amortised
+    O(1) and reads are zero-copy views. Points that do not carry a metric hold NaN.
+
+    Hourly, daily and weekly rollups are updated on every write for just the buckets the
+    write touched, and resample/aggregate read from them, so dashboard queries cost
+    O(buckets) plus at most one partial bucket of raw points at each edge.
+    """
+
+    def __init__(self, capacity=1024):
+        self._lock = threading.RLock()
+        self._size = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._values = np.empty((0, capacity), dtype=np.float64)
+        self._index = {}
+        self._rollups = {interval: Rollup() for interval in INTERVALS}
+        self._profile = HourOfWeekProfile()
+        self.version = 0  # Bumped on every write, so caches can key on the data they saw
+        self.revisions = 0  # Bumped when a write changes or inserts points before the newest one
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def metrics(self):
+        """Names of all stored metrics"""
+        return list(self._index)
+
+    @property
+    def last_timestamp(self):
+        """Epoch seconds of the newest point, or None when empty"""
+        return int(self._timestamps[self._size - 1]) if self._size else None
+
+    def _ensure_capacity(self, needed):
+        capacity = self._timestamps.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        timestamps = np.empty(capacity, dtype=np.int64)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        values = np.full((self._values.shape[0], capacity), np.nan)
+        values[:, :self._size] = self._values[:, :self._size]
+        self._timestamps, self._values = timestamps, values
+
+    def _row(self, metric):
+        row = self._index.get(metric)
+        if row is None:
+            row = len(self._index)
+            column = np.full((1, self._timestamps.shape[0]), np.nan)
+            self._values = np.vstack([self._values, column])
+            self._index[metric] = row
+        return row
+
+    def _rows(self, metrics):
+        missing = [m for m in metrics if m not in self._index]
+        if missing:
+            raise UnknownMetricError(f"Unknown metric(s): {', '.join(missing)}")
+        return [self._index[m] for m in metrics]
+
+    def append(self, timestamps, values):
+        """
+        Append a batch of points
+
+        Args:
+            timestamps: Array-like of epoch seconds or datetime64 values
+            values: Dict of metric name -> array-like aligned with timestamps
+        """
+        timestamps = np.atleast_1d(to_epoch_seconds(timestamps))
+        count = timestamps.shape[0]
+        if count == 0:
+            return
+
+        with self._lock:
+            start = self._size
+            self._ensure_capacity(start + count)
+            rows = {metric: self._row(metric) for metric in values}
+            self._timestamps[start:start + count] = timestamps
+            self._values[:, start:start + count] = np.nan
+            for metric, row in rows.items():
+                self._values[row, start:start + count] = np.asarray(values[metric], dtype=np.float64)
+
+            lo, hi = int(timestamps.min()), int(timestamps.max())
+            in_order = (start == 0 or timestamps[0] >= self._timestamps[start - 1]) and \
+                bool(np.all(np.diff(timestamps) >= 0))
+            self._size = start + count
+            self.version += 1
+            if not in_order:
+                self.revisions += 1
+                # Sort into fresh buffers so views handed out by earlier reads stay intact
+                order = np.argsort(self._timestamps[:self._size], kind='stable')
+                sorted_timestamps = np.empty_like(self._timestamps)
+                sorted_values = np.full_like(self._values, np.nan)
+                sorted_timestamps[:self._size] = self._timestamps[:self._size][order]
+                sorted_values[:, :self._size] = self._values[:, :self._size][:, order]
+                self._timestamps, self._values = sorted_timestamps, sorted_values
+            # Bounds of the incoming batch: only the buckets it touched need recomputing
+            self._refresh_rollups(lo, hi)
+
+    def _refresh_rollups(self, lo, hi):
+        """Recompute every rollup bucket overlapping [lo, hi], each level from the one below"""
+        source = None
+        for interval in ('hour', 'day', 'week'):
+            first = int(bucket_start(lo, interval))
+            last = int(bucket_start(hi, interval)) + INTERVALS[interval]
+            if source is None:
+                start, end = self._slice(first, last)
+                keys, stats = self._timestamps[start:end], raw_stats(self._values[:, start:end])
+            else:
+                keys, stats = source.query(slice(None), first, last)
+            keys, stats = combine(bucket_start(keys, interval), stats)
+            source = self._rollups[interval]
+            if interval == 'hour':
+                self._profile.update(*source.query(slice(None), first, last), sign=-1)
+                self._profile.update(keys, stats)
+            source.replace(first, last, keys, stats)
+
+    def append_points(self, points):
+        """
+        Append (timestamp, metric, value) tuples, e.g. from a platform connector
+
+        Args:
+            points: Iterable of (epoch_seconds, metric, value)
+
+        Returns:
+            Number of points appended
+        """
+        points = sorted(points, key=lambda p: p[0])
+        if not points:
+            return 0
+
+        timestamps = np.array([p[0] for p in points], dtype=np.int64)
+        values = {}
+        for i, (_, metric, value) in enumerate(points):
+            column = values.get(metric)
+            if column is None:
+                column = values[metric] = np.full(len(points), np.nan)
+            column[i] = value
+        self.append(timestamps, values)
+        return len(points)
+
+    def upsert_points(self, points):
+        """
+        Store (timestamp, metric, value) tuples, overwriting values already stored for the
+        same timestamp and metric (e.g. revised daily totals) and appending the rest
+
+        Args:
+            points: Iterable of (epoch_seconds, metric, value)
+
+        Returns:
+            Number of points written
+        """
+        fresh = []
+        updated = []
+        with self._lock:
+            timestamps = self._timestamps[:self._size]
+            for point in points:
+                ts, metric, value = point
+                row = self._index.get(metric)
+                if row is not None:
+                    lo = np.searchsorted(timestamps, ts, 'left')
+                    hi = np.searchsorted(timestamps, ts, 'right')
+                    existing = np.flatnonzero(~np.isnan(self._values[row, lo:hi]))
+                    if existing.size:
+                        self._values[row, lo + existing[0]] = value
+                        updated.append(ts)
+                        continue
+                fresh.append(point)
+            if updated:
+                self.version += 1
+                self.revisions += 1
+                self._refresh_rollups(min(updated), max(updated))
+            return len(updated) + self.append_points(fresh)
+
+    def _slice(self, start=None, end=None):
+        """Index bounds for points with start <= ts < end"""
+        timestamps = self._timestamps[:self._size]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, to_epoch_seconds(start), 'left'))
+        hi = self._size if end is None else int(np.searchsorted(timestamps, to_epoch_seconds(end), 'left'))
+        return lo, hi
+
+    def fetch(self, metrics, start=None, end=None):
+        """
+        Fetch raw points for several metrics over a time range
+
+        Args:
+            metrics: List of metric names
+            start: Inclusive range start (epoch seconds or datetime), None for the beginning
+            end: Exclusive range end, None for the latest point
+
+        Returns:
+            Tuple of (timestamps, values) where values has one row per metric
+        """
+        with self._lock:
+            rows = self._rows(metrics)
+            lo, hi = self._slice(start, end)
+            return self._timestamps[lo:hi], self._values[rows, lo:hi]
+
+    def _raw_buckets(self, rows, start, end, interval):
+        """Bucket stats computed from raw points with start <= ts < end"""
+        lo, hi = self._slice(start, end)
+        return combine(
+            bucket_start(self._timestamps[lo:hi], interval), raw_stats(self._values[rows, lo:hi])
+        )
+
+    def _window(self, rows, start, end, interval):
+        """
+        Bucket stats for start <= ts < end: whole buckets come from the rollup, partial
+        buckets at either edge from raw points
+        """
+        step = INTERVALS[interval]
+        start = None if start is None else int(to_epoch_seconds(start))
+        end = None if end is None else int(to_epoch_seconds(end))
+        first = None if start is None else int(bucket_start(start + step - 1, interval))
+        last = None if end is None else int(bucket_start(end, interval))
+        if first is not None and last is not None and first >= last:
+            return self._raw_buckets(rows, start, end, interval)
+
+        parts = []
+        if start is not None and start < first:
+            parts.append(self._raw_buckets(rows, start, first, interval))
+        parts.append(self._rollups[interval].query(rows, first, last))
+        if end is not None and last < end:
+            parts.append(self._raw_buckets(rows, last, end, interval))
+        return parts[0] if len(parts) == 1 else concat_stats(parts)
+
+    def resample(self, metrics, start=None, end=None, interval='day', agg=None):
+        """
+        Aggregate several metrics into hour/day/week buckets
+
+        Args:
+            metrics: List of metric names
+            start: Inclusive range start
+            end: Exclusive range end
+            interval: Bucket width, one of INTERVALS
+            agg: Aggregation ('sum', 'mean', 'count', 'min', 'max', 'last'); defaults per metric
+
+        Returns:
+            Tuple of (bucket_starts, values) where values has one row per metric
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval: {interval}")
+
+        with self._lock:
+            keys, stats = self._window(self._rows(metrics), start, end, interval)
+        aggs = [agg or AGGREGATIONS.get(metric, 'sum') for metric in metrics]
+        return keys, finalize(stats, aggs)
+
+    def iter_resample(self, metrics, start, end, interval='day', agg=None, chunk=1000):
+        """
+        Resample a long range in windows of `chunk` buckets, for streaming exports
+
+        Args:
+            metrics: List of metric names
+            start: Inclusive range start
+            end: Exclusive range end
+            interval: Bucket width, one of INTERVALS
+            agg: Aggregation as for resample
+            chunk: Buckets per window
+
+        Yields:
+            Tuples of (bucket_starts, values) as returned by resample
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval: {interval}")
+        start = int(to_epoch_seconds(start))
+        end = int(to_epoch_seconds(end))
+        width = INTERVALS[interval] * chunk
+
+        # Window edges fall on bucket boundaries so no bucket is split between windows
+        lo = start
+        hi = int(bucket_start(start, interval)) + width
+        while lo < end:
+            yield self.resample(metrics, lo, min(hi, end), interval, agg)
+            lo, hi = hi, hi + width
+
+    def weekly_profile(self, metrics, agg='mean'):
+        """
+        Aggregate every stored point by day of week and hour (UTC), read from the
+        incrementally maintained hour-of-week profile
+
+        Args:
+            metrics: List of metric names
+            agg: 'mean', 'sum' or 'count'
+
+        Returns:
+            3D float array shaped (metrics, 7, 24), Monday first, NaN for empty slots
+        """
+        if agg not in ('mean', 'sum', 'count'):
+            raise ValueError(f"Unsupported aggregation: {agg}")
+        with self._lock:
+            sums, counts = self._profile.query(self._rows(metrics))
+        if agg == 'count':
+            result = counts.astype(np.float64)
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = np.where(counts > 0, sums / counts if agg == 'mean' else sums, np.nan)
+        return result.reshape(len(metrics), 7, 24)
+
+    def aggregate(self, metrics, start=None, end=None, agg=None):
+        """
+        Aggregate several metrics over a whole time range, reading daily rollups
+
+        Args:
+            metrics: List of metric names
+            start: Inclusive range start
+            end: Exclusive range end
+            agg: Aggregation as for resample; defaults per metric
+
+        Returns:
+            1D float array with one value per metric (NaN when the range holds no values)
+        """
+        with self._lock:
+            keys, stats = self._window(self._rows(metrics), start, end, 'day')
+        if keys.shape[0] == 0:
+            return np.full(len(metrics), np.nan)
+        _, stats = combine(np.zeros_like(keys), stats)
+        aggs = [agg or AGGREGATIONS.get(metric, 'sum') for metric in metrics]
+        return finalize(stats, aggs)[:, 0]
+
+
+def seed_demo_history(store, days=730, seed=0):
+    """
+    Fill a store with hourly demo history ending at the current hour
+
+    Args:
+        store: MetricStore to fill
+        days: Days of history to generate
+        seed: RNG seed so every worker process sees the same series
+    """
+    rng = np.random.default_rng(seed)
+    now = bucket_start(np.int64(to_epoch_seconds(datetime.utcnow())), 'hour')
+    timestamps = now - np.arange(days * 24 - 1, -1, -1, dtype=np.int64) * 3600
+
+    hours = (timestamps // 3600) % 24
+    weekdays = ((timestamps // 86400) + 3) % 7
+    years = (timestamps - timestamps[0]) / (365 * 86400.0)
+    diurnal = np.sin((hours - 8) / 24.0 * 2 * np.pi)
+
+    values = {}
+    for metric, shape in DEMO_METRICS.items():
+        level = shape['base'] * (1 + shape['growth'] * years) * DEMO_WEEKLY_PATTERN[weekdays]
+        noise = rng.normal(0.0, shape['noise'], timestamps.shape[0])
+        values[metric] = np.maximum(level * (1 + shape['swing'] * diurnal + noise), 0.0)
+
+    store.append(timestamps, values)
+
+
+def hydrate_from_db(store, account, chunk_size=10000):
+    """
+    Load persisted points for an account into a store, in chunks
+
+    Args:
+        store: MetricStore to fill
+        account: Account identifier
+        chunk_size: Points materialized per upsert
+
+    Returns:
+        Number of points loaded (0 without MongoDB)
+    """
+    from storage.db import find_metric_points
+
+    loaded = 0
+    chunk = []
+    try:
+        for point in find_metric_points(account):
+            chunk.append(point)
+            if len(chunk) >= chunk_size:
+                loaded += store.upsert_points(chunk)
+                chunk = []
+        loaded += store.upsert_points(chunk)
+    except Exception:
+        pass  # Persisted history is optional; the seeded store is still usable
+    return loaded
+
+
+# Least recently used accounts are dropped past ACCOUNT_STATE_SIZE (and reloaded on next use),
+# so arbitrary ?account= values cannot grow memory without bound
+_stores = TTLCache(Config.ACCOUNT_STATE_SIZE, ttl=float('inf'))
+_stores_lock = threading.Lock()
+
+
+def get_metric_store(account='default'):
+    """
+    Get the metric store for an account, seeding demo history on first use
+
+    Args:
+        account: Account identifier
+
+    Returns:
+        MetricStore instance
+    """
+    store = _stores.get(account)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(account)
+            if store is None:
+                store = MetricStore(capacity=730 * 24)
+                seed_demo_history(store, seed=zlib.crc32(account.encode('utf-8')))
+                hydrate_from_db(store, account)
+                _stores.put(account, store)
+    return store
+
+
+def peek_metric_store(account='default'):
+    """The account's metric store if this process already has one (never seeds a new one)"""
+    return _stores.get(account)
+
+
+# A worker that may have missed other workers' writes reloads its stores from MongoDB
+bus.on_resync(_stores.clear)
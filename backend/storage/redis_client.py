@@ -0,0 +1,51 @@
+"""
+Redis Client
+Shared lazily-connected Redis client with graceful fallback when Redis is unavailable
+"""
+
+import logging
+import threading
+
+from config import get_config
+
+try:
+    import redis
+except ImportError:  # Optional dependency: callers fall back to in-process backends
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_checked = False
+_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Get the shared Redis client
+
+    The connection is probed once per process; if the redis package is missing, REDIS_URL
+    is empty or the server does not answer, None is returned and callers use their
+    in-memory fallback for the lifetime of the process.
+
+    Returns:
+        redis.Redis instance or None
+    """
+    global _client, _checked
+    if _checked:
+        return _client
+
+    with _lock:
+        if not _checked:
+            url = get_config().REDIS_URL
+            if redis is not None and url:
+                try:
+                    client = redis.Redis.from_url(
+                        url, decode_responses=True, socket_connect_timeout=1
+                    )
+                    client.ping()
+                    _client = client
+                except Exception as e:
+                    logger.warning('Redis unavailable (%s), using in-memory backends', e)
+            _checked = True
+    return _client
@@ -0,0 +1,231 @@
+"""
+Rollups
+Incrementally maintained per-bucket aggregates (sum, count, min, max, last) for the metric store
+"""
+
+import numpy as np
+
+# Order of the arrays in a stats tuple
+STATS = ('sum', 'count', 'min', 'max', 'last')
+
+
+def raw_stats(values):
+    """
+    View raw points as single-point buckets
+
+    Args:
+        values: 2D float array, one row per metric (NaN where a point has no value)
+
+    Returns:
+        Stats tuple (sum, count, min, max, last)
+    """
+    present = ~np.isnan(values)
+    return np.where(present, values, 0.0), present.astype(np.int64), values, values, values
+
+
+def combine(keys, stats):
+    """
+    Merge consecutive columns that share a bucket key
+
+    Args:
+        keys: Sorted int64 array of bucket starts, one per column
+        stats: Stats tuple whose arrays have one column per key
+
+    Returns:
+        Tuple of (unique_keys, merged stats tuple)
+    """
+    sums, counts, mins, maxs, lasts = stats
+    if keys.shape[0] == 0:
+        return keys, stats
+
+    boundaries = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    present = ~np.isnan(lasts)
+    positions = np.where(present, np.arange(lasts.shape[1]), -1)
+    last = np.maximum.reduceat(positions, boundaries, axis=1)
+    merged = (
+        np.add.reduceat(sums, boundaries, axis=1),
+        np.add.reduceat(counts, boundaries, axis=1),
+        np.fmin.reduceat(mins, boundaries, axis=1),
+        np.fmax.reduceat(maxs, boundaries, axis=1),
+        np.where(last >= 0, np.take_along_axis(lasts, np.maximum(last, 0), axis=1), np.nan)
+    )
+    return keys[boundaries], merged
+
+
+def concat(parts):
+    """
+    Concatenate (keys, stats) parts that cover consecutive, non-overlapping ranges
+
+    Args:
+        parts: List of (keys, stats) tuples
+
+    Returns:
+        Tuple of (keys, stats)
+    """
+    keys = np.concatenate([k for k, _ in parts])
+    stats = tuple(np.concatenate([s[i] for _, s in parts], axis=1) for i in range(len(STATS)))
+    return keys, stats
+
+
+def finalize(stats, aggs):
+    """
+    Turn bucket stats into one value per metric and bucket
+
+    Args:
+        stats: Stats tuple
+        aggs: Aggregation per row ('sum', 'mean', 'count', 'min', 'max', 'last')
+
+    Returns:
+        2D float array with NaN for empty buckets
+    """
+    sums, counts, mins, maxs, lasts = stats
+    result = np.where(counts > 0, sums, np.nan)
+    for row, how in enumerate(aggs):
+        if how == 'sum':
+            continue
+        if how == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[row] = sums[row] / counts[row]
+        elif how == 'count':
+            result[row] = counts[row]
+        elif how == 'min':
+            result[row] = mins[row]
+        elif how == 'max':
+            result[row] = maxs[row]
+        elif how == 'last':
+            result[row] = lasts[row]
+        else:
+            raise ValueError(f"Unsupported aggregation: {how}")
+    return result
+
+
+class Rollup:
+    """
+    Sorted bucket starts with one stats column per bucket, for every metric row.
+
+    Writers recompute the buckets a batch touched and splice them in with replace(). Rewriting
+    buckets that already exist (the common case: points landing in the latest bucket) updates
+    the stats in place and costs O(touched buckets); adding new buckets reallocates the level,
+    which costs O(buckets in the level).
+    """
+
+    def __init__(self):
+        self.starts = np.empty(0, dtype=np.int64)
+        self.stats = raw_stats(np.empty((0, 0)))
+
+    def __len__(self):
+        return self.starts.shape[0]
+
+    def replace(self, lo, hi, keys, stats):
+        """
+        Replace every bucket with lo <= start < hi
+
+        Args:
+            lo: Inclusive bucket range start
+            hi: Exclusive bucket range end
+            keys: New bucket starts within the range
+            stats: Stats tuple for the new buckets (may have more metric rows than stored)
+        """
+        rows = stats[0].shape[0]
+        if self.stats[0].shape[0] < rows:
+            self.stats = tuple(
+                self._pad(arr, rows, fill) for arr, fill in zip(self.stats, (0, 0, np.nan, np.nan, np.nan))
+            )
+
+        i = int(np.searchsorted(self.starts, lo, 'left'))
+        j = int(np.searchsorted(self.starts, hi, 'left'))
+        if j - i == keys.shape[0] and np.array_equal(self.starts[i:j], keys):
+            # Same buckets: only the stats change. starts is left untouched because query()
+            # hands out views of it
+            for old, new in zip(self.stats, stats):
+                old[:, i:j] = new
+            return
+        self.starts = np.concatenate([self.starts[:i], keys, self.starts[j:]])
+        self.stats = tuple(
+            np.concatenate([old[:, :i], new, old[:, j:]], axis=1)
+            for old, new in zip(self.stats, stats)
+        )
+
+    @staticmethod
+    def _pad(arr, rows, fill):
+        extra = np.full((rows - arr.shape[0], arr.shape[1]), fill, dtype=arr.dtype)
+        return np.vstack([arr, extra])
+
+    def query(self, rows, lo=None, hi=None):
+        """
+        Get buckets with lo <= start < hi for the given metric rows
+
+        Args:
+            rows: Metric row indices
+            lo: Inclusive bucket start bound, None for the beginning
+            hi: Exclusive bucket start bound, None for the end
+
+        Returns:
+            Tuple of (keys, stats)
+        """
+        i = 0 if lo is None else int(np.searchsorted(self.starts, lo, 'left'))
+        j = len(self) if hi is None else int(np.searchsorted(self.starts, hi, 'left'))
+        return self.starts[i:j], tuple(arr[rows, i:j] for arr in self.stats)
+
+
+# Slots in an hour-of-week profile (Monday 00:00 UTC is slot 0)
+HOURS_PER_WEEK = 7 * 24
+
+
+def hour_of_week(timestamps):
+    """Hour-of-week slot for epoch seconds; the epoch fell on a Thursday, 72 hours after Monday"""
+    return (np.asarray(timestamps, dtype=np.int64) // 3600 + 72) % HOURS_PER_WEEK
+
+
+class HourOfWeekProfile:
+    """
+    Sum and count per metric row and hour-of-week slot, folded from hourly rollup buckets.
+
+    Writers subtract the buckets they are about to replace and add the new ones, so the
+    profile stays exact under revisions and reading it is O(168) whatever the history length.
+    """
+
+    def __init__(self):
+        self.sums = np.zeros((0, HOURS_PER_WEEK))
+        self.counts = np.zeros((0, HOURS_PER_WEEK), dtype=np.int64)
+
+    def update(self, keys, stats, sign=1):
+        """
+        Fold hourly buckets into the profile
+
+        Args:
+            keys: Hour bucket starts
+            stats: Stats tuple with one column per key
+            sign: 1 to add the buckets, -1 to remove them
+        """
+        sums, counts = stats[0], stats[1]
+        rows = sums.shape[0]
+        if keys.shape[0] == 0 or rows == 0:
+            return
+        if self.sums.shape[0] < rows:
+            extra = rows - self.sums.shape[0]
+            self.sums = np.vstack([self.sums, np.zeros((extra, HOURS_PER_WEEK))])
+            self.counts = np.vstack([self.counts, np.zeros((extra, HOURS_PER_WEEK), dtype=np.int64)])
+
+        # One bincount over (row, slot) pairs bins every bucket of every metric at once
+        index = (np.arange(rows)[:, None] * HOURS_PER_WEEK + hour_of_week(keys)[None, :]).ravel()
+        size = rows * HOURS_PER_WEEK
+        binned_sums = np.bincount(index, weights=sums.ravel(), minlength=size)
+        binned_counts = np.bincount(index, weights=counts.ravel(), minlength=size)
+        self.sums[:rows] += sign * binned_sums.reshape(rows, HOURS_PER_WEEK)
+        self.counts[:rows] += sign * binned_counts.reshape(rows, HOURS_PER_WEEK).astype(np.int64)
+
+    def query(self, rows):
+        """
+        Get (sums, counts) for metric rows, zeros for rows never written
+
+        Returns:
+            Tuple of 2D arrays shaped (len(rows), 168)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        known = rows < self.sums.shape[0]
+        sums = np.zeros((rows.shape[0], HOURS_PER_WEEK))
+        counts = np.zeros((rows.shape[0], HOURS_PER_WEEK), dtype=np.int64)
+        sums[known] = self.sums[rows[known]]
+        counts[known] = self.counts[rows[known]]
+        return sums, counts
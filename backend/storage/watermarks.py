@@ -0,0 +1,131 @@
+"""
+Sync Watermarks
+Per-platform, per-account cursors recording how far each integration has been synced
+"""
+
+import threading
+from datetime import datetime
+
+from storage.db import get_db
+
+# Cursor fields handed to connectors
+CURSOR_FIELDS = ('last_timestamp', 'page_token', 'etag')
+
+
+class MemoryWatermarkBackend:
+    """Process-local watermarks; used when MongoDB is unavailable"""
+
+    def __init__(self):
+        self._marks = {}
+        self._lock = threading.Lock()
+
+    def get(self, account, platform):
+        mark = self._marks.get((account, platform))
+        return dict(mark) if mark else None
+
+    def save(self, account, platform, fields):
+        with self._lock:
+            mark = self._marks.setdefault((account, platform), {'account': account, 'platform': platform})
+            mark.update(fields)
+
+    def list(self, account):
+        return [dict(m) for (acc, _), m in self._marks.items() if acc == account]
+
+
+class MongoWatermarkBackend:
+    """Watermarks in the sync_state collection, unique on (account, platform)"""
+
+    PROJECTION = {'_id': 0}
+
+    def __init__(self, db):
+        self.collection = db.sync_state
+
+    def get(self, account, platform):
+        return self.collection.find_one({'account': account, 'platform': platform}, self.PROJECTION)
+
+    def save(self, account, platform, fields):
+        self.collection.update_one(
+            {'account': account, 'platform': platform}, {'$set': fields}, upsert=True
+        )
+
+    def list(self, account):
+        return list(self.collection.find({'account': account}, self.PROJECTION))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_watermark_backend():
+    """
+    Get the watermark backend, persisted in MongoDB when available
+
+    Returns:
+        Watermark backend instance
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                db = get_db()
+                _backend = MongoWatermarkBackend(db) if db is not None else MemoryWatermarkBackend()
+    return _backend
+
+
+def get_cursor(account, platform):
+    """
+    Get the cursor to resume a platform sync from
+
+    Args:
+        account: Account identifier
+        platform: Platform name
+
+    Returns:
+        Dict of CURSOR_FIELDS, or None if the platform was never synced successfully
+    """
+    mark = get_watermark_backend().get(account, platform)
+    if not mark or not mark.get('last_success'):
+        return None
+    return {field: mark.get(field) for field in CURSOR_FIELDS}
+
+
+def record_success(account, platform, cursor, points):
+    """
+    Advance the watermark after a sync has been ingested
+
+    Args:
+        account: Account identifier
+        platform: Platform name
+        cursor: Cursor returned by the connector
+        points: Number of points ingested
+    """
+    now = datetime.utcnow()
+    fields = {field: (cursor or {}).get(field) for field in CURSOR_FIELDS}
+    fields.update(last_sync=now, last_success=now, status='success', error=None, points=points)
+    get_watermark_backend().save(account, platform, fields)
+
+
+def record_failure(account, platform, error):
+    """
+    Record a failed sync without moving the cursor
+
+    Args:
+        account: Account identifier
+        platform: Platform name
+        error: Error message
+    """
+    fields = {'last_sync': datetime.utcnow(), 'status': 'failed', 'error': error}
+    get_watermark_backend().save(account, platform, fields)
+
+
+def list_watermarks(account='default'):
+    """
+    Get every platform watermark for an account
+
+    Args:
+        account: Account identifier
+
+    Returns:
+        Dict of platform -> watermark record
+    """
+    return {mark['platform']: mark for mark in get_watermark_backend().list(account)}
@@ -0,0 +1,90 @@
+"""
+Shared test fixtures: a local fake platform API for the connectors
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+
+class FakeAPI:
+    """
+    Local HTTP server standing in for a platform API.
+
+    Routes map a path to a handler taking (query, headers) and returning (status, body) or
+    (status, body, headers); a handler may also be a list of such tuples, served one per
+    request with the last one repeated. Every request is recorded as (path, query, headers).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api._handle(self)
+
+            def do_POST(self):
+                api._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def route(self, path, handler):
+        """Serve `path` with a callable or a list of canned responses"""
+        self.routes[path.strip('/')] = handler
+
+    def hits(self, path):
+        """Requests recorded for a path"""
+        return [r for r in self.requests if r[0] == path.strip('/')]
+
+    def _handle(self, request):
+        parts = urlsplit(request.path)
+        path = parts.path.strip('/')
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        headers = dict(request.headers)
+        with self._lock:
+            self.requests.append((path, query, headers))
+            handler = self.routes.get(path)
+            if isinstance(handler, list):
+                response = handler.pop(0) if len(handler) > 1 else handler[0]
+            elif handler is not None:
+                response = handler(query, headers)
+            else:
+                response = (404, {'error': 'not found'})
+        status, body, extra = (response + ({},))[:3]
+        payload = b'' if body is None else json.dumps(body).encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(payload)))
+        for name, value in extra.items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(payload)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeAPI().start()
+    yield api
+    api.stop()
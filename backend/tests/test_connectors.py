@@ -0,0 +1,157 @@
+"""
+Connector tests against the local fake API: retries, rate limiting and incremental cursors
+"""
+
+import time
+
+import pytest
+
+from connectors import twitter
+from connectors.base import BaseConnector, ConnectorError, RateLimiter
+from connectors.twitter import TwitterConnector, parse_page_token
+from connectors.youtube import YouTubeConnector
+
+
+class FastConnector(BaseConnector):
+    name = 'fake'
+    RATE_LIMIT = 1000.0
+    BURST = 100
+    BACKOFF = 0.01
+
+
+def test_retries_transient_errors_then_succeeds(fake_api):
+    fake_api.route('stats', [(503, None), (500, None), (200, {'ok': True})])
+    connector = FastConnector(fake_api.url, 'token')
+
+    assert connector.request('GET', 'stats') == {'ok': True}
+    assert len(fake_api.hits('stats')) == 3
+
+
+def test_honours_retry_after_on_429(fake_api):
+    fake_api.route('stats', [(429, None, {'Retry-After': '1'}), (200, {'ok': True})])
+    connector = FastConnector(fake_api.url, 'token')
+
+    started = time.monotonic()
+    assert connector.request('GET', 'stats') == {'ok': True}
+    assert time.monotonic() - started >= 1.0
+
+
+def test_gives_up_after_max_retries(fake_api):
+    fake_api.route('stats', [(502, None)])
+    connector = FastConnector(fake_api.url, 'token')
+
+    with pytest.raises(ConnectorError, match='HTTP 502'):
+        connector.request('GET', 'stats')
+    assert len(fake_api.hits('stats')) == FastConnector.MAX_RETRIES + 1
+
+
+def test_does_not_retry_client_errors(fake_api):
+    fake_api.route('stats', [(403, {'error': 'forbidden'})])
+    connector = FastConnector(fake_api.url, 'token')
+
+    with pytest.raises(ConnectorError, match='HTTP 403'):
+        connector.request('GET', 'stats')
+    assert len(fake_api.hits('stats')) == 1
+
+
+def test_rate_limiter_smooths_to_rate():
+    limiter = RateLimiter(rate=20, burst=1)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - started >= 4 / 20 * 0.9
+
+
+def test_youtube_etag_skips_unchanged_statistics(fake_api):
+    def channels(query, headers):
+        if headers.get('If-None-Match') == '"v1"':
+            return 304, None, {'ETag': '"v1"'}
+        return 200, {'items': [{'statistics': {'subscriberCount': '10', 'viewCount': '99', 'videoCount': '2'}}]}, \
+            {'ETag': '"v1"'}
+
+    fake_api.route('channels', channels)
+    connector = YouTubeConnector(fake_api.url, 'key')
+
+    first = connector.fetch('chan')
+    assert first['stats']['subscribers'] == 10 and first['cursor']['etag'] == '"v1"'
+    second = connector.fetch('chan', first['cursor'])
+    assert second['stats'] is None and second['points'] == []
+    assert second['cursor']['etag'] == '"v1"'
+
+
+class FakeTimeline:
+    """Twitter v2 user timeline: newest first, since_id/until_id bounds, paginated"""
+
+    def __init__(self, count):
+        self.ids = list(range(1, count + 1))
+
+    def post(self, count=1):
+        start = self.ids[-1] + 1 if self.ids else 1
+        self.ids.extend(range(start, start + count))
+
+    def __call__(self, query, headers):
+        ids = [i for i in reversed(self.ids)
+               if i > int(query.get('since_id', 0)) and i < int(query.get('until_id', 10 ** 18))]
+        offset = int(query.get('pagination_token', 0))
+        size = int(query.get('max_results', 100))
+        page = ids[offset:offset + size]
+        meta = {'result_count': len(page)}
+        if page:
+            meta.update(newest_id=str(page[0]), oldest_id=str(page[-1]))
+        if offset + size < len(ids):
+            meta['next_token'] = str(offset + size)
+        return 200, {
+            'data': [{'id': str(i), 'text': f'tweet {i}', 'created_at': '2026-01-01T00:00:00.000Z',
+                      'public_metrics': {'like_count': 1}} for i in page],
+            'meta': meta
+        }
+
+
+@pytest.fixture
+def timeline(fake_api, monkeypatch):
+    monkeypatch.setattr(twitter, 'MAX_PAGES', 2)
+    feed = FakeTimeline(450)
+    fake_api.route('users/42', lambda q, h: (200, {'data': {'public_metrics': {'followers_count': 7}}}))
+    fake_api.route('users/42/tweets', feed)
+    return feed
+
+
+def tweet_ids(result):
+    return {int(doc['id'].split(':')[1]) for doc in result['documents']}
+
+
+def test_twitter_resumes_backlog_then_reads_only_new_tweets(fake_api, timeline):
+    connector = TwitterConnector(fake_api.url, 'bearer')
+
+    # 450 tweets at 2 pages of 100 per sync: the backlog takes three syncs
+    seen, cursor = set(), None
+    for _ in range(3):
+        result = connector.fetch('42', cursor)
+        assert not tweet_ids(result) & seen
+        seen |= tweet_ids(result)
+        cursor = result['cursor']
+    assert seen == set(timeline.ids)
+    assert parse_page_token(cursor['page_token']) == ('450', None, None)
+
+    # Drained: the next sync asks only for tweets newer than the watermark
+    timeline.post(3)
+    result = connector.fetch('42', cursor)
+    assert tweet_ids(result) == {451, 452, 453}
+    assert fake_api.hits('users/42/tweets')[-1][1]['since_id'] == '450'
+    assert result['cursor']['page_token'] == '453'
+
+
+def test_twitter_keeps_since_id_while_backlog_is_read(fake_api, timeline):
+    connector = TwitterConnector(fake_api.url, 'bearer')
+    first = connector.fetch('42', {'page_token': '100'})
+
+    since_id, until_id, newest_id = parse_page_token(first['cursor']['page_token'])
+    assert (since_id, newest_id) == ('100', '450') and int(until_id) == 251
+
+    # Tweets posted mid-backlog are picked up once the old since_id range is finished
+    timeline.post(1)
+    second = connector.fetch('42', first['cursor'])
+    assert tweet_ids(second) == set(range(101, 251))
+    assert second['cursor']['page_token'] == '450'
+    third = connector.fetch('42', second['cursor'])
+    assert tweet_ids(third) == {451}
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { Brain, Sparkles } from 'lucide-react'
-import { getInsights } from '../services/api'
+import { getInsights, subscribeToEvents } from '../services/api'
 
 const InsightsPanel = () => {
   const [insights, setInsights] = useState([])
@@ -8,6 +8,9 @@ const InsightsPanel = () => {
 
   useEffect(() => {
     fetchInsights()
+    return subscribeToEvents((type, data) => {
+      if (type === 'insights' && (data.account || 'default') === 'default') setInsights(data.insights.slice(0, 3))
+    })
   }, [])
 
   const fetchInsights = async () => {
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { Zap, Play, Pause, Clock, CheckCircle, AlertCircle } from 'lucide-react'
-import { getTriggers, getAutomationLogs } from '../services/api'
+import { getTriggers, getAutomationLogs, subscribeToEvents } from '../services/api'
 
 const Automation = () => {
   const [triggers, setTriggers] = useState([])
@@ -9,6 +9,9 @@ const Automation = () => {
 
   useEffect(() => {
     fetchAutomationData()
+    return subscribeToEvents((type, data) => {
+      if (type === 'automation') setLogs((current) => [data, ...current])
+    })
   }, [])
 
   const fetchAutomationData = async () => {
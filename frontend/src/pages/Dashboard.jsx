@@ -10,7 +10,7 @@ import {
 import MetricCard from '../components/MetricCard'
 import ChartCard from '../components/ChartCard'
 import InsightsPanel from '../components/InsightsPanel'
-import { getOverview, getTimeseries } from '../services/api'
+import { getOverview, getTimeseries, subscribeToEvents } from '../services/api'
 
 const Dashboard = () => {
   const [metrics, setMetrics] = useState(null)
@@ -19,6 +19,10 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchDashboardData()
+    // Refresh when a sync lands new metrics instead of polling
+    return subscribeToEvents((type) => {
+      if (type === 'metrics') fetchDashboardData()
+    })
   }, [])
 
   const fetchDashboardData = async () => {
@@ -44,6 +44,12 @@ export const getPredictions = async (metricType, timeHorizon = 7) => {
   return response.data
 }
 
+// jobs: [{ type: 'predict', metric_type, time_horizon }, { type: 'trend', metric }]
+export const getPredictionBatch = async (jobs) => {
+  const response = await api.post('/ai/predict/batch', { jobs })
+  return response.data
+}
+
 export const getRecommendations = async (category = 'all') => {
   const response = await api.get(`/ai/recommendations?category=${category}`)
   return response.data
@@ -84,5 +90,53 @@ export const syncIntegration = async (platform) => {
   return response.data
 }
 
+// Live updates: one EventSource per tab, shared by every subscriber
+let eventSource = null
+let reconnectTimer = null
+const eventHandlers = new Set()
+// EventSource stops retrying after an error response (503 when the server is at its stream cap)
+const RECONNECT_DELAY = 5000
+
+const dispatchEvent = (type) => (message) => {
+  const data = JSON.parse(message.data)
+  eventHandlers.forEach((handler) => handler(type, data))
+}
+
+const connectEvents = () => {
+  eventSource = new EventSource(`${API_BASE_URL}/stream`)
+  ;['metrics', 'insights', 'automation'].forEach((type) => {
+    eventSource.addEventListener(type, dispatchEvent(type))
+  })
+  eventSource.onerror = () => {
+    if (eventSource.readyState === EventSource.CLOSED) {
+      eventSource = null
+      reconnectTimer = setTimeout(() => {
+        reconnectTimer = null
+        if (eventHandlers.size > 0) connectEvents()
+      }, RECONNECT_DELAY)
+    }
+  }
+}
+
+// handler(type, data) receives 'metrics', 'insights' and 'automation' events.
+// Returns an unsubscribe function.
+export const subscribeToEvents = (handler) => {
+  eventHandlers.add(handler)
+  if (!eventSource && !reconnectTimer) {
+    connectEvents()
+  }
+  return () => {
+    eventHandlers.delete(handler)
+    if (eventHandlers.size === 0) {
+      clearTimeout(reconnectTimer)
+      reconnectTimer = null
+      if (eventSource) {
+        eventSource.close()
+        eventSource = null
+      }
+    }
+  }
+}
+
 export default api
 
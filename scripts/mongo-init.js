@@ -86,10 +86,59 @@ db.createCollection('automation_logs', {
   }
 });
 
+db.createCollection('sync_state', {
+  validator: {
+    $jsonSchema: {
+      bsonType: 'object',
+      required: ['account', 'platform'],
+      properties: {
+        account: {
+          bsonType: 'string'
+        },
+        platform: {
+          bsonType: 'string'
+        },
+        status: {
+          bsonType: 'string',
+          enum: ['success', 'failed']
+        }
+      }
+    }
+  }
+});
+
 // Create indexes for better performance
 db.analytics.createIndex({ timestamp: 1 });
 db.analytics.createIndex({ type: 1 });
+// Upsert key for synced metric points
+db.analytics.createIndex(
+  { account: 1, metric: 1, timestamp: 1 },
+  { unique: true, partialFilterExpression: { metric: { $exists: true } } }
+);
+// Per-account history reads when hydrating the metric store
+db.analytics.createIndex({ account: 1, timestamp: 1 });
+db.sync_state.createIndex({ account: 1, platform: 1 }, { unique: true });
+db.triggers.createIndex({ id: 1 }, { unique: true });
+db.workflows.createIndex({ id: 1 }, { unique: true });
+db.workflow_runs.createIndex({ id: 1 }, { unique: true });
+db.workflow_runs.createIndex({ workflow_id: 1, created_at: -1 });
+// Idempotency keys: one run per key across workers
+db.workflow_runs.createIndex({ workflow_id: 1, idempotency_key: 1 }, { unique: true });
+db.scheduled_posts.createIndex({ id: 1 }, { unique: true });
+// Pending posts re-queued on restart
+db.scheduled_posts.createIndex({ status: 1, due: 1 });
+// Lease renewal and takeover of posts held in worker memory (no Redis)
+db.scheduled_posts.createIndex({ owner: 1, status: 1 });
+db.scheduled_posts.createIndex({ status: 1, lease_until: 1 });
+// Posts, comments and page content behind the keyword index
+db.content.createIndex({ account: 1, id: 1 }, { unique: true });
+db.content.createIndex({ account: 1, timestamp: 1 });
 db.ai_insights.createIndex({ timestamp: -1 });
+// Per-account alert reads
+db.ai_insights.createIndex({ account: 1, type: 1, timestamp: -1 });
+// Materialized insights read by /api/ai/insights (optionally filtered by priority)
+db.ai_insights.createIndex({ account: 1, generated: 1, timestamp: -1, id: 1 });
+db.ai_insights.createIndex({ account: 1, generated: 1, priority: 1, timestamp: -1 });
 db.ai_insights.createIndex({ priority: 1 });
 db.automation_logs.createIndex({ timestamp: -1 });
 